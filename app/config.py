@@ -22,6 +22,139 @@ class Settings(BaseSettings):
     telegram_api_id: int = int(os.getenv("API_ID", "0"))
     telegram_api_hash: str = os.getenv("API_HASH", "")
 
+    # Supabase 동기 클라이언트 스레드풀 크기
+    supabase_max_workers: int = int(os.getenv("SUPABASE_MAX_WORKERS", "16"))
+
+    # 메시지 write-behind 저장
+    message_writer_max_buffer: int = int(os.getenv("MESSAGE_WRITER_MAX_BUFFER", "10000"))
+    message_writer_batch_size: int = int(os.getenv("MESSAGE_WRITER_BATCH_SIZE", "100"))
+    message_writer_flush_interval_sec: float = float(os.getenv("MESSAGE_WRITER_FLUSH_INTERVAL_SEC", "2"))
+    message_writer_max_retries: int = int(os.getenv("MESSAGE_WRITER_MAX_RETRIES", "5"))
+    message_writer_retry_base_delay_sec: float = float(os.getenv("MESSAGE_WRITER_RETRY_BASE_DELAY_SEC", "0.5"))
+
+    # 채팅 컨텍스트 저장소
+    context_max_messages: int = int(os.getenv("CONTEXT_MAX_MESSAGES", "20"))
+    context_max_chats: int = int(os.getenv("CONTEXT_MAX_CHATS", "50000"))
+    context_max_bytes: int = int(os.getenv("CONTEXT_MAX_BYTES", str(128 * 1024 * 1024)))
+    context_idle_ttl_sec: float = float(os.getenv("CONTEXT_IDLE_TTL_SEC", str(6 * 3600)))
+
+    # 컨텍스트에서 밀려난 대화 누적 요약 (fold_messages개가 쌓이면 요약에 반영)
+    conversation_summary_enabled: bool = os.getenv("CONVERSATION_SUMMARY_ENABLED", "true").lower() == "true"
+    conversation_summary_fold_messages: int = int(os.getenv("CONVERSATION_SUMMARY_FOLD_MESSAGES", "10"))
+    conversation_summary_max_tokens: int = int(os.getenv("CONVERSATION_SUMMARY_MAX_TOKENS", "300"))
+    conversation_summary_concurrency: int = int(os.getenv("CONVERSATION_SUMMARY_CONCURRENCY", "4"))
+    # 요약이 생긴 채팅방은 최근 N개만 원문으로 유지 (나머지는 요약에 접힘, 접히기 전 메시지는 프롬프트에 원문 포함)
+    conversation_summary_tail_messages: int = int(os.getenv("CONVERSATION_SUMMARY_TAIL_MESSAGES", "10"))
+
+    # 연속 메시지 debounce
+    coalesce_quiet_period_sec: float = float(os.getenv("COALESCE_QUIET_PERIOD_SEC", "3"))
+    coalesce_max_wait_sec: float = float(os.getenv("COALESCE_MAX_WAIT_SEC", "15"))
+    coalesce_max_fragments: int = int(os.getenv("COALESCE_MAX_FRAGMENTS", "10"))
+    coalesce_max_chars: int = int(os.getenv("COALESCE_MAX_CHARS", "2000"))
+    coalesce_max_chats_per_agent: int = int(os.getenv("COALESCE_MAX_CHATS_PER_AGENT", "1000"))
+
+    # 채팅방 메타데이터 캐시 (에이전트별 TTL/LRU) 및 최근 발화자 샘플
+    chat_metadata_ttl_sec: float = float(os.getenv("CHAT_METADATA_TTL_SEC", "900"))
+    chat_metadata_max_chats_per_agent: int = int(os.getenv("CHAT_METADATA_MAX_CHATS_PER_AGENT", "5000"))
+    chat_active_speakers: int = int(os.getenv("CHAT_ACTIVE_SPEAKERS", "20"))
+    # 응답 생성에 넘기는 참여자 수 (최근 발화자 순)
+    chat_participants_sample: int = int(os.getenv("CHAT_PARTICIPANTS_SAMPLE", "10"))
+
+    # 매핑 없는 채팅방 이벤트를 Telethon 단계에서 버리는 필터와 전체 재로드 간격 (다른 프로세스의 매핑 추가 반영 지연)
+    chat_filter_enabled: bool = os.getenv("CHAT_FILTER_ENABLED", "true").lower() == "true"
+    chat_filter_refresh_sec: float = float(os.getenv("CHAT_FILTER_REFRESH_SEC", "30"))
+
+    # 컨텍스트/debounce 버퍼 스냅샷 (재시작 후 채팅방별로 지연 복원, 샤딩 모드에서는 경로 뒤에 .shardN)
+    context_snapshot_enabled: bool = os.getenv("CONTEXT_SNAPSHOT_ENABLED", "true").lower() == "true"
+    context_snapshot_path: str = os.getenv("CONTEXT_SNAPSHOT_PATH", "context_snapshot.bin")
+    # 주기 저장 간격 (0이면 종료 시에만 저장)
+    context_snapshot_interval_sec: float = float(os.getenv("CONTEXT_SNAPSHOT_INTERVAL_SEC", "300"))
+    # 이보다 오래된 조각 메시지는 복원하지 않음
+    context_snapshot_pending_ttl_sec: float = float(os.getenv("CONTEXT_SNAPSHOT_PENDING_TTL_SEC", "120"))
+
+    # 응답 전송 스케줄러
+    send_scheduler_workers: int = int(os.getenv("SEND_SCHEDULER_WORKERS", "4"))
+    send_scheduler_max_pending: int = int(os.getenv("SEND_SCHEDULER_MAX_PENDING", "100000"))
+    # 에이전트(계정) 전체 / 채팅방별 전송 한도 (분당 메시지 수, 0이면 제한 없음)와 순간 허용량
+    send_agent_rate_per_min: float = float(os.getenv("SEND_AGENT_RATE_PER_MIN", "30"))
+    send_agent_burst: float = float(os.getenv("SEND_AGENT_BURST", "5"))
+    send_chat_rate_per_min: float = float(os.getenv("SEND_CHAT_RATE_PER_MIN", "20"))
+    send_chat_burst: float = float(os.getenv("SEND_CHAT_BURST", "3"))
+    # FloodWait/SlowModeWait 후 재시도 횟수와 재시도할 최대 대기 시간 (초, 이보다 길면 전송 포기)
+    send_flood_max_retries: int = int(os.getenv("SEND_FLOOD_MAX_RETRIES", "3"))
+    send_flood_max_wait_sec: float = float(os.getenv("SEND_FLOOD_MAX_WAIT_SEC", "600"))
+
+    # 샤딩 모드 (worker_sharded.py) 프로세스 수
+    worker_shards: int = int(os.getenv("WORKER_SHARDS", str(os.cpu_count() or 2)))
+
+    # 에이전트 시작 (동시 연결 수, 타임아웃, 격리 재시도 백오프)
+    agent_startup_concurrency: int = int(os.getenv("AGENT_STARTUP_CONCURRENCY", "10"))
+    agent_connect_timeout_sec: float = float(os.getenv("AGENT_CONNECT_TIMEOUT_SEC", "30"))
+    # 연결 실패/끊김 시 재연결 backoff (지수 증가, 지연의 절반~전체 사이 jitter) - max_retries회 연속 실패하면 격리
+    agent_reconnect_base_backoff_sec: float = float(os.getenv("AGENT_RECONNECT_BASE_BACKOFF_SEC", "2"))
+    agent_reconnect_max_backoff_sec: float = float(os.getenv("AGENT_RECONNECT_MAX_BACKOFF_SEC", "120"))
+    agent_reconnect_max_retries: int = int(os.getenv("AGENT_RECONNECT_MAX_RETRIES", "5"))
+    # 격리된 에이전트 재시도 간격 (격리될 때마다 지수 증가)
+    quarantine_base_backoff_sec: float = float(os.getenv("QUARANTINE_BASE_BACKOFF_SEC", "30"))
+    quarantine_max_backoff_sec: float = float(os.getenv("QUARANTINE_MAX_BACKOFF_SEC", "1800"))
+
+    # agents 테이블 reconciler 주기 (0이면 비활성화)
+    agent_reconcile_interval_sec: float = float(os.getenv("AGENT_RECONCILE_INTERVAL_SEC", "30"))
+
+    # OpenAI 프롬프트 토큰 예산 (페르소나의 max_prompt_tokens가 있으면 그 값 우선)
+    openai_max_prompt_tokens: int = int(os.getenv("OPENAI_MAX_PROMPT_TOKENS", "3000"))
+    token_count_cache_size: int = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "50000"))
+
+    # OpenAI 호출 스케줄러 (분당 요청/토큰 한도, 동시 호출 수, 429 재시도)
+    llm_rpm_limit: int = int(os.getenv("LLM_RPM_LIMIT", "500"))
+    llm_tpm_limit: int = int(os.getenv("LLM_TPM_LIMIT", "200000"))
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "50"))
+    llm_max_queue: int = int(os.getenv("LLM_MAX_QUEUE", "5000"))
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    llm_retry_base_delay_sec: float = float(os.getenv("LLM_RETRY_BASE_DELAY_SEC", "1"))
+    llm_max_retry_delay_sec: float = float(os.getenv("LLM_MAX_RETRY_DELAY_SEC", "60"))
+    # 응답 토큰 예상치 (요청 전에 tpm 버킷에서 미리 차감)
+    llm_completion_token_allowance: int = int(os.getenv("LLM_COMPLETION_TOKEN_ALLOWANCE", "300"))
+    # 테넌트별 가중치 ("tenant_a:2,tenant_b:0.5", 기본 1)
+    llm_tenant_weights: str = os.getenv("LLM_TENANT_WEIGHTS", "")
+
+    # 응답을 스트리밍으로 받아 ---SPLIT--- 조각이 완성되는 즉시 전송 예약
+    openai_streaming: bool = os.getenv("OPENAI_STREAMING", "true").lower() == "true"
+
+    # 응답 캐시 (페르소나의 response_cache_enabled가 없으면 RESPONSE_CACHE_ENABLED 적용)
+    response_cache_enabled: bool = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    response_cache_ttl_sec: float = float(os.getenv("RESPONSE_CACHE_TTL_SEC", "3600"))
+    response_cache_maxsize: int = int(os.getenv("RESPONSE_CACHE_MAXSIZE", "10000"))
+    # 캐시 키에 포함할 최근 컨텍스트 메시지 수 (0이면 컨텍스트 무시)
+    response_cache_context_messages: int = int(os.getenv("RESPONSE_CACHE_CONTEXT_MESSAGES", "2"))
+
+    # 응답 모델 라우팅 ("name:model:max_tokens", 가벼운 route부터 무거운 route 순서)
+    llm_routes: str = os.getenv("LLM_ROUTES", "light:gpt-4o-mini:120,standard:gpt-4o-mini:300,heavy:gpt-4o:500")
+    llm_route_default: str = os.getenv("LLM_ROUTE_DEFAULT", "standard")
+    # 테넌트별 route 고정 ("tenant_a:heavy,tenant_b:light", 페르소나 정책보다 우선)
+    llm_route_tenant_overrides: str = os.getenv("LLM_ROUTE_TENANT_OVERRIDES", "")
+    # 자동 판단 기준 (메시지/프롬프트 토큰 수)
+    llm_route_light_max_tokens: int = int(os.getenv("LLM_ROUTE_LIGHT_MAX_TOKENS", "12"))
+    llm_route_heavy_min_tokens: int = int(os.getenv("LLM_ROUTE_HEAVY_MIN_TOKENS", "80"))
+    llm_route_heavy_context_tokens: int = int(os.getenv("LLM_ROUTE_HEAVY_CONTEXT_TOKENS", "2000"))
+    # 대화 요약 등 route를 거치지 않는 호출의 모델
+    openai_default_model: str = os.getenv("OPENAI_DEFAULT_MODEL", "gpt-4o-mini")
+
+    # /auth 대기 세션 (코드 입력 대기 중인 연결된 클라이언트) - TTL, 전역/전화번호별 상한, 정리 주기
+    auth_pending_ttl_sec: float = float(os.getenv("AUTH_PENDING_TTL_SEC", "300"))
+    auth_max_pending: int = int(os.getenv("AUTH_MAX_PENDING", "500"))
+    auth_max_pending_per_phone: int = int(os.getenv("AUTH_MAX_PENDING_PER_PHONE", "1"))
+    auth_sweep_interval_sec: float = float(os.getenv("AUTH_SWEEP_INTERVAL_SEC", "30"))
+
+    # 워커 캐시 (매핑/페르소나)
+    mapping_cache_ttl_sec: float = float(os.getenv("MAPPING_CACHE_TTL_SEC", "60"))
+    mapping_cache_negative_ttl_sec: float = float(os.getenv("MAPPING_CACHE_NEGATIVE_TTL_SEC", "30"))
+    mapping_cache_maxsize: int = int(os.getenv("MAPPING_CACHE_MAXSIZE", "10000"))
+    persona_cache_ttl_sec: float = float(os.getenv("PERSONA_CACHE_TTL_SEC", "300"))
+    persona_cache_negative_ttl_sec: float = float(os.getenv("PERSONA_CACHE_NEGATIVE_TTL_SEC", "30"))
+    persona_cache_maxsize: int = int(os.getenv("PERSONA_CACHE_MAXSIZE", "1000"))
+    prompt_prefix_cache_maxsize: int = int(os.getenv("PROMPT_PREFIX_CACHE_MAXSIZE", "3000"))
+
     model_config: SettingsConfigDict = {
         "env_file": ".env",
         "env_file_encoding": "utf-8",
@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers.auth_router import router as auth_router
 from app.routers.worker_router import router as worker_router
+from app.services.pending_auth import pending_auths
 from utils.logging import log
 from app.config import settings
 
@@ -47,6 +48,8 @@ async def startup():
 @app.on_event("shutdown")
 async def shutdown():
     log.info("shutdown")
+    # 코드 입력을 기다리던 인증 클라이언트 연결 해제
+    await pending_auths.stop()
 
 if __name__ == "__main__":
     import uvicorn
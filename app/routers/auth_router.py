@@ -3,6 +3,7 @@ from pydantic import BaseModel
 import uuid
 
 from app.services import telegram_service, supabase_service
+from app.services.pending_auth import PendingAuthFullError, pending_auths
 from utils.logging import log
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -17,8 +18,6 @@ class SessionStringReq(BaseModel):
     code: str
     password: str | None = None
 
-_pending: dict[str, dict] = {}
-
 @router.options("/code")
 async def options_code():
     return Response(
@@ -35,18 +34,26 @@ async def send_code(req: CodeReq):
     """
     직접 제공된 api_id, api_hash, phone_number로 인증코드를 발송합니다.
     """
+    # 연결을 열기 전에 대기 세션 자리부터 확보 (대량 온보딩 시 소켓 고갈 방지)
     try:
-        client = await telegram_service.send_code(req.api_id, req.api_hash, req.phone_number)
-    except Exception as e:
-        raise HTTPException(400, f"코드 발송 실패: {e}")
+        await pending_auths.reserve()
+    except PendingAuthFullError:
+        raise HTTPException(429, "대기 중인 인증 세션이 너무 많습니다. 잠시 후 다시 시도하세요.")
+
+    # 요청이 취소돼도(클라이언트 연결 끊김, 종료) add()까지 가지 못하면 확보한 자리를 반드시 반환
+    added = False
+    try:
+        try:
+            client = await telegram_service.send_code(req.api_id, req.api_hash, req.phone_number)
+        except Exception as e:
+            raise HTTPException(400, f"코드 발송 실패: {e}")
 
-    auth_id = str(uuid.uuid4())
-    _pending[auth_id] = {
-        "client": client,
-        "api_id": req.api_id,
-        "api_hash": req.api_hash,
-        "phone_number": req.phone_number
-    }
+        auth_id = str(uuid.uuid4())
+        added = True
+        await pending_auths.add(auth_id, client, req.api_id, req.api_hash, req.phone_number)
+    finally:
+        if not added:
+            pending_auths.release()
     log.info("code_sent", auth_id=auth_id, phone=req.phone_number, api_id=req.api_id)
     return {"auth_id": auth_id, "phase": "waiting_code", "message": "인증코드가 발송되었습니다"}
 
@@ -66,19 +73,26 @@ async def get_session_string(req: SessionStringReq):
     """
     auth_id, code, password만 받아서 세션 스트링을 반환합니다.
     """
-    pending = _pending.pop(req.auth_id, None)
+    pending = await pending_auths.pop(req.auth_id)
     if not pending:
-        raise HTTPException(404, "인증 세션이 없습니다. 인증코드를 먼저 요청하세요.")
+        raise HTTPException(404, "인증 세션이 없거나 만료되었습니다. 인증코드를 먼저 요청하세요.")
     
-    client = pending["client"]
+    client = pending.client
     try:
         session_str = await telegram_service.sign_in(
             client,
-            phone=pending["phone_number"],
+            phone=pending.phone_number,
             code=req.code,
             password=req.password
         )
-        await client.disconnect()
         return {"session_string": session_str}
     except Exception as e:
         raise HTTPException(400, f"세션 스트링 획득 실패: {e}")
+    finally:
+        # 실패해도 대기 세션은 이미 꺼냈으므로 연결을 남기지 않음
+        await client.disconnect()
+
+@router.get("/pending")
+async def pending_status():
+    """대기 중인 인증 세션(연결된 클라이언트) 수와 만료 정리 통계"""
+    return pending_auths.stats()
@@ -4,6 +4,12 @@ from typing import Optional, List, Dict
 import asyncio
 
 from app.services.worker_service import worker
+from app.services import cache_service, openai_service, response_cache
+from app.services.message_writer import message_writer
+from app.services.token_budget import window_stats
+from app.services.llm_scheduler import llm_scheduler
+from app.services.model_router import model_router
+from app.services.chat_filter import chat_filter
 from utils.logging import log
 
 router = APIRouter(prefix="/worker", tags=["worker"])
@@ -39,7 +45,7 @@ async def get_worker_status():
     return WorkerStatusResponse(
         is_running=worker.is_running,
         active_agents=len(worker.clients),
-        total_contexts=len(worker.context_cache)
+        total_contexts=len(worker.context_store)
     )
 
 @router.get("/status/detailed")
@@ -50,20 +56,40 @@ async def get_detailed_worker_status():
         tenant_id, agent_id = client_key.split(":", 1)
         
         # 해당 에이전트의 컨텍스트 수 계산
-        chat_count = sum(1 for k in worker.context_cache.keys() if k.startswith(f"{tenant_id}:{agent_id}:"))
+        chat_count = worker.context_store.count_for_agent(tenant_id, agent_id)
         
         agent_details.append({
             "tenant_id": tenant_id,
             "agent_id": agent_id,
             "is_connected": client.is_connected(),
-            "chat_count": chat_count
+            "chat_count": chat_count,
+            "connect_time_sec": worker.connect_times.get(client_key)
         })
     
     return {
         "is_running": worker.is_running,
         "active_agents": len(worker.clients),
-        "total_contexts": len(worker.context_cache),
-        "agent_details": agent_details
+        "total_contexts": len(worker.context_store),
+        "agent_details": agent_details,
+        "startup": worker.startup_stats,
+        "supervisor": worker.supervisor.stats(),
+        "quarantine": worker.quarantine_status(),
+        "reconciler": worker.reconciler.stats(),
+        "context_store": worker.context_store.stats(),
+        "summarizer": worker.summarizer.stats(),
+        "context_snapshot": worker.snapshot.stats(),
+        "chat_metadata": worker.chat_metadata.stats(),
+        "chat_filter": chat_filter.stats(),
+        "message_coalescer": worker.message_coalescer.stats(),
+        "send_scheduler": worker.send_scheduler.stats(),
+        "generations": worker.generations.stats(),
+        "cache_stats": cache_service.get_cache_stats(),
+        "response_cache": response_cache.get_stats(),
+        "message_writer": message_writer.stats(),
+        "openai_tokens": window_stats.stats(),
+        "generation": openai_service.generation_stats.stats(),
+        "model_routes": model_router.stats(),
+        "llm_scheduler": llm_scheduler.stats()
     }
 
 @router.post("/start")
@@ -133,24 +159,39 @@ async def remove_agent_from_worker(req: AgentControlRequest):
 
 @router.get("/agents")
 async def list_active_agents():
-    """활성 에이전트 목록 조회"""
+    """활성 에이전트 목록 조회 (재연결 대기/격리 중인 에이전트와 연결 상태 포함)"""
     agents = []
-    for client_key, client in worker.clients.items():
+    send_stats = worker.send_scheduler.agent_stats()
+    supervised = {entry["client_key"]: entry for entry in worker.supervisor.status()}
+    for client_key in dict.fromkeys([*supervised, *worker.clients]):
         tenant_id, agent_id = client_key.split(":", 1)
+        client = worker.clients.get(client_key)
+        status = supervised.get(client_key, {})
         
         # 해당 에이전트의 컨텍스트 수 계산
-        chat_count = sum(1 for k in worker.context_cache.keys() if k.startswith(f"{tenant_id}:{agent_id}:"))
+        chat_count = worker.context_store.count_for_agent(tenant_id, agent_id)
         
         agents.append({
             "tenant_id": tenant_id,
             "agent_id": agent_id,
-            "is_connected": client.is_connected(),
-            "chat_count": chat_count
+            "state": status.get("state"),
+            "state_sec": status.get("state_sec"),
+            "is_connected": bool(client and client.is_connected()),
+            "attempts": status.get("attempts", 0),
+            "retry_in_sec": status.get("retry_in_sec"),
+            "last_error": status.get("error"),
+            "disconnects": status.get("disconnects", 0),
+            "chat_count": chat_count,
+            "connect_time_sec": worker.connect_times.get(client_key),
+            "send": send_stats.get(client_key),
+            "chat_filter": chat_filter.agent_stats(client_key)
         })
     
     return {
         "active_agents": agents,
-        "total_count": len(agents)
+        "total_count": len(agents),
+        "states": worker.supervisor.stats()["states"],
+        "quarantined_agents": worker.quarantine_status()
     }
 
 @router.get("/agents/{tenant_id}")
@@ -162,7 +203,7 @@ async def list_tenant_agents(tenant_id: str):
             agent_id = client_key.split(":", 1)[1]
             
             # 해당 에이전트의 컨텍스트 수 계산
-            chat_count = sum(1 for k in worker.context_cache.keys() if k.startswith(f"{tenant_id}:{agent_id}:"))
+            chat_count = worker.context_store.count_for_agent(tenant_id, agent_id)
             
             agents.append({
                 "agent_id": agent_id,
@@ -180,13 +221,12 @@ async def list_tenant_agents(tenant_id: str):
 async def list_contexts():
     """컨텍스트 캐시 목록 조회"""
     contexts = []
-    for context_key, messages in worker.context_cache.items():
-        tenant_id, agent_id, chat_id = context_key.split(":", 2)
+    for entry in worker.context_store.iter_contexts():
         contexts.append({
-            "tenant_id": tenant_id,
-            "agent_id": agent_id,
-            "chat_id": chat_id,
-            "message_count": len(messages)
+            "tenant_id": entry.tenant_id,
+            "agent_id": entry.agent_id,
+            "chat_id": entry.chat_id,
+            "message_count": len(entry.messages)
         })
     
     return {
@@ -194,18 +234,21 @@ async def list_contexts():
         "total_count": len(contexts)
     }
 
+@router.get("/contexts/stats")
+async def get_context_stats():
+    """컨텍스트 저장소 메모리 사용량 조회"""
+    return worker.context_store.stats()
+
 @router.get("/contexts/{tenant_id}")
 async def list_tenant_contexts(tenant_id: str):
     """특정 테넌트의 컨텍스트 캐시 목록 조회"""
     contexts = []
-    for context_key, messages in worker.context_cache.items():
-        if context_key.startswith(f"{tenant_id}:"):
-            agent_id, chat_id = context_key.split(":", 2)[1:]
-            contexts.append({
-                "agent_id": agent_id,
-                "chat_id": chat_id,
-                "message_count": len(messages)
-            })
+    for entry in worker.context_store.iter_contexts(tenant_id):
+        contexts.append({
+            "agent_id": entry.agent_id,
+            "chat_id": entry.chat_id,
+            "message_count": len(entry.messages)
+        })
     
     return {
         "tenant_id": tenant_id,
@@ -215,10 +258,10 @@ async def list_tenant_contexts(tenant_id: str):
 
 @router.delete("/contexts/{tenant_id}/{agent_id}/{chat_id}")
 async def clear_context(tenant_id: str, agent_id: str, chat_id: str):
-    """특정 채팅방의 컨텍스트 캐시 삭제"""
-    context_key = f"{tenant_id}:{agent_id}:{chat_id}"
-    if context_key in worker.context_cache:
-        del worker.context_cache[context_key]
+    """특정 채팅방의 컨텍스트 캐시 삭제 (아직 복원되지 않은 스냅샷 레코드 포함)"""
+    removed = worker.context_store.remove(tenant_id, agent_id, chat_id)
+    discarded = worker.snapshot.discard(tenant_id, agent_id, chat_id)
+    if removed or discarded:
         log.info("Context cleared", tenant_id=tenant_id, agent_id=agent_id, chat_id=chat_id)
         return {"status": "success", "message": "Context cleared"}
     else:
@@ -226,10 +269,10 @@ async def clear_context(tenant_id: str, agent_id: str, chat_id: str):
 
 @router.delete("/contexts/{tenant_id}")
 async def clear_tenant_contexts(tenant_id: str):
-    """특정 테넌트의 모든 컨텍스트 캐시 삭제"""
-    keys_to_remove = [k for k in worker.context_cache.keys() if k.startswith(f"{tenant_id}:")]
-    for key in keys_to_remove:
-        del worker.context_cache[key]
+    """특정 테넌트의 모든 컨텍스트 캐시 삭제 (아직 복원되지 않은 스냅샷 레코드 포함)"""
+    cleared_count = worker.context_store.remove_tenant(tenant_id)
+    discarded_count = worker.snapshot.discard_tenant(tenant_id)
     
-    log.info("All contexts cleared for tenant", tenant_id=tenant_id, cleared_count=len(keys_to_remove))
-    return {"status": "success", "message": f"Cleared {len(keys_to_remove)} contexts"} 
\ No newline at end of file
+    log.info("All contexts cleared for tenant", tenant_id=tenant_id, cleared_count=cleared_count,
+             discarded_snapshot_records=discarded_count)
+    return {"status": "success", "message": f"Cleared {cleared_count} contexts"} 
\ No newline at end of file
@@ -0,0 +1,173 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set
+
+from app.services import supabase_service
+from utils.logging import get_logger
+
+if TYPE_CHECKING:
+    from app.services.worker_service import TelegramWorker
+
+logger = get_logger(__name__)
+
+
+def session_fingerprint(session_info: Dict) -> tuple:
+    """재연결이 필요한 필드(세션, API 자격증명)만 비교"""
+    return (
+        session_info.get("session_string"),
+        str(session_info.get("api_id")),
+        session_info.get("api_hash"),
+    )
+
+
+class AgentReconciler:
+    """agents 테이블과 worker.clients를 주기적으로 맞추는 reconciler
+
+    매 주기마다 활성 에이전트의 (id, updated_at)만 한 번 조회해서 diff를 계산하고,
+    새로 추가되었거나 updated_at이 바뀐 에이전트만 상세 정보를 다시 가져옵니다.
+    세션/API 자격증명이 실제로 바뀐 에이전트만 재연결하고 나머지 클라이언트는 건드리지 않습니다.
+    """
+
+    def __init__(self, worker: "TelegramWorker", interval: float):
+        self.worker = worker
+        self.interval = interval
+        self._versions: Dict[str, Any] = {}  # client_key -> 마지막으로 본 updated_at
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # updated_at 컬럼이 없으면 매 주기 전체 조회 후 fingerprint로 비교
+        self.mode = "updated_at"
+
+        self.cycles = 0
+        self.added = 0
+        self.removed = 0
+        self.reconnected = 0
+        self.last_cycle_ms = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def start(self):
+        if not self.enabled or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info("Agent reconciler started", interval=self.interval)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._versions.clear()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error("Agent reconcile failed", error=str(e))
+
+    async def run_once(self) -> Dict[str, int]:
+        """한 주기 실행 - 추가/제거/재연결 수 반환"""
+        async with self._lock:
+            started = time.perf_counter()
+            desired = await self._load_desired()
+
+            current: Set[str] = set(self.worker.clients) | set(self.worker.supervisor.keys())
+            to_remove = current - set(desired)
+            to_add = [key for key in desired if key not in current]
+            changed = [
+                key for key in desired
+                if key in current and self._versions.get(key, desired[key]["version"]) != desired[key]["version"]
+            ]
+
+            # 새로 추가되었거나 updated_at이 바뀐 에이전트만 상세 조회
+            fetched = await self._load_sessions(desired, to_add + changed)
+
+            result = {"added": 0, "removed": 0, "reconnected": 0}
+            for key in to_remove:
+                tenant_id, agent_id = key.split(":", 1)
+                if await self.worker.remove_agent(tenant_id, agent_id):
+                    result["removed"] += 1
+                self._versions.pop(key, None)
+
+            add_jobs = [self.worker._start_agent(fetched[key]) for key in to_add if key in fetched]
+            reconnect_jobs = []
+            for key in changed:
+                new_info = fetched.get(key)
+                old_info = self.worker.known_session(key)
+                # name 등 다른 컬럼만 바뀐 경우는 재연결하지 않음
+                if new_info and (old_info is None or session_fingerprint(new_info) != session_fingerprint(old_info)):
+                    reconnect_jobs.append(self.worker.reconnect_agent(new_info))
+
+            outcomes = await asyncio.gather(*add_jobs, *reconnect_jobs)
+            result["added"] = sum(1 for ok in outcomes[:len(add_jobs)] if ok)
+            result["reconnected"] = len(reconnect_jobs)
+
+            for key, row in desired.items():
+                self._versions[key] = row["version"]
+
+            self.cycles += 1
+            self.added += result["added"]
+            self.removed += result["removed"]
+            self.reconnected += result["reconnected"]
+            self.last_cycle_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.last_error = None
+            if any(result.values()):
+                logger.info("Agents reconciled", mode=self.mode, **result)
+            return result
+
+    async def _load_desired(self) -> Dict[str, Dict]:
+        """client_key -> {"agent_id", "version", ("session_info")} (이 샤드가 담당하는 에이전트만)"""
+        if self.mode == "updated_at":
+            try:
+                rows = await supabase_service.list_active_agent_versions_async()
+                return {
+                    f"{row['tenant_id']}:{row['id']}": {"agent_id": row["id"], "version": row.get("updated_at")}
+                    for row in rows
+                    if self.worker.owns_agent(row["id"])
+                }
+            except Exception as e:
+                # 컬럼이 없는 스키마만 전환하고, 일시적인 조회 오류는 이번 주기를 건너뜀
+                if "updated_at" not in str(e):
+                    raise
+                logger.warning("agents.updated_at 컬럼 없음, fingerprint 비교로 전환", error=str(e))
+                self.mode = "fingerprint"
+
+        sessions = await supabase_service.list_active_agent_sessions_async()
+        return {
+            f"{info['tenant_id']}:{info['agent_id']}": {
+                "agent_id": info["agent_id"],
+                "version": session_fingerprint(info),
+                "session_info": info,
+            }
+            for info in sessions
+            if self.worker.owns_agent(info["agent_id"])
+        }
+
+    async def _load_sessions(self, desired: Dict[str, Dict], keys: list) -> Dict[str, Dict]:
+        if not keys:
+            return {}
+        if self.mode == "fingerprint":
+            return {key: desired[key]["session_info"] for key in keys}
+        sessions = await supabase_service.get_agent_sessions_by_ids_async([desired[key]["agent_id"] for key in keys])
+        return {f"{info['tenant_id']}:{info['agent_id']}": info for info in sessions}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "interval_sec": self.interval,
+            "mode": self.mode,
+            "cycles": self.cycles,
+            "added": self.added,
+            "removed": self.removed,
+            "reconnected": self.reconnected,
+            "last_cycle_ms": self.last_cycle_ms,
+            "last_error": self.last_error,
+        }
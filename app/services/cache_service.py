@@ -0,0 +1,176 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.config import settings
+from app.services.chat_filter import chat_filter
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class TTLCache:
+    """TTL + LRU 기반 인메모리 캐시 (None 결과는 음성 캐시로 짧게 보관)"""
+
+    def __init__(self, name: str, maxsize: int, ttl: float, negative_ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """(hit 여부, 값) 반환 - 만료된 항목은 miss로 처리"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return False, None
+
+        self._data.move_to_end(key)
+        if value is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return True, value
+
+    def set(self, key: Hashable, value: Any):
+        """값 저장 (None이면 negative_ttl 적용)"""
+        ttl = self.negative_ttl if value is None else self.ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """단일 키 무효화"""
+        if self._data.pop(key, None) is not None:
+            self.invalidations += 1
+            return True
+        return False
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """조건에 맞는 키 일괄 무효화"""
+        keys = [k for k in self._data if predicate(k)]
+        for key in keys:
+            del self._data[key]
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_sec": self.ttl,
+            "negative_ttl_sec": self.negative_ttl,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# (tenant_id, agent_id, chat_id) -> 매핑 설정 또는 None
+mapping_cache = TTLCache(
+    "mappings",
+    maxsize=settings.mapping_cache_maxsize,
+    ttl=settings.mapping_cache_ttl_sec,
+    negative_ttl=settings.mapping_cache_negative_ttl_sec,
+)
+
+# (tenant_id, persona_id) -> 페르소나 또는 None
+persona_cache = TTLCache(
+    "personas",
+    maxsize=settings.persona_cache_maxsize,
+    ttl=settings.persona_cache_ttl_sec,
+    negative_ttl=settings.persona_cache_negative_ttl_sec,
+)
+
+# (tenant_id, persona_id, role, mode) -> (원본 페르소나 프롬프트, 컴파일된 프롬프트 prefix)
+prompt_prefix_cache = TTLCache(
+    "prompt_prefixes",
+    maxsize=settings.prompt_prefix_cache_maxsize,
+    ttl=settings.persona_cache_ttl_sec,
+    negative_ttl=0,
+)
+
+# (tenant_id, persona_id, role, 정규화 메시지, 컨텍스트 fingerprint) -> (응답 목록, 생성 소요 시간)
+response_cache = TTLCache(
+    "responses",
+    maxsize=settings.response_cache_maxsize,
+    ttl=settings.response_cache_ttl_sec,
+    negative_ttl=0,
+)
+
+
+def mapping_key(tenant_id: str, agent_id: str, chat_id) -> Tuple[str, str, str]:
+    """chat_id는 int/str 모두 들어오므로 문자열로 정규화"""
+    return (str(tenant_id), str(agent_id), str(chat_id))
+
+
+def persona_key(tenant_id: str, persona_id: str) -> Tuple[str, str]:
+    return (str(tenant_id), str(persona_id))
+
+
+def prompt_prefix_key(persona_cache_key: Tuple[str, str], role: str, mode: str) -> Tuple[str, str, str, str]:
+    return (*persona_cache_key, role, mode)
+
+
+# ===== 무효화 훅 (supabase_service 쓰기 함수에서 호출) =====
+def invalidate_mapping(tenant_id: str, agent_id: str, chat_id):
+    """특정 매핑 캐시 무효화 (이벤트 필터도 해당 채팅방을 통과시킴)"""
+    mapping_cache.invalidate(mapping_key(tenant_id, agent_id, chat_id))
+    chat_filter.note_changed(tenant_id, agent_id, chat_id)
+    logger.debug("매핑 캐시 무효화", tenant_id=tenant_id, agent_id=agent_id, chat_id=chat_id)
+
+
+def invalidate_agent_mappings(tenant_id: str, agent_id: str):
+    """에이전트의 모든 매핑 캐시 무효화"""
+    prefix = (str(tenant_id), str(agent_id))
+    count = mapping_cache.invalidate_where(lambda k: k[:2] == prefix)
+    logger.debug("에이전트 매핑 캐시 무효화", tenant_id=tenant_id, agent_id=agent_id, count=count)
+
+
+def invalidate_persona(tenant_id: str, persona_id: str):
+    """페르소나 캐시 무효화"""
+    key = persona_key(tenant_id, persona_id)
+    persona_cache.invalidate(key)
+    prompt_prefix_cache.invalidate_where(lambda k: k[:2] == key)
+    response_cache.invalidate_where(lambda k: k[:2] == key)
+    logger.debug("페르소나 캐시 무효화", tenant_id=tenant_id, persona_id=persona_id)
+
+
+def clear_all():
+    mapping_cache.clear()
+    persona_cache.clear()
+    prompt_prefix_cache.clear()
+    response_cache.clear()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """캐시 hit/miss 통계"""
+    return {
+        "mappings": mapping_cache.stats(),
+        "personas": persona_cache.stats(),
+        "prompt_prefixes": prompt_prefix_cache.stats(),
+        "responses": response_cache.stats(),
+    }
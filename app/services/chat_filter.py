@@ -0,0 +1,166 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional
+
+from app.config import settings
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# agent_id 목록 -> 매핑 행 [{"tenant_id", "agent_id", "chat_id"}]
+MappedChatsLoader = Callable[[List[str]], Awaitable[List[Dict]]]
+
+
+class _AgentChats:
+    """에이전트 하나의 매핑된 채팅방과 필터 카운터"""
+
+    __slots__ = ("chat_ids", "added", "version", "loaded_at", "filtered", "passed")
+
+    def __init__(self):
+        self.chat_ids: Optional[FrozenSet[str]] = None  # None이면 아직 로드 전 (모두 통과)
+        self.added: FrozenSet[str] = frozenset()  # 마지막 로드 이후 저장/수정된 채팅방 (다음 로드까지 통과)
+        self.version = 0
+        self.loaded_at = 0.0
+        self.filtered = 0
+        self.passed = 0
+
+
+class ChatFilterIndex:
+    """에이전트별 매핑된 채팅방 인덱스 - Telethon NewMessage 핸들러의 func 필터로 사용
+
+    매핑이 없는 채팅방의 이벤트는 핸들러 코루틴이 만들어지기 전에 버려집니다 (로그/DB 조회 없음).
+    - 클라이언트 연결 시 에이전트의 매핑을 로드하고, refresh_interval마다 전체를 다시 로드 (다른 프로세스의 변경 반영)
+    - 같은 프로세스의 매핑 저장/수정/삭제는 cache_service 무효화 훅으로 바로 반영 - 해당 채팅방은 다음 로드까지 통과시키고
+      삭제 여부는 핸들러의 매핑 조회가 판단하므로, 목록이 오래돼도 매핑된 채팅방을 버리는 일은 없음
+    - 로드 전이거나 로드에 실패한 에이전트는 모두 통과
+    """
+
+    def __init__(self, enabled: bool, refresh_interval: float, batch_size: int = 100):
+        self.enabled = enabled
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.loader: Optional[MappedChatsLoader] = None
+
+        self._agents: Dict[str, _AgentChats] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.filtered = 0
+        self.passed = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.last_refresh_ms: Optional[float] = None
+
+    def allows(self, agent_key: str, chat_id) -> bool:
+        """매핑된 채팅방(또는 아직 목록이 없는 에이전트)의 이벤트인지"""
+        entry = self._agents.get(agent_key)
+        if entry is None or entry.chat_ids is None:
+            self.passed += 1
+            return True
+        key = str(chat_id)
+        if key in entry.chat_ids or key in entry.added:
+            entry.passed += 1
+            self.passed += 1
+            return True
+        entry.filtered += 1
+        self.filtered += 1
+        return False
+
+    def event_filter(self, agent_key: str) -> Optional[Callable[[Any], bool]]:
+        """events.NewMessage(func=...)에 넘길 필터 (비활성화면 None)"""
+        if not self.enabled:
+            return None
+
+        def accept(event) -> bool:
+            return self.allows(agent_key, event.chat_id)
+        return accept
+
+    async def load(self, agent_keys: List[str]) -> int:
+        """에이전트들의 매핑된 채팅방 다시 로드 (실패하면 예외, 기존 목록은 유지)"""
+        if not self.enabled or self.loader is None or not agent_keys:
+            return 0
+        entries = {key: self._agents.setdefault(key, _AgentChats()) for key in agent_keys}
+        versions = {key: entry.version for key, entry in entries.items()}
+        loaded: Dict[str, set] = {key: set() for key in entries}
+        agent_ids = [key.split(":", 1)[1] for key in entries]
+        for i in range(0, len(agent_ids), self.batch_size):
+            for row in await self.loader(agent_ids[i:i + self.batch_size]):
+                chats = loaded.get(f"{row['tenant_id']}:{row['agent_id']}")
+                if chats is not None:
+                    chats.add(str(row["chat_id"]))
+
+        now = time.monotonic()
+        for key, chats in loaded.items():
+            entry = self._agents.get(key)
+            if entry is not entries[key]:
+                continue  # 로드 중에 제거된 에이전트
+            entry.chat_ids = frozenset(chats)
+            # 로드 중에 바뀐 매핑은 다음 로드가 반영할 때까지 계속 통과
+            if entry.version == versions[key]:
+                entry.added = frozenset()
+            entry.loaded_at = now
+        return len(loaded)
+
+    def note_changed(self, tenant_id: str, agent_id: str, chat_id):
+        """매핑 저장/수정/삭제 훅"""
+        entry = self._agents.get(f"{tenant_id}:{agent_id}")
+        if entry is None:
+            return
+        entry.version += 1
+        entry.added = entry.added | {str(chat_id)}
+
+    def remove_agent(self, agent_key: str):
+        self._agents.pop(agent_key, None)
+
+    def start(self):
+        if self.enabled and self.refresh_interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._agents.clear()
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            started = time.perf_counter()
+            try:
+                await self.load(list(self._agents))
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.warning("채팅방 필터 갱신 실패 - 기존 목록 유지", error=str(e))
+                continue
+            self.refreshes += 1
+            self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def agent_stats(self, agent_key: str) -> Optional[Dict[str, Any]]:
+        entry = self._agents.get(agent_key)
+        if entry is None:
+            return None
+        return {
+            "mapped_chats": len(entry.chat_ids) if entry.chat_ids is not None else None,
+            "filtered": entry.filtered,
+            "passed": entry.passed,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "agents": len(self._agents),
+            "unloaded_agents": sum(1 for entry in self._agents.values() if entry.chat_ids is None),
+            "mapped_chats": sum(len(entry.chat_ids) for entry in self._agents.values() if entry.chat_ids),
+            "filtered": self.filtered,
+            "passed": self.passed,
+            "refresh_interval_sec": self.refresh_interval,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "last_refresh_ms": self.last_refresh_ms,
+        }
+
+
+chat_filter = ChatFilterIndex(
+    enabled=settings.chat_filter_enabled,
+    refresh_interval=settings.chat_filter_refresh_sec,
+)
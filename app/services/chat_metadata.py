@@ -0,0 +1,161 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 채팅 엔티티 조회 (event.get_chat 등)
+FetchChat = Callable[[], Awaitable[Any]]
+
+# 조회 실패 시 재시도까지 대기 (초)
+NEGATIVE_TTL = 30
+
+
+class ChatMeta:
+    """채팅방 메타데이터와 최근 발화자"""
+
+    __slots__ = ("title", "participants_count", "is_group", "expires_at", "speakers")
+
+    def __init__(self):
+        self.title: Optional[str] = None
+        self.participants_count: Optional[int] = None
+        self.is_group = False
+        self.expires_at = 0.0
+        # 발화자 표시 이름 -> None (뒤쪽이 가장 최근)
+        self.speakers: "OrderedDict[str, None]" = OrderedDict()
+
+
+def speaker_name(event) -> Optional[str]:
+    """이벤트 발신자의 표시 이름 (이미 캐시된 엔티티만 사용하고 추가 조회는 하지 않음)"""
+    sender = getattr(event, "sender", None)
+    if sender is not None:
+        username = getattr(sender, "username", None)
+        if username:
+            return f"@{username}"
+        first_name = getattr(sender, "first_name", None)
+        if first_name:
+            return first_name
+    sender_id = getattr(event, "sender_id", None)
+    return f"user_{sender_id}" if sender_id is not None else None
+
+
+class ChatMetadataCache:
+    """에이전트별 채팅 메타데이터 TTL 캐시 + 최근 발화자 샘플
+
+    - 메타데이터(get_chat)는 필요할 때만 조회하고 TTL 동안 재사용, 같은 채팅방 동시 조회는 한 번으로 합침
+    - 참여자 목록은 전체 멤버 대신 최근 메시지를 보낸 발화자 max_speakers명만 유지
+    - 에이전트당 max_chats개 채팅방 LRU
+    """
+
+    def __init__(self, ttl: float, max_chats_per_agent: int, max_speakers: int):
+        self.ttl = ttl
+        self.max_chats_per_agent = max_chats_per_agent
+        self.max_speakers = max_speakers
+
+        # agent_key -> {chat_key: ChatMeta} (앞쪽이 가장 오래전에 사용된 채팅방)
+        self._agents: Dict[str, "OrderedDict[str, ChatMeta]"] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.failures = 0
+        self.evictions = 0
+
+    def _entry(self, agent_key: str, chat_key: str) -> ChatMeta:
+        chats = self._agents.setdefault(agent_key, OrderedDict())
+        entry = chats.get(chat_key)
+        if entry is None:
+            entry = chats[chat_key] = ChatMeta()
+            while len(chats) > self.max_chats_per_agent:
+                chats.popitem(last=False)
+                self.evictions += 1
+        else:
+            chats.move_to_end(chat_key)
+        return entry
+
+    def note_speaker(self, agent_key: str, chat_id, name: Optional[str]):
+        """메시지 발화자 기록 (가장 최근 발화자가 뒤로)"""
+        if not name:
+            return
+        speakers = self._entry(agent_key, str(chat_id)).speakers
+        speakers[name] = None
+        speakers.move_to_end(name)
+        if len(speakers) > self.max_speakers:
+            speakers.popitem(last=False)
+
+    def participants(self, agent_key: str, chat_id, limit: int) -> List[str]:
+        """최근 발화자부터 limit명"""
+        chats = self._agents.get(agent_key)
+        entry = chats.get(str(chat_id)) if chats else None
+        if entry is None:
+            return []
+        result = []
+        for name in reversed(entry.speakers):
+            if len(result) >= limit:
+                break
+            result.append(name)
+        return result
+
+    async def get(self, agent_key: str, chat_id, fetch: FetchChat) -> ChatMeta:
+        """메타데이터 반환 - 만료됐으면 fetch로 다시 조회 (동시 요청은 진행 중인 조회를 공유)"""
+        chat_key = str(chat_id)
+        entry = self._entry(agent_key, chat_key)
+        if entry.expires_at > time.monotonic():
+            self.hits += 1
+            return entry
+
+        key = (agent_key, chat_key)
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(entry, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+        # 한 호출자가 취소돼도 공유 중인 조회는 계속
+        return await asyncio.shield(task)
+
+    async def _fetch(self, entry: ChatMeta, fetch: FetchChat) -> ChatMeta:
+        try:
+            chat = await fetch()
+        except Exception as e:
+            self.failures += 1
+            entry.expires_at = time.monotonic() + min(self.ttl, NEGATIVE_TTL)
+            logger.debug("채팅 메타데이터 조회 실패", error=str(e))
+            return entry
+        entry.title = getattr(chat, "title", None)
+        # 그룹/채널 엔티티에만 participants_count 속성이 있음 (채널은 None일 수 있음)
+        entry.is_group = hasattr(chat, "participants_count")
+        entry.participants_count = getattr(chat, "participants_count", None)
+        entry.expires_at = time.monotonic() + self.ttl
+        return entry
+
+    def remove_agent(self, agent_key: str) -> int:
+        chats = self._agents.pop(agent_key, None) or {}
+        return len(chats)
+
+    def clear(self):
+        self._agents.clear()
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.shared
+        return {
+            "agents": len(self._agents),
+            "chats": sum(len(chats) for chats in self._agents.values()),
+            "tracked_speakers": sum(len(entry.speakers) for chats in self._agents.values() for entry in chats.values()),
+            "ttl_sec": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_fetches": self.shared,
+            "hit_rate": round((self.hits + self.shared) / lookups, 4) if lookups else 0.0,
+            "failures": self.failures,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,226 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 에이전트 클라이언트 상태
+CONNECTING = "connecting"
+CONNECTED = "connected"
+BACKOFF = "backoff"
+QUARANTINED = "quarantined"
+
+# session_info로 클라이언트를 연결해 반환 (실패 시 예외)
+ConnectFunc = Callable[[Dict], Awaitable[Any]]
+# 연결이 끊긴 클라이언트 정리
+LostFunc = Callable[[str], Awaitable[None]]
+
+
+class SupervisedAgent:
+    """에이전트 하나의 연결 상태와 재시도 정보"""
+
+    __slots__ = ("client_key", "session_info", "state", "state_since", "client", "task", "first_attempt",
+                 "attempts", "quarantines", "reason", "error", "retry_at", "connects", "disconnects")
+
+    def __init__(self, client_key: str, session_info: Dict):
+        self.client_key = client_key
+        self.session_info = session_info
+        self.state = CONNECTING
+        self.state_since = time.monotonic()
+        self.client: Any = None
+        self.task: Optional[asyncio.Task] = None
+        # 첫 연결 시도 결과 (start()가 기다림)
+        self.first_attempt: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.attempts = 0  # 연속 실패 횟수 (연결되면 0)
+        self.quarantines = 0  # 연속 격리 횟수 (연결되면 0)
+        self.reason: Optional[str] = None
+        self.error: Optional[str] = None
+        self.retry_at = 0.0
+        self.connects = 0
+        self.disconnects = 0
+
+
+class ClientSupervisor:
+    """에이전트별 TelegramClient 감독 태스크
+
+    에이전트마다 태스크 하나가 연결 → 연결 유지(client.disconnected 대기) → 재연결을 반복하므로
+    한 클라이언트가 실패하거나 끊겨도 다른 에이전트에는 영향이 없습니다.
+    - connecting: 연결 시도 중
+    - connected: 연결됨 (끊기면 on_lost 호출 후 backoff)
+    - backoff: 연속 실패 max_retries회까지 지수 backoff(+jitter) 후 재연결
+    - quarantined: 재시도 한도 초과 또는 fatal_errors(인증 실패 등) - 긴 간격으로만 재시도
+    """
+
+    def __init__(self, connect: ConnectFunc, on_lost: LostFunc,
+                 base_backoff: float, max_backoff: float, max_retries: int,
+                 quarantine_base_backoff: float, quarantine_max_backoff: float,
+                 fatal_errors: Tuple[Type[BaseException], ...] = ()):
+        self._connect = connect
+        self._on_lost = on_lost
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self.quarantine_base_backoff = quarantine_base_backoff
+        self.quarantine_max_backoff = quarantine_max_backoff
+        self.fatal_errors = fatal_errors
+        self._agents: Dict[str, SupervisedAgent] = {}
+
+        self.connects = 0
+        self.failures = 0
+        self.disconnects = 0
+        self.quarantined = 0
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def __contains__(self, client_key: str) -> bool:
+        return client_key in self._agents
+
+    def keys(self) -> List[str]:
+        return list(self._agents)
+
+    def get(self, client_key: str) -> Optional[SupervisedAgent]:
+        return self._agents.get(client_key)
+
+    async def start(self, session_info: Dict) -> bool:
+        """에이전트 감독 시작 - 첫 연결 시도 결과 반환 (실패해도 감독 태스크가 계속 재시도)"""
+        client_key = f"{session_info['tenant_id']}:{session_info['agent_id']}"
+        entry = self._agents.get(client_key)
+        if entry is None or entry.task.done():
+            entry = self._agents[client_key] = SupervisedAgent(client_key, session_info)
+            entry.task = asyncio.create_task(self._run(entry))
+        # 호출자가 취소돼도 감독 태스크는 계속
+        return await asyncio.shield(entry.first_attempt)
+
+    async def stop(self, client_key: str) -> Optional[SupervisedAgent]:
+        """감독 중지 (클라이언트 연결 해제는 호출자가 담당)"""
+        entry = self._agents.pop(client_key, None)
+        if entry is not None:
+            entry.task.cancel()
+            await asyncio.gather(entry.task, return_exceptions=True)
+            if not entry.first_attempt.done():
+                entry.first_attempt.set_result(False)
+        return entry
+
+    async def stop_all(self):
+        entries = list(self._agents.values())
+        self._agents.clear()
+        for entry in entries:
+            entry.task.cancel()
+        await asyncio.gather(*(entry.task for entry in entries), return_exceptions=True)
+        for entry in entries:
+            if not entry.first_attempt.done():
+                entry.first_attempt.set_result(False)
+
+    def _set_state(self, entry: SupervisedAgent, state: str):
+        entry.state = state
+        entry.state_since = time.monotonic()
+
+    async def _run(self, entry: SupervisedAgent):
+        while True:
+            self._set_state(entry, CONNECTING)
+            try:
+                entry.client = await self._connect(entry.session_info)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                entry.client = None
+                self._failed(entry, e, "timeout" if isinstance(e, asyncio.TimeoutError) else None)
+            else:
+                entry.attempts = 0
+                entry.quarantines = 0
+                entry.connects += 1
+                self.connects += 1
+                self._set_state(entry, CONNECTED)
+                if not entry.first_attempt.done():
+                    entry.first_attempt.set_result(True)
+
+                error = await self._wait_disconnected(entry.client)
+                entry.client = None
+                entry.disconnects += 1
+                self.disconnects += 1
+                try:
+                    await self._on_lost(entry.client_key)
+                except Exception as e:
+                    logger.warning("Lost client cleanup failed", client_key=entry.client_key, error=str(e))
+                self._failed(entry, error or ConnectionError("client disconnected"), "disconnected")
+
+            if not entry.first_attempt.done():
+                entry.first_attempt.set_result(False)
+            await asyncio.sleep(max(0.0, entry.retry_at - time.monotonic()))
+
+    @staticmethod
+    async def _wait_disconnected(client) -> Optional[BaseException]:
+        """Telethon 자동 재연결이 포기하거나 업데이트 처리 오류로 끊길 때까지 대기"""
+        try:
+            # 감독 태스크가 취소돼도 클라이언트의 future는 건드리지 않음
+            await asyncio.shield(client.disconnected)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return e
+        return None
+
+    def _failed(self, entry: SupervisedAgent, error: BaseException, reason: Optional[str] = None):
+        """실패 기록 후 다음 재시도 시각 결정 (지수 backoff, 지연의 절반~전체 사이 jitter)"""
+        fatal = isinstance(error, self.fatal_errors)
+        entry.attempts += 1
+        entry.reason = reason or ("auth" if fatal else "error")
+        entry.error = str(error) or type(error).__name__
+        self.failures += 1
+
+        if fatal or entry.attempts > self.max_retries:
+            entry.quarantines += 1
+            self.quarantined += 1
+            delay = min(self.quarantine_base_backoff * (2 ** (entry.quarantines - 1)), self.quarantine_max_backoff)
+            self._set_state(entry, QUARANTINED)
+        else:
+            delay = min(self.base_backoff * (2 ** (entry.attempts - 1)), self.max_backoff)
+            self._set_state(entry, BACKOFF)
+        delay = random.uniform(delay / 2, delay)
+        entry.retry_at = time.monotonic() + delay
+
+        tenant_id, agent_id = entry.client_key.split(":", 1)
+        log = logger.error if entry.state == QUARANTINED else logger.warning
+        log("Agent quarantined" if entry.state == QUARANTINED else "Agent connection failed - retrying",
+            tenant_id=tenant_id,
+            agent_id=agent_id,
+            reason=entry.reason,
+            error=entry.error,
+            attempts=entry.attempts,
+            retry_in_sec=round(delay, 1))
+
+    def status(self) -> List[Dict[str, Any]]:
+        """에이전트별 상태 (상태 조회용)"""
+        now = time.monotonic()
+        return [
+            {
+                "client_key": entry.client_key,
+                "state": entry.state,
+                "state_sec": round(now - entry.state_since, 1),
+                "attempts": entry.attempts,
+                "reason": entry.reason,
+                "error": entry.error,
+                "retry_in_sec": max(0, round(entry.retry_at - now, 1)) if entry.state in (BACKOFF, QUARANTINED) else None,
+                "connects": entry.connects,
+                "disconnects": entry.disconnects,
+            }
+            for entry in self._agents.values()
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        states = {CONNECTING: 0, CONNECTED: 0, BACKOFF: 0, QUARANTINED: 0}
+        for entry in self._agents.values():
+            states[entry.state] += 1
+        return {
+            "agents": len(self._agents),
+            "states": states,
+            "max_retries": self.max_retries,
+            "connects": self.connects,
+            "failures": self.failures,
+            "disconnects": self.disconnects,
+            "quarantined": self.quarantined,
+        }
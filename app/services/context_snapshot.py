@@ -0,0 +1,324 @@
+import asyncio
+import json
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.context_store import ContextStore
+from app.services.message_coalescer import MessageCoalescer
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 파일 구조 (모두 little-endian)
+#   MAGIC
+#   레코드 * N        : u32 길이 + zlib(JSON)
+#   인덱스 * N        : u8 종류 + u16 key 길이 + key + u64 레코드 위치 + u32 레코드 길이 + f64 마지막 접근(wall)
+#   footer           : u64 인덱스 위치 + u32 레코드 수 + f64 저장 시각 + MAGIC
+# 시작 시에는 footer와 인덱스만 읽고, 레코드는 채팅방이 처음 사용될 때 하나씩 읽습니다.
+MAGIC = b"CTXSNP01"
+_LENGTH = struct.Struct("<I")
+_INDEX_HEAD = struct.Struct("<BH")
+_INDEX_TAIL = struct.Struct("<QId")
+_FOOTER = struct.Struct("<QId8s")
+
+KIND_CONTEXT = 1
+KIND_PENDING = 2
+
+# (종류, key) -> (레코드 위치, 레코드 길이, 마지막 접근 wall 시각)
+IndexKey = Tuple[int, str]
+IndexEntry = Tuple[int, int, float]
+
+
+def _encode(payload: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(), 1)
+
+
+def _decode(data: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(data))
+
+
+def _write_file(path: str, records: List[Tuple[int, str, float, bytes]],
+                carried: List[Tuple[int, str, float, int, int]], source_fd: Optional[int]) -> Dict[IndexKey, IndexEntry]:
+    """임시 파일에 쓰고 교체 (스레드에서 실행) - 새 인덱스 반환
+
+    carried는 이전 스냅샷에서 아직 읽히지 않은 레코드로, 원본 바이트를 그대로 복사합니다.
+    """
+    index: Dict[IndexKey, IndexEntry] = {}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        offset = len(MAGIC)
+
+        def put(kind: int, key: str, last_wall: float, record: bytes):
+            nonlocal offset
+            f.write(record)
+            index[(kind, key)] = (offset, len(record), last_wall)
+            offset += len(record)
+
+        for kind, key, last_wall, payload in records:
+            put(kind, key, last_wall, _LENGTH.pack(len(payload)) + payload)
+        for kind, key, last_wall, old_offset, length in carried:
+            put(kind, key, last_wall, os.pread(source_fd, length, old_offset))
+
+        index_offset = offset
+        for (kind, key), (record_offset, length, last_wall) in index.items():
+            encoded_key = key.encode()
+            f.write(_INDEX_HEAD.pack(kind, len(encoded_key)) + encoded_key + _INDEX_TAIL.pack(record_offset, length, last_wall))
+        f.write(_FOOTER.pack(index_offset, len(index), time.time(), MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return index
+
+
+def _read_index(fd: int) -> Tuple[Dict[IndexKey, IndexEntry], float]:
+    """footer와 인덱스만 읽음 - (인덱스, 저장 시각)"""
+    size = os.fstat(fd).st_size
+    if size < len(MAGIC) + _FOOTER.size or os.pread(fd, len(MAGIC), 0) != MAGIC:
+        raise ValueError("not a context snapshot")
+    index_offset, count, saved_at, magic = _FOOTER.unpack(os.pread(fd, _FOOTER.size, size - _FOOTER.size))
+    if magic != MAGIC:
+        raise ValueError("truncated context snapshot")
+
+    raw = os.pread(fd, size - _FOOTER.size - index_offset, index_offset)
+    index: Dict[IndexKey, IndexEntry] = {}
+    pos = 0
+    for _ in range(count):
+        kind, key_length = _INDEX_HEAD.unpack_from(raw, pos)
+        pos += _INDEX_HEAD.size
+        key = raw[pos:pos + key_length].decode()
+        pos += key_length
+        index[(kind, key)] = _INDEX_TAIL.unpack_from(raw, pos)
+        pos += _INDEX_TAIL.size
+    return index, saved_at
+
+
+class ContextSnapshot:
+    """채팅 컨텍스트와 debounce 버퍼를 로컬 파일에 스냅샷/복원
+
+    - 종료 시와 interval마다 저장 (파일 쓰기는 스레드에서, 임시 파일 후 교체)
+    - 시작 시에는 인덱스만 읽고, 채팅방이 처음 사용될 때 그 레코드만 읽어 복원 (ContextStore.loader)
+    - 조각 메시지는 에이전트가 연결될 때 꺼내서 debounce 타이머를 다시 걸어 스스로 처리되게 함 (take_pending)
+    - 아직 복원되지 않은 채팅방은 다음 저장 때 원본 레코드를 그대로 옮겨 유지
+    - 유휴 TTL이 지난 컨텍스트와 pending_ttl이 지난 조각 메시지는 복원하지 않음
+    """
+
+    def __init__(self, path: str, enabled: bool, interval: float, idle_ttl: float, pending_ttl: float):
+        self.path = path
+        self.enabled = enabled
+        self.interval = interval
+        self.idle_ttl = idle_ttl
+        self.pending_ttl = pending_ttl
+
+        self._fd: Optional[int] = None
+        self._index: Dict[IndexKey, IndexEntry] = {}
+        self._save_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.saves = 0
+        self.save_failures = 0
+        self.last_save: Dict[str, Any] = {}
+        self.last_open: Dict[str, Any] = {}
+        self.restored_chats = 0
+        self.restored_pending = 0
+        self.expired = 0
+        self.load_failures = 0
+        self._load_seconds = 0.0
+
+    def open(self):
+        """스냅샷 인덱스 로드 (레코드는 읽지 않음)"""
+        if not self.enabled or not os.path.exists(self.path):
+            return
+        started = time.monotonic()
+        self._close()
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+            index, saved_at = _read_index(fd)
+        except (OSError, ValueError, struct.error, UnicodeDecodeError) as e:
+            logger.warning("컨텍스트 스냅샷 로드 실패 - 무시", path=self.path, error=str(e))
+            return
+        self._fd, self._index = fd, index
+        self.last_open = {
+            "records": len(index),
+            "age_sec": round(time.time() - saved_at, 1),
+            "index_load_ms": round((time.monotonic() - started) * 1000, 2),
+        }
+        logger.info("컨텍스트 스냅샷 인덱스 로드", path=self.path, **self.last_open)
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._index = {}
+
+    def _take(self, kind: int, key: str, ttl: float) -> Optional[Dict[str, Any]]:
+        """인덱스에서 빼면서 레코드 하나를 읽음 (한 번만 복원)"""
+        entry = self._index.pop((kind, key), None)
+        if entry is None:
+            return None
+        offset, length, last_wall = entry
+        if time.time() - last_wall > ttl:
+            self.expired += 1
+            return None
+        started = time.monotonic()
+        try:
+            data = os.pread(self._fd, length, offset)
+            payload = _decode(data[_LENGTH.size:_LENGTH.size + _LENGTH.unpack_from(data)[0]])
+        except (OSError, ValueError, zlib.error, struct.error) as e:
+            self.load_failures += 1
+            logger.warning("컨텍스트 스냅샷 레코드 복원 실패", key=key, error=str(e))
+            return None
+        self._load_seconds += time.monotonic() - started
+        payload["last_wall"] = last_wall
+        return payload
+
+    def load_context(self, key: str) -> Optional[Dict[str, Any]]:
+        """ContextStore.loader - {"messages", "summary", "summary_source_tokens", "idle_sec"}"""
+        payload = self._take(KIND_CONTEXT, key, self.idle_ttl)
+        if payload is None:
+            return None
+        self.restored_chats += 1
+        return {
+            "messages": payload["m"],
+            "summary": payload.get("s", ""),
+            "summary_source_tokens": payload.get("t", 0),
+            "idle_sec": max(0.0, time.time() - payload["last_wall"]),
+        }
+
+    def take_pending(self, agent_key: str) -> List[Tuple[str, List[str]]]:
+        """에이전트가 연결될 때 재시작 전에 모이던 조각 메시지를 꺼냄 - [(chat_key, 조각 목록)]"""
+        prefix = f"{agent_key}:"
+        result = []
+        for kind, key in [index_key for index_key in self._index if index_key[0] == KIND_PENDING]:
+            if not key.startswith(prefix):
+                continue
+            payload = self._take(KIND_PENDING, key, self.pending_ttl)
+            if payload is not None:
+                self.restored_pending += 1
+                result.append((key[len(prefix):], payload["f"]))
+        return result
+
+    def discard(self, tenant_id: str, agent_id: str, chat_id) -> int:
+        """삭제된 채팅방의 미복원 레코드(컨텍스트/조각 메시지) 폐기"""
+        key = ContextStore.make_key(tenant_id, agent_id, chat_id)
+        return sum(1 for kind in (KIND_CONTEXT, KIND_PENDING) if self._index.pop((kind, key), None) is not None)
+
+    def discard_agent(self, tenant_id: str, agent_id: str) -> int:
+        """제거된 에이전트의 미복원 레코드 폐기"""
+        return self._discard_prefix(ContextStore.make_key(tenant_id, agent_id, ""))
+
+    def discard_tenant(self, tenant_id: str) -> int:
+        """테넌트의 미복원 레코드 폐기"""
+        return self._discard_prefix(f"{tenant_id}:")
+
+    def _discard_prefix(self, prefix: str) -> int:
+        keys = [index_key for index_key in self._index if index_key[1].startswith(prefix)]
+        for index_key in keys:
+            del self._index[index_key]
+        return len(keys)
+
+    @staticmethod
+    def _context_records(context_store: ContextStore) -> List[Tuple[int, str, float, bytes]]:
+        now_wall, now = time.time(), time.monotonic()
+        records = []
+        for entry in context_store.iter_contexts():
+            if not entry.messages and not entry.summary:
+                continue
+            payload: Dict[str, Any] = {"m": list(entry.messages)}
+            if entry.summary:
+                payload["s"] = entry.summary
+                payload["t"] = entry.summary_source_tokens
+            key = ContextStore.make_key(entry.tenant_id, entry.agent_id, entry.chat_id)
+            records.append((KIND_CONTEXT, key, now_wall - (now - entry.last_access), _encode(payload)))
+        return records
+
+    @staticmethod
+    def _pending_records(coalescer: MessageCoalescer) -> List[Tuple[int, str, float, bytes]]:
+        now_wall, now = time.time(), time.monotonic()
+        return [
+            (KIND_PENDING, f"{agent_key}:{chat_key}", now_wall - (now - first_at), _encode({"f": fragments}))
+            for agent_key, chat_key, fragments, first_at in coalescer.iter_pending()
+        ]
+
+    async def save(self, context_store: ContextStore, coalescer: MessageCoalescer) -> Optional[Dict[str, Any]]:
+        """현재 컨텍스트/조각 메시지 + 아직 복원되지 않은 이전 레코드를 새 스냅샷으로 저장"""
+        if not self.enabled:
+            return None
+        async with self._save_lock:
+            started = time.monotonic()
+            # 직렬화는 이벤트 루프에서 (상태가 바뀌지 않는 시점의 복사본), 파일 쓰기는 스레드에서
+            records = self._context_records(context_store) + self._pending_records(coalescer)
+            fresh = {(kind, key) for kind, key, *_ in records}
+            carried = [(kind, key, last_wall, offset, length)
+                       for (kind, key), (offset, length, last_wall) in self._index.items()
+                       if (kind, key) not in fresh]
+            encode_ms = (time.monotonic() - started) * 1000
+            try:
+                index = await asyncio.to_thread(_write_file, self.path, records, carried, self._fd)
+            except OSError as e:
+                self.save_failures += 1
+                logger.error("컨텍스트 스냅샷 저장 실패", path=self.path, error=str(e))
+                return None
+
+            # 아직 복원되지 않은 레코드만 새 파일 위치로 옮김 (쓰는 동안 복원된 레코드는 제외)
+            old_fd = self._fd
+            self._fd = os.open(self.path, os.O_RDONLY)
+            self._index = {index_key: index[index_key] for index_key in self._index if index_key in index}
+            if old_fd is not None:
+                os.close(old_fd)
+
+            self.saves += 1
+            self.last_save = {
+                "chats": sum(1 for kind, *_ in records if kind == KIND_CONTEXT),
+                "pending_chats": sum(1 for kind, *_ in records if kind == KIND_PENDING),
+                "carried": len(self._index),
+                "bytes": os.path.getsize(self.path),
+                "encode_ms": round(encode_ms, 2),
+                "total_ms": round((time.monotonic() - started) * 1000, 2),
+            }
+            logger.info("컨텍스트 스냅샷 저장", path=self.path, **self.last_save)
+            return self.last_save
+
+    def start(self, context_store: ContextStore, coalescer: MessageCoalescer):
+        """주기 저장 루프 시작 (interval이 0이면 종료 시에만 저장)"""
+        if not self.enabled or self.interval <= 0 or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._loop(context_store, coalescer))
+
+    async def _loop(self, context_store: ContextStore, coalescer: MessageCoalescer):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save(context_store, coalescer)
+            except Exception as e:
+                logger.error("컨텍스트 스냅샷 주기 저장 오류", error=str(e))
+
+    async def stop(self, context_store: ContextStore, coalescer: MessageCoalescer):
+        """주기 저장 중지 후 마지막 스냅샷 저장"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.save(context_store, coalescer)
+        self._close()
+
+    def stats(self) -> Dict[str, Any]:
+        loads = self.restored_chats + self.restored_pending
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "interval_sec": self.interval,
+            "saves": self.saves,
+            "save_failures": self.save_failures,
+            "last_save": self.last_save,
+            "last_open": self.last_open,
+            "unrestored_records": len(self._index),
+            "restored_chats": self.restored_chats,
+            "restored_pending": self.restored_pending,
+            "expired": self.expired,
+            "load_failures": self.load_failures,
+            "avg_restore_ms": round(self._load_seconds / loads * 1000, 3) if loads else 0.0,
+        }
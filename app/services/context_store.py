@@ -0,0 +1,284 @@
+import sys
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# dict/deque 슬롯 등 메시지당 고정 오버헤드 추정치 (bytes)
+_MESSAGE_OVERHEAD = 120
+
+
+def _message_size(message: Dict[str, Any]) -> int:
+    return sys.getsizeof(message.get("content") or "") + _MESSAGE_OVERHEAD
+
+
+class ChatContext:
+    """채팅방 하나의 대화 컨텍스트 (고정 크기 deque)"""
+
+    __slots__ = ("tenant_id", "agent_id", "chat_id", "messages", "last_access", "size_bytes",
+                 "summary", "summary_source_tokens")
+
+    def __init__(self, tenant_id: str, agent_id: str, chat_id: str, max_messages: int):
+        self.tenant_id = tenant_id
+        self.agent_id = agent_id
+        self.chat_id = chat_id
+        self.messages: Deque[Dict[str, Any]] = deque(maxlen=max_messages)
+        self.last_access = time.monotonic()
+        self.size_bytes = 0
+        # deque에서 밀려난 오래된 대화의 누적 요약과, 요약에 접힌 원문 토큰 수
+        self.summary = ""
+        self.summary_source_tokens = 0
+
+
+# deque 상한으로 밀려난 메시지를 받는 콜백 (요약기 등)
+EvictCallback = Callable[[ChatContext, List[Dict[str, Any]]], None]
+# 메모리에 없는 채팅방을 처음 사용할 때 호출되는 복원 콜백 (스냅샷 등)
+# key -> {"messages", "summary", "summary_source_tokens", "idle_sec"} 또는 None
+LoadCallback = Callable[[str], Optional[Dict[str, Any]]]
+
+
+class ContextStore:
+    """채팅방별 컨텍스트 저장소 - 전역 채팅/메모리 상한 LRU 퇴출 + 유휴 TTL 만료"""
+
+    def __init__(self, max_messages_per_chat: int, max_chats: int, max_bytes: int, idle_ttl: float,
+                 on_evict: Optional[EvictCallback] = None, loader: Optional[LoadCallback] = None,
+                 summary_tail_messages: Optional[int] = None):
+        self.max_messages_per_chat = max_messages_per_chat
+        # 요약이 생긴 채팅방은 최근 summary_tail_messages개만 원문으로 두고 나머지는 on_evict로 넘김
+        self.summary_tail_messages = summary_tail_messages
+        self.max_chats = max_chats
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self.loader = loader
+
+        # key -> ChatContext (앞쪽이 가장 오래전에 접근된 항목)
+        self._entries: "OrderedDict[str, ChatContext]" = OrderedDict()
+        # 보조 인덱스
+        self._by_tenant: Dict[str, Set[str]] = {}
+        self._by_agent: Dict[Tuple[str, str], Set[str]] = {}
+
+        self.total_bytes = 0
+        self.lru_evictions = 0
+        self.ttl_expirations = 0
+        self.restored = 0
+
+    @staticmethod
+    def make_key(tenant_id: str, agent_id: str, chat_id) -> str:
+        return f"{tenant_id}:{agent_id}:{chat_id}"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _new_entry(self, key: str, tenant_id: str, agent_id: str, chat_id) -> ChatContext:
+        entry = ChatContext(str(tenant_id), str(agent_id), str(chat_id), self.max_messages_per_chat)
+        self._entries[key] = entry
+        self._by_tenant.setdefault(entry.tenant_id, set()).add(key)
+        self._by_agent.setdefault((entry.tenant_id, entry.agent_id), set()).add(key)
+        return entry
+
+    def _get_or_load(self, key: str, tenant_id: str, agent_id: str, chat_id) -> Optional[ChatContext]:
+        """메모리에 없으면 loader로 한 번 복원 시도"""
+        entry = self._entries.get(key)
+        if entry is not None or self.loader is None:
+            return entry
+        restored = self.loader(key)
+        if restored is None:
+            return None
+
+        entry = self._new_entry(key, tenant_id, agent_id, chat_id)
+        for message in restored["messages"]:
+            entry.messages.append(message)
+        entry.size_bytes = sum(_message_size(message) for message in entry.messages)
+        if restored.get("summary"):
+            entry.summary = restored["summary"]
+            entry.summary_source_tokens = restored.get("summary_source_tokens", 0)
+            entry.size_bytes += sys.getsizeof(entry.summary)
+        entry.last_access = time.monotonic() - restored.get("idle_sec", 0.0)
+        self.total_bytes += entry.size_bytes
+        self.restored += 1
+        self._shrink_to_tail(entry)
+        self._evict(protect=key)
+        return entry
+
+    def get_messages(self, tenant_id: str, agent_id: str, chat_id) -> List[Dict[str, Any]]:
+        """컨텍스트 메시지 목록 복사본 반환 (없거나 만료됐으면 빈 리스트)"""
+        key = self.make_key(tenant_id, agent_id, chat_id)
+        entry = self._get_or_load(key, tenant_id, agent_id, chat_id)
+        if entry is None:
+            return []
+        now = time.monotonic()
+        if now - entry.last_access > self.idle_ttl:
+            self._drop(key)
+            self.ttl_expirations += 1
+            return []
+        entry.last_access = now
+        self._entries.move_to_end(key)
+        return list(entry.messages)
+
+    def append(self, tenant_id: str, agent_id: str, chat_id, *messages: Dict[str, Any]):
+        """메시지 추가 - deque 상한을 넘는 오래된 메시지는 자동으로 밀려남"""
+        key = self.make_key(tenant_id, agent_id, chat_id)
+        entry = self._get_or_load(key, tenant_id, agent_id, chat_id)
+        if entry is None:
+            entry = self._new_entry(key, tenant_id, agent_id, chat_id)
+        else:
+            self._entries.move_to_end(key)
+
+        evicted: List[Dict[str, Any]] = []
+        for message in messages:
+            if len(entry.messages) == entry.messages.maxlen:
+                evicted.append(entry.messages[0])
+                removed = _message_size(entry.messages[0])
+                entry.size_bytes -= removed
+                self.total_bytes -= removed
+            entry.messages.append(message)
+            added = _message_size(message)
+            entry.size_bytes += added
+            self.total_bytes += added
+
+        entry.last_access = time.monotonic()
+        if evicted and self.on_evict is not None:
+            self.on_evict(entry, evicted)
+        self._evict(protect=key)
+
+    def get_summary(self, tenant_id: str, agent_id: str, chat_id) -> Tuple[str, int]:
+        """(누적 요약, 요약에 접힌 원문 토큰 수) - 없으면 ("", 0)"""
+        key = self.make_key(tenant_id, agent_id, chat_id)
+        entry = self._get_or_load(key, tenant_id, agent_id, chat_id)
+        if entry is None:
+            return "", 0
+        return entry.summary, entry.summary_source_tokens
+
+    def set_summary(self, tenant_id: str, agent_id: str, chat_id, summary: str, source_tokens: int) -> bool:
+        """누적 요약 교체 (그 사이 컨텍스트가 퇴출됐으면 False)"""
+        entry = self._entries.get(self.make_key(tenant_id, agent_id, chat_id))
+        if entry is None:
+            return False
+        delta = sys.getsizeof(summary) - (sys.getsizeof(entry.summary) if entry.summary else 0)
+        entry.summary = summary
+        entry.summary_source_tokens = source_tokens
+        entry.size_bytes += delta
+        self.total_bytes += delta
+        self._shrink_to_tail(entry)
+        return True
+
+    def _shrink_to_tail(self, entry: ChatContext):
+        """요약이 있으면 deque를 summary_tail_messages개로 줄임 - 밀려난 메시지는 on_evict로 (요약에 이어서 접힘)"""
+        tail = self.summary_tail_messages
+        if not entry.summary or not tail or entry.messages.maxlen <= tail:
+            return
+        messages = list(entry.messages)
+        evicted = messages[:-tail]
+        entry.messages = deque(messages[-tail:], maxlen=tail)
+        removed = sum(_message_size(message) for message in evicted)
+        entry.size_bytes -= removed
+        self.total_bytes -= removed
+        if evicted and self.on_evict is not None:
+            self.on_evict(entry, evicted)
+
+    def remove(self, tenant_id: str, agent_id: str, chat_id) -> bool:
+        key = self.make_key(tenant_id, agent_id, chat_id)
+        if key not in self._entries:
+            return False
+        self._drop(key)
+        return True
+
+    def remove_agent(self, tenant_id: str, agent_id: str) -> int:
+        """에이전트의 모든 채팅 컨텍스트 삭제"""
+        keys = list(self._by_agent.get((str(tenant_id), str(agent_id)), ()))
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    def remove_tenant(self, tenant_id: str) -> int:
+        """테넌트의 모든 채팅 컨텍스트 삭제"""
+        keys = list(self._by_tenant.get(str(tenant_id), ()))
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_tenant.clear()
+        self._by_agent.clear()
+        self.total_bytes = 0
+
+    def count_for_agent(self, tenant_id: str, agent_id: str) -> int:
+        return len(self._by_agent.get((str(tenant_id), str(agent_id)), ()))
+
+    def iter_contexts(self, tenant_id: Optional[str] = None) -> Iterator[ChatContext]:
+        """컨텍스트 순회 (tenant_id 지정 시 테넌트 인덱스 사용)"""
+        if tenant_id is None:
+            yield from list(self._entries.values())
+            return
+        for key in list(self._by_tenant.get(str(tenant_id), ())):
+            entry = self._entries.get(key)
+            if entry is not None:
+                yield entry
+
+    def expire_idle(self) -> int:
+        """유휴 TTL이 지난 컨텍스트 정리 (LRU 순서라 앞쪽만 확인하면 됨)"""
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = 0
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.last_access >= cutoff:
+                break
+            self._drop(key)
+            expired += 1
+        self.ttl_expirations += expired
+        return expired
+
+    def _evict(self, protect: str):
+        self.expire_idle()
+        while self._entries and (len(self._entries) > self.max_chats or self.total_bytes > self.max_bytes):
+            key = next(iter(self._entries))
+            if key == protect:
+                break
+            self._drop(key)
+            self.lru_evictions += 1
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry.size_bytes
+
+        tenant_keys = self._by_tenant.get(entry.tenant_id)
+        if tenant_keys is not None:
+            tenant_keys.discard(key)
+            if not tenant_keys:
+                del self._by_tenant[entry.tenant_id]
+
+        agent_index = (entry.tenant_id, entry.agent_id)
+        agent_keys = self._by_agent.get(agent_index)
+        if agent_keys is not None:
+            agent_keys.discard(key)
+            if not agent_keys:
+                del self._by_agent[agent_index]
+
+    def stats(self) -> Dict[str, Any]:
+        """메모리 사용량 통계"""
+        return {
+            "chats": len(self._entries),
+            "max_chats": self.max_chats,
+            "messages": sum(len(entry.messages) for entry in self._entries.values()),
+            "summarized_chats": sum(1 for entry in self._entries.values() if entry.summary),
+            "max_messages_per_chat": self.max_messages_per_chat,
+            "summary_tail_messages": self.summary_tail_messages,
+            "estimated_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "idle_ttl_sec": self.idle_ttl,
+            "tenants": len(self._by_tenant),
+            "agents": len(self._by_agent),
+            "lru_evictions": self.lru_evictions,
+            "ttl_expirations": self.ttl_expirations,
+            "restored": self.restored,
+        }
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Set
+
+from app.services import openai_service
+from app.services.context_store import ChatContext, ContextStore
+from app.services.token_budget import token_counter
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ConversationSummarizer:
+    """컨텍스트 deque에서 밀려난 대화를 채팅방별 누적 요약으로 접는 요약기
+
+    ContextStore.on_evict로 밀려난 메시지를 받아 채팅방별로 모았다가 fold_messages개가
+    쌓이면 백그라운드 태스크에서 기존 요약과 합쳐 새 요약을 만듭니다. 응답 경로는 기다리지 않고,
+    채팅방당 동시에 하나의 요약만 실행합니다. 아직 요약에 반영되지 않은 메시지(요약 중인 것 포함)는
+    unfolded()로 프롬프트에 원문 그대로 넣어, 요약과 컨텍스트 사이에 빠지는 대화가 없게 합니다.
+    """
+
+    def __init__(self, context_store: ContextStore, enabled: bool, fold_messages: int,
+                 max_summary_tokens: int, concurrency: int, max_pending_chats: int):
+        self.context_store = context_store
+        self.enabled = enabled
+        self.fold_messages = fold_messages
+        self.max_summary_tokens = max_summary_tokens
+        self.max_pending_chats = max_pending_chats
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+        # 컨텍스트 key -> 아직 요약에 반영되지 않은 밀려난 메시지
+        self._pending: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        # 컨텍스트 key -> 지금 요약 중인 메시지 (요약이 저장될 때까지 unfolded()에 포함)
+        self._folding: Dict[str, List[Dict[str, Any]]] = {}
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.folds = 0
+        self.failures = 0
+        self.folded_messages = 0
+        self.dropped_messages = 0
+        self.llm_tokens = 0
+        self._fold_seconds = 0.0
+
+    def unfolded(self, tenant_id: str, agent_id: str, chat_id) -> List[Dict[str, Any]]:
+        """요약에 아직 반영되지 않은 밀려난 메시지 (오래된 순) - 컨텍스트 앞에 붙여서 사용"""
+        key = ContextStore.make_key(tenant_id, agent_id, chat_id)
+        return [*self._folding.get(key, ()), *self._pending.get(key, ())]
+
+    def on_evict(self, entry: ChatContext, evicted: List[Dict[str, Any]]):
+        """ContextStore 콜백 - 밀려난 메시지를 모으고 임계치를 넘으면 요약 예약"""
+        if not self.enabled:
+            return
+        key = ContextStore.make_key(entry.tenant_id, entry.agent_id, entry.chat_id)
+        pending = self._pending.setdefault(key, [])
+        pending.extend(evicted)
+        self._pending.move_to_end(key)
+
+        # 대기 채팅방 수 제한 - 가장 오래된 채팅방의 미반영 메시지는 버림
+        while len(self._pending) > self.max_pending_chats:
+            oldest, messages = next(iter(self._pending.items()))
+            if oldest in self._running or oldest == key:
+                break
+            del self._pending[oldest]
+            self.dropped_messages += len(messages)
+
+        if len(pending) >= self.fold_messages and key not in self._running:
+            self._running.add(key)
+            task = asyncio.get_running_loop().create_task(
+                self._fold(key, entry.tenant_id, entry.agent_id, entry.chat_id)
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fold(self, key: str, tenant_id: str, agent_id: str, chat_id: str):
+        try:
+            async with self._semaphore:
+                # 요약하는 동안 더 쌓인 메시지가 임계치를 넘으면 이어서 처리
+                while len(self._pending.get(key, ())) >= self.fold_messages:
+                    messages = self._folding[key] = self._pending.pop(key)
+                    previous, source_tokens = self.context_store.get_summary(tenant_id, agent_id, chat_id)
+                    started = time.monotonic()
+                    try:
+                        summary, used_tokens = await openai_service.summarize_conversation(
+                            previous, messages, tenant_id, self.max_summary_tokens
+                        )
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        self.failures += 1
+                        self.dropped_messages += len(messages)
+                        logger.warning("대화 요약 실패", tenant_id=tenant_id, agent_id=agent_id, chat_id=chat_id, error=str(e))
+                        return
+
+                    self._fold_seconds += time.monotonic() - started
+                    self.llm_tokens += used_tokens
+                    if not summary:
+                        continue
+                    folded_tokens = sum(token_counter.message_tokens(m) for m in messages)
+                    if self.context_store.set_summary(tenant_id, agent_id, chat_id, summary, source_tokens + folded_tokens):
+                        self.folds += 1
+                        self.folded_messages += len(messages)
+                        logger.debug("대화 요약 갱신",
+                                     tenant_id=tenant_id,
+                                     agent_id=agent_id,
+                                     chat_id=chat_id,
+                                     folded=len(messages),
+                                     summary_tokens=token_counter.count(summary))
+        finally:
+            self._folding.pop(key, None)
+            self._running.discard(key)
+
+    def cancel_agent(self, tenant_id: str, agent_id: str) -> int:
+        """에이전트의 미반영 메시지 폐기 (실행 중인 요약은 컨텍스트가 없어 반영되지 않음)"""
+        prefix = ContextStore.make_key(tenant_id, agent_id, "")
+        keys = [key for key in self._pending if key.startswith(prefix)]
+        for key in keys:
+            del self._pending[key]
+        return len(keys)
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._pending.clear()
+        self._folding.clear()
+        self._running.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "fold_messages": self.fold_messages,
+            "pending_chats": len(self._pending),
+            "pending_messages": sum(len(messages) for messages in self._pending.values()),
+            "running": len(self._running),
+            "folds": self.folds,
+            "folded_messages": self.folded_messages,
+            "failures": self.failures,
+            "dropped_messages": self.dropped_messages,
+            "llm_tokens": self.llm_tokens,
+            "avg_fold_ms": round(self._fold_seconds / self.folds * 1000, 1) if self.folds else 0.0,
+        }
@@ -0,0 +1,151 @@
+import asyncio
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+ChatKey = Tuple[str, str]
+
+
+class Generation:
+    """채팅방 하나에서 진행 중인 응답 생성 (생성 → 전송 예약 → 전송)"""
+
+    __slots__ = ("id", "key", "message", "task", "replies", "pending_sends",
+                 "sending", "delivered", "finished", "committed", "superseded")
+
+    def __init__(self, generation_id: int, key: ChatKey, message: str, task: Optional[asyncio.Task]):
+        self.id = generation_id
+        self.key = key
+        self.message = message
+        self.task = task
+        self.replies: List[str] = []
+        self.pending_sends = 0
+        self.sending = False  # 스케줄러가 전송을 시작함 (취소할 수 없으므로 전송된 것으로 취급)
+        self.delivered = False
+        self.finished = False
+        self.committed = False
+        self.superseded = False
+
+    @property
+    def ready_to_commit(self) -> bool:
+        """생성이 끝났고 응답이 하나라도 실제로 전송된 경우에만 컨텍스트에 반영"""
+        return self.finished and self.delivered and not self.committed and not self.superseded
+
+
+class GenerationRegistry:
+    """(에이전트, 채팅방)별 진행 중인 생성 레지스트리
+
+    같은 채팅방에 새 메시지가 들어왔을 때 이전 생성이 아직 아무 응답도 전송하지 않았다면
+    그 생성(LLM 호출)과 예약된 전송을 취소하고, 이전 메시지를 새 메시지에 합쳐 한 번만 응답합니다.
+    이미 전송을 시작한 생성(전송 중 포함)은 그대로 두고, 그 응답은 전송이 끝나면 컨텍스트에 반영됩니다. 컨텍스트는 최종적으로 살아남은 생성만 반영합니다.
+    """
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._active: Dict[ChatKey, Generation] = {}
+        self._by_id: Dict[int, Generation] = {}
+
+        self.started = 0
+        self.cancelled = 0
+        self.merged_messages = 0
+        self.committed = 0
+
+    def begin(self, agent_key: str, chat_id, message: str) -> Tuple[Generation, Optional[Generation]]:
+        """새 생성 등록 - (새 생성, 취소된 이전 생성 또는 None) 반환
+
+        이전 생성이 취소되면 그 메시지가 새 생성의 message 앞에 합쳐집니다.
+        호출 측은 취소된 생성의 예약 전송을 정리해야 합니다.
+        """
+        key = (agent_key, str(chat_id))
+        previous = self._active.get(key)
+        superseded = None
+        if previous is not None and not previous.sending and not previous.delivered and not previous.committed:
+            superseded = previous
+            previous.superseded = True
+            if previous.task is not None and not previous.task.done() and previous.task is not asyncio.current_task():
+                previous.task.cancel()
+            self._by_id.pop(previous.id, None)
+            message = f"{previous.message}\n{message}"
+            self.cancelled += 1
+            self.merged_messages += 1
+            logger.info("이전 응답 생성 취소 (새 메시지로 대체)",
+                        agent_key=agent_key,
+                        chat_id=chat_id,
+                        generation_id=previous.id)
+
+        generation = Generation(next(self._ids), key, message, asyncio.current_task())
+        self._active[key] = generation
+        self._by_id[generation.id] = generation
+        self.started += 1
+        return generation, superseded
+
+    def get(self, generation_id: Optional[int]) -> Optional[Generation]:
+        if generation_id is None:
+            return None
+        return self._by_id.get(generation_id)
+
+    def scheduled(self, generation: Generation, reply: str, accepted: bool):
+        generation.replies.append(reply)
+        if accepted:
+            generation.pending_sends += 1
+
+    def finish(self, generation: Generation) -> bool:
+        """생성 완료 표시 - 지금 컨텍스트에 반영해야 하면 True"""
+        generation.finished = True
+        self._release_if_done(generation)
+        return generation.ready_to_commit
+
+    def send_started(self, generation_id: Optional[int]):
+        """스케줄러가 예약 전송을 꺼내 보내기 시작함 - 이후로는 새 메시지가 와도 대체하지 않음"""
+        generation = self.get(generation_id)
+        if generation is not None:
+            generation.sending = True
+
+    def send_done(self, generation_id: Optional[int], delivered: bool) -> Optional[Generation]:
+        """예약 전송 하나가 끝남 - 컨텍스트에 반영할 차례가 된 생성 반환"""
+        generation = self.get(generation_id)
+        if generation is None:
+            return None
+        generation.pending_sends -= 1
+        if delivered:
+            generation.delivered = True
+        ready = generation if generation.ready_to_commit else None
+        self._release_if_done(generation)
+        return ready
+
+    def mark_committed(self, generation: Generation):
+        generation.committed = True
+        self.committed += 1
+        self._release_if_done(generation)
+
+    def _release_if_done(self, generation: Generation):
+        # 남은 전송이 없고 더 반영할 것도 없으면 정리
+        if generation.finished and generation.pending_sends <= 0 and (generation.committed or not generation.delivered):
+            self._by_id.pop(generation.id, None)
+            if self._active.get(generation.key) is generation:
+                del self._active[generation.key]
+
+    def cancel_agent(self, agent_key: str) -> int:
+        """에이전트의 진행 중인 생성 모두 취소"""
+        keys = [key for key in self._active if key[0] == agent_key]
+        for key in keys:
+            generation = self._active.pop(key)
+            self._by_id.pop(generation.id, None)
+            if generation.task is not None and not generation.task.done():
+                generation.task.cancel()
+        return len(keys)
+
+    def clear(self):
+        for agent_key in {key[0] for key in self._active}:
+            self.cancel_agent(agent_key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._active),
+            "started": self.started,
+            "cancelled_generations": self.cancelled,
+            "merged_messages": self.merged_messages,
+            "committed": self.committed,
+        }
@@ -0,0 +1,359 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import openai
+
+from app.config import settings
+from app.services.rate_limit import TokenBucket
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 재시도 대상: 429와 일시적인 연결/서버 오류
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+PRIORITY_LANE = 0
+NORMAL_LANE = 1
+
+
+class LLMQueueFullError(Exception):
+    """LLM 요청 대기열이 가득 참"""
+
+
+class _Request:
+    __slots__ = ("tenant_id", "tokens", "call", "future", "lane", "hold", "finish", "seq", "enqueued_at", "attempts",
+                 "task", "queued")
+
+    def __init__(self, tenant_id: str, tokens: int, call: Callable[[], Awaitable[Any]], future: asyncio.Future, lane: int,
+                 hold: bool = False):
+        self.tenant_id = tenant_id
+        self.tokens = tokens
+        self.call = call
+        self.future = future
+        self.lane = lane
+        self.hold = hold  # 성공해도 release()까지 동시 실행 슬롯 유지 (스트리밍)
+        self.finish = 0.0
+        self.seq = 0
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+        self.task: Optional[asyncio.Task] = None
+        self.queued = False  # 힙에서 디스패치를 기다리는 중 (취소되면 힙에 남아도 False)
+
+
+class LLMScheduler:
+    """OpenAI 호출 스케줄러
+
+    - 분당 요청 수(rpm)와 분당 토큰 수(tpm) 토큰 버킷을 모두 통과해야 호출
+    - 테넌트 간 가중 공정 큐잉(WFQ): 요청마다 예상 토큰/가중치만큼 가상 종료 시각을 붙여
+      가장 작은 것부터 보내므로, 한 테넌트의 폭주가 다른 테넌트 응답을 밀어내지 않음
+    - 직접 언급/질문은 우선 lane에서 먼저 처리
+    - 429는 Retry-After(없으면 지수 백오프 + jitter)만큼 전체 디스패치를 멈춘 뒤 재시도
+    - max_concurrency는 실행 중인 호출 수 - hold=True로 제출한 스트리밍 요청은 본문을 다 읽고 release()할 때까지 포함
+    - max_queue는 살아있는 대기 요청 수 - 호출 측에서 취소한 요청은 힙에 남아 있어도 세지 않음
+    """
+
+    def __init__(self, rpm: int, tpm: int, max_concurrency: int, max_queue: int,
+                 max_retries: int, retry_base_delay: float, max_retry_delay: float,
+                 tenant_weights: Optional[Dict[str, float]] = None):
+        self.request_bucket = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.max_retry_delay = max_retry_delay
+        self.tenant_weights: Dict[str, float] = dict(tenant_weights or {})
+
+        self._heap: List[Tuple[int, float, int, _Request]] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._queued_by_tenant: Dict[str, int] = {}
+        self._queued = 0
+        self._running: Set[_Request] = set()
+        self._pause_until = 0.0
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        # 메트릭
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self._waits: Deque[float] = deque(maxlen=1000)
+
+    def _ensure_started(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """디스패처 중지 - 대기 중/실행 중인 요청은 취소"""
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        for _, _, _, request in self._heap:
+            request.future.cancel()
+        for request in list(self._running):
+            if request.task:
+                request.task.cancel()
+        self._heap.clear()
+        self._running.clear()
+        self._queued_by_tenant.clear()
+        self._queued = 0
+        self._last_finish.clear()
+        self._virtual_time = 0.0
+
+    async def submit(self, tenant_id: str, estimated_tokens: int, call: Callable[[], Awaitable[Any]], priority: bool = False,
+                     hold: bool = False) -> Any:
+        """call()을 스케줄링해서 실행하고 결과 반환 (호출 측이 취소되면 대기/실행 중인 요청도 취소)
+
+        hold=True면 (결과, release) 반환 - 스트림처럼 결과를 받은 뒤에도 호출이 이어지는 경우,
+        호출 측이 소비를 마치고 release()를 부를 때까지 동시 실행 슬롯을 차지합니다.
+        """
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise LLMQueueFullError(f"LLM queue full ({self.max_queue})")
+
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        request = _Request(str(tenant_id), max(1, estimated_tokens), call, future,
+                           PRIORITY_LANE if priority else NORMAL_LANE, hold)
+
+        # WFQ 태그: 테넌트의 직전 요청 종료 시각 이후부터 토큰/가중치만큼
+        weight = self.tenant_weights.get(request.tenant_id, 1.0)
+        start = max(self._virtual_time, self._last_finish.get(request.tenant_id, 0.0))
+        request.finish = start + request.tokens / weight
+        self._last_finish[request.tenant_id] = request.finish
+        self._push(request)
+        self.submitted += 1
+
+        try:
+            result = await future
+        except asyncio.CancelledError:
+            self._unqueue(request)
+            if request.task and not request.task.done():
+                request.task.cancel()
+            # 결과가 나온 직후에 취소됐다면 잡고 있던 슬롯 반환
+            self._release(request)
+            raise
+        if hold:
+            return result, lambda: self._release(request)
+        return result
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """응답 usage로 토큰 버킷 보정"""
+        if actual_tokens:
+            self.token_bucket.adjust(actual_tokens - estimated_tokens)
+
+    def _push(self, request: _Request):
+        request.seq = next(self._seq)
+        heapq.heappush(self._heap, (request.lane, request.finish, request.seq, request))
+        request.queued = True
+        self._queued += 1
+        self._queued_by_tenant[request.tenant_id] = self._queued_by_tenant.get(request.tenant_id, 0) + 1
+        self._wakeup.set()
+
+    def _pop(self) -> _Request:
+        _, _, _, request = heapq.heappop(self._heap)
+        self._unqueue(request)
+        return request
+
+    def _unqueue(self, request: _Request):
+        """대기 카운터에서 제외 (취소된 요청은 힙에서 꺼낼 때까지 남아 있으므로 취소 시점에 바로 호출)"""
+        if not request.queued:
+            return
+        request.queued = False
+        self._queued -= 1
+        count = self._queued_by_tenant.get(request.tenant_id, 1) - 1
+        if count:
+            self._queued_by_tenant[request.tenant_id] = count
+        else:
+            self._queued_by_tenant.pop(request.tenant_id, None)
+
+    def _release(self, request: _Request):
+        """동시 실행 슬롯 반환 (여러 번 불러도 됨)"""
+        if request in self._running:
+            self._running.discard(request)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def _dispatch_loop(self):
+        while True:
+            self._wakeup.clear()
+            # 호출 측에서 이미 취소한 요청은 버림
+            while self._heap and self._heap[0][3].future.done():
+                self._pop()
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            request = self._heap[0][3]
+            if len(self._running) >= self.max_concurrency:
+                wait = None  # 실행 중인 요청이 끝나면 깨어남
+            else:
+                wait = max(
+                    self._pause_until - time.monotonic(),
+                    self.request_bucket.wait_time(1),
+                    self.token_bucket.wait_time(request.tokens),
+                )
+
+            if wait is None or wait > 0:
+                # 대기 중 우선 요청이 들어오면 다시 판단
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._pop()
+            self._virtual_time = max(self._virtual_time, request.finish - request.tokens / self.tenant_weights.get(request.tenant_id, 1.0))
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(request.tokens)
+            if request.attempts == 0:
+                self._waits.append(time.monotonic() - request.enqueued_at)
+            self._running.add(request)
+            request.task = asyncio.create_task(self._execute(request))
+
+    async def _execute(self, request: _Request):
+        request.attempts += 1
+        held = False
+        try:
+            result = await request.call()
+            held = request.hold and not request.future.done()
+        except asyncio.CancelledError:
+            if not request.future.done():
+                request.future.cancel()
+            return
+        except RETRYABLE_ERRORS as e:
+            if request.attempts <= self.max_retries and not request.future.done():
+                self._schedule_retry(request, e)
+                return
+            self.failed += 1
+            if not request.future.done():
+                request.future.set_exception(e)
+            return
+        except Exception as e:
+            self.failed += 1
+            if not request.future.done():
+                request.future.set_exception(e)
+            return
+        finally:
+            if not held:
+                self._release(request)
+
+        self.completed += 1
+        if not request.future.done():
+            request.future.set_result(result)
+
+    def _schedule_retry(self, request: _Request, error: Exception):
+        """백오프 후 같은 WFQ 태그로 재투입 (429면 전체 디스패치 일시 정지)"""
+        self.retries += 1
+        delay = min(self.max_retry_delay, self.retry_base_delay * (2 ** (request.attempts - 1)))
+        if isinstance(error, openai.RateLimitError):
+            self.rate_limited += 1
+            retry_after = _retry_after(error)
+            if retry_after is not None:
+                delay = min(self.max_retry_delay, retry_after)
+        delay *= random.uniform(1.0, 1.5)
+
+        if isinstance(error, openai.RateLimitError):
+            self._pause_until = max(self._pause_until, time.monotonic() + delay)
+        logger.warning("LLM 요청 재시도 예약",
+                       tenant_id=request.tenant_id,
+                       attempt=request.attempts,
+                       delay_sec=round(delay, 2),
+                       error=type(error).__name__)
+        asyncio.get_running_loop().call_later(delay, self._requeue, request)
+
+    def _requeue(self, request: _Request):
+        if request.future.done():
+            return
+        if self._dispatcher is None:
+            # 재시도 대기 중에 스케줄러가 중지됨
+            request.future.cancel()
+            return
+        self._push(request)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        lanes = {PRIORITY_LANE: 0, NORMAL_LANE: 0}
+        for lane, _, _, request in self._heap:
+            if request.queued:
+                lanes[lane] += 1
+        busiest = sorted(self._queued_by_tenant.items(), key=lambda item: item[1], reverse=True)[:5]
+        return {
+            "queue_depth": self._queued,
+            "priority_queue_depth": lanes[PRIORITY_LANE],
+            "running": len(self._running),
+            "max_concurrency": self.max_concurrency,
+            "queued_by_tenant": dict(busiest),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "paused_for_sec": round(max(0.0, self._pause_until - time.monotonic()), 2),
+            "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+            "wait_p95_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+            "request_bucket": round(self.request_bucket.tokens, 1),
+            "token_bucket": round(self.token_bucket.tokens, 1),
+        }
+
+
+def parse_tenant_weights(value: str) -> Dict[str, float]:
+    """"tenant_a:2,tenant_b:0.5" 형식의 테넌트 가중치 파싱 (잘못된 항목은 무시)"""
+    weights = {}
+    for item in value.split(","):
+        tenant_id, _, weight = item.strip().rpartition(":")
+        try:
+            if tenant_id and float(weight) > 0:
+                weights[tenant_id] = float(weight)
+        except ValueError:
+            logger.warning("잘못된 LLM 테넌트 가중치 무시", item=item)
+    return weights
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """429 응답의 retry-after-ms / Retry-After(초 또는 HTTP 날짜) 헤더 파싱"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms:
+            return float(retry_after_ms) / 1000
+        retry_after = headers.get("retry-after")
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+llm_scheduler = LLMScheduler(
+    rpm=settings.llm_rpm_limit,
+    tpm=settings.llm_tpm_limit,
+    max_concurrency=settings.llm_max_concurrency,
+    max_queue=settings.llm_max_queue,
+    max_retries=settings.llm_max_retries,
+    retry_base_delay=settings.llm_retry_base_delay_sec,
+    max_retry_delay=settings.llm_max_retry_delay_sec,
+    tenant_weights=parse_tenant_weights(settings.llm_tenant_weights),
+)
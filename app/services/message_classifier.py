@@ -0,0 +1,171 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+# 기본 분류 규칙 (기존 should_respond_to_message / is_incomplete_sentence 목록에서 중복 제거)
+DEFAULT_MEANINGLESS_PATTERNS = (
+    r'[ㅋㅎ]+',      # 웃음만
+    r'[ㅇㅎ]+',      # 추임새만
+    r'[.]{2,}',      # 점만
+    r'[~]{2,}',      # 물결만
+    r'[!]{2,}',      # 느낌표만
+    r'[?]{2,}',      # 물음표만
+    r'[ㅁㅇㅎ]+',    # 추임새 조합
+    r'[ㅋㅎ!~.]+',   # 감정 표현만
+)
+DEFAULT_SHORT_RESPONSES = ('음', '어', '응', '그래', '맞아', '좋아', 'ㅇㅇ', 'ㅇ', 'ㅎ', 'ㅋ')
+DEFAULT_QUESTION_KEYWORDS = ('?', '뭐', '무엇', '어떻게', '왜', '언제', '어디', '누가', '몇')
+DEFAULT_DIRECT_MENTIONS = ('너', '당신', 'AI', '봇', '기계', '로봇')
+DEFAULT_INCOMPLETE_ENDINGS = (
+    '그리고', '하지만', '그런데', '그래서', '그러면',
+    '은', '는', '도', '만', '부터', '까지', '에서', '에게',
+    '안녕', '오늘', '내일', '어제', '지금', '나중에',
+)
+DEFAULT_SENTENCE_ENDINGS = ('.', '!', '?', '~', 'ㅋ', 'ㅎ')
+
+LONG_MESSAGE_CHARS = 10
+SAMPLE_PROBABILITY = 0.3
+RECENT_CONTEXT = 3
+
+_END = object()
+
+
+class SuffixTrie:
+    """뒤집은 문자열로 만든 trie - 텍스트 끝에서부터 한 글자씩 따라가며 어미를 찾음"""
+
+    def __init__(self, words: Iterable[str]):
+        self._root: Dict = {}
+        for word in words:
+            node = self._root
+            for char in reversed(word):
+                node = node.setdefault(char, {})
+            node[_END] = word
+
+    def match(self, text: str) -> Optional[str]:
+        """text가 등록된 단어 중 하나로 끝나면 그 단어 반환 (가장 짧은 것 우선)"""
+        node = self._root
+        for i in range(len(text) - 1, -1, -1):
+            node = node.get(text[i])
+            if node is None:
+                return None
+            word = node.get(_END)
+            if word is not None:
+                return word
+        return None
+
+
+@dataclass
+class MessageDecision:
+    """분류 결과
+
+    action: "reject" (응답 안 함) / "respond" (응답) / "sample" (확률적으로 응답)
+    """
+
+    action: str
+    reasons: List[str] = field(default_factory=list)
+    matched: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def should_sample(self) -> bool:
+        return self.action == "sample"
+
+    @property
+    def asks(self) -> bool:
+        """질문이나 직접 언급 (LLM 우선 lane, 모델 route 판단에 사용)"""
+        return "question" in self.reasons or "direct_mention" in self.reasons
+
+
+class MessageClassifier:
+    """응답 여부 / 문장 완성도 판단 규칙을 한 번만 컴파일해서 재사용하는 분류기
+
+    무의미 패턴은 하나의 정규식으로 합치고, 질문 키워드와 직접 언급은 각각 하나의
+    alternation 정규식으로, 미완성 어미는 suffix trie로 검사합니다.
+    """
+
+    def __init__(
+        self,
+        meaningless_patterns: Iterable[str] = DEFAULT_MEANINGLESS_PATTERNS,
+        short_responses: Iterable[str] = DEFAULT_SHORT_RESPONSES,
+        question_keywords: Iterable[str] = DEFAULT_QUESTION_KEYWORDS,
+        direct_mentions: Iterable[str] = DEFAULT_DIRECT_MENTIONS,
+        incomplete_endings: Iterable[str] = DEFAULT_INCOMPLETE_ENDINGS,
+        sentence_endings: Iterable[str] = DEFAULT_SENTENCE_ENDINGS,
+        long_message_chars: int = LONG_MESSAGE_CHARS,
+    ):
+        patterns = list(dict.fromkeys(meaningless_patterns))
+        # 어떤 패턴에 걸렸는지 알 수 있도록 패턴별 그룹(m0, m1, ...)으로 합침
+        self._meaningless_re = re.compile("|".join(f"(?P<m{i}>{p})" for i, p in enumerate(patterns)))
+        self._meaningless_patterns = patterns
+        self._short_responses = frozenset(short_responses)
+        self._question_re = self._keyword_regex(question_keywords)
+        self._mention_re = self._keyword_regex(direct_mentions)
+        self._incomplete_trie = SuffixTrie(dict.fromkeys(incomplete_endings))
+        self._sentence_endings = tuple(dict.fromkeys(sentence_endings))
+        self.long_message_chars = long_message_chars
+
+    @staticmethod
+    def _keyword_regex(keywords: Iterable[str]) -> "re.Pattern":
+        # 긴 키워드를 먼저 두어 매칭 결과가 가장 구체적인 키워드가 되도록 함
+        unique = sorted(dict.fromkeys(keywords), key=len, reverse=True)
+        return re.compile("|".join(re.escape(k) for k in unique))
+
+    def classify(self, message: str, context: Optional[List[Dict]] = None) -> MessageDecision:
+        """응답 여부 판단 (규칙 순서는 기존 should_respond_to_message와 동일)"""
+        stripped = message.strip()
+
+        # 1. 명백한 무의미한 메시지
+        match = self._meaningless_re.fullmatch(stripped)
+        if match:
+            pattern = self._meaningless_patterns[int(match.lastgroup[1:])]
+            return MessageDecision("reject", ["meaningless_pattern"], {"pattern": pattern})
+
+        # 2. 짧은 추임새
+        if stripped in self._short_responses:
+            return MessageDecision("reject", ["short_response"], {"response": stripped})
+
+        reasons: List[str] = []
+        matched: Dict[str, str] = {}
+
+        # 3. 질문 / 4. 직접 언급
+        question = self._question_re.search(message)
+        if question:
+            reasons.append("question")
+            matched["question"] = question.group()
+        mention = self._mention_re.search(message)
+        if mention:
+            reasons.append("direct_mention")
+            matched["mention"] = mention.group()
+
+        # 5. 최근 대화에 AI 응답이 있었는지 (참고용)
+        if context and any(msg.get('role') == 'assistant' for msg in context[-RECENT_CONTEXT:]):
+            reasons.append("recent_assistant")
+
+        # 6. 최종 판단
+        if question or mention:
+            return MessageDecision("respond", reasons, matched)
+        if len(stripped) >= self.long_message_chars:
+            reasons.append("long_message")
+            return MessageDecision("respond", reasons, matched)
+        reasons.append("short_message")
+        return MessageDecision("sample", reasons, matched)
+
+    def incomplete_reason(self, text: str) -> Optional[str]:
+        """문장이 완성되지 않았으면 그 이유, 완성되었으면 None"""
+        if not text.strip().endswith(self._sentence_endings):
+            return "no_sentence_ending"
+        if self._incomplete_trie.match(text):
+            return "incomplete_ending"
+        last = text[-1]
+        if last.isdigit():
+            return "ends_with_number"
+        if last in '+-*/=()[]{}':
+            return "ends_with_symbol"
+        if len(text.strip()) == 1:
+            return "single_char"
+        return None
+
+    def is_incomplete(self, text: str) -> bool:
+        return self.incomplete_reason(text) is not None
+
+
+default_classifier = MessageClassifier()
@@ -0,0 +1,182 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.services.message_classifier import default_classifier
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 결합된 메시지를 받아 처리하는 콜백
+FireCallback = Callable[[str], Awaitable[Any]]
+
+
+class _PendingChat:
+    __slots__ = ("fragments", "chars", "first_at", "timer", "callback")
+
+    def __init__(self):
+        self.fragments: List[str] = []
+        self.chars = 0
+        self.first_at = time.monotonic()
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.callback: Optional[FireCallback] = None
+
+
+class MessageCoalescer:
+    """(에이전트, 채팅방)별 연속 메시지 debounce 스케줄러
+
+    조각 메시지를 모았다가 문장이 완성되거나 quiet_period 동안 새 입력이 없으면
+    합친 메시지로 콜백을 한 번 실행합니다. 새 조각이 오면 타이머를 재시작합니다.
+    """
+
+    def __init__(
+        self,
+        quiet_period: float,
+        max_wait: float,
+        max_fragments: int,
+        max_chars: int,
+        max_chats_per_agent: int,
+    ):
+        self.quiet_period = quiet_period
+        self.max_wait = max_wait
+        self.max_fragments = max_fragments
+        self.max_chars = max_chars
+        self.max_chats_per_agent = max_chats_per_agent
+
+        # agent_key -> {chat_id: _PendingChat} (삽입 순서 = 오래된 순)
+        self._pending: Dict[str, "OrderedDict[str, _PendingChat]"] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.fired: Dict[str, int] = {
+            "complete": 0,
+            "quiet": 0,
+            "max_wait": 0,
+            "limit": 0,
+            "overflow": 0,
+            "restored": 0,
+        }
+        self.cancelled = 0
+
+    def submit(self, agent_key: str, chat_id, text: str, callback: FireCallback):
+        """조각 메시지 추가 - 콜백은 가장 최근 것으로 교체됨"""
+        chat_key = str(chat_id)
+        chats = self._pending.setdefault(agent_key, OrderedDict())
+        state = chats.get(chat_key)
+        if state is None:
+            state = _PendingChat()
+            chats[chat_key] = state
+            self._enforce_chat_limit(agent_key, chats, protect=chat_key)
+
+        state.fragments.append(text)
+        state.chars += len(text)
+        state.callback = callback
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+
+        combined = " ".join(state.fragments)
+        if not default_classifier.is_incomplete(combined):
+            self._fire(agent_key, chat_key, "complete")
+        elif len(state.fragments) >= self.max_fragments or state.chars >= self.max_chars:
+            self._fire(agent_key, chat_key, "limit")
+        elif time.monotonic() - state.first_at >= self.max_wait:
+            self._fire(agent_key, chat_key, "max_wait")
+        else:
+            loop = asyncio.get_running_loop()
+            state.timer = loop.call_later(self.quiet_period, self._fire, agent_key, chat_key, "quiet")
+            logger.debug("⏳ 연속 메시지 대기 중",
+                         agent_key=agent_key,
+                         chat_id=chat_key,
+                         fragment_count=len(state.fragments))
+
+    def restore(self, agent_key: str, chat_id, fragments: List[str], callback: FireCallback):
+        """재시작 전에 모이던 조각 메시지 복원 - quiet_period 후 스스로 처리됨
+
+        그 사이에 새 조각이 오면 평소처럼 이어 붙고, 이미 새 조각이 대기 중이면 섞지 않고 바로 따로 처리합니다.
+        """
+        chat_key = str(chat_id)
+        chats = self._pending.setdefault(agent_key, OrderedDict())
+        if chat_key in chats:
+            self.fired["restored"] += 1
+            self._run(agent_key, chat_key, " ".join(fragments), callback)
+            return
+        state = _PendingChat()
+        state.fragments.extend(fragments)
+        state.chars = sum(len(fragment) for fragment in fragments)
+        state.callback = callback
+        chats[chat_key] = state
+        self._enforce_chat_limit(agent_key, chats, protect=chat_key)
+        state.timer = asyncio.get_running_loop().call_later(self.quiet_period, self._fire, agent_key, chat_key, "quiet")
+
+    def _enforce_chat_limit(self, agent_key: str, chats: "OrderedDict[str, _PendingChat]", protect: str):
+        """에이전트별 대기 채팅방 수 제한 - 초과 시 가장 오래된 채팅방을 즉시 처리"""
+        while len(chats) > self.max_chats_per_agent:
+            oldest = next(iter(chats))
+            if oldest == protect:
+                break
+            self._fire(agent_key, oldest, "overflow")
+
+    def _fire(self, agent_key: str, chat_key: str, reason: str):
+        chats = self._pending.get(agent_key)
+        if not chats:
+            return
+        state = chats.pop(chat_key, None)
+        if not chats:
+            del self._pending[agent_key]
+        if state is None:
+            return
+        if state.timer is not None:
+            state.timer.cancel()
+
+        combined = " ".join(state.fragments)
+        self.fired[reason] += 1
+        if len(state.fragments) > 1:
+            logger.info("🔗 연속 메시지 결합",
+                        agent_key=agent_key,
+                        chat_id=chat_key,
+                        fragment_count=len(state.fragments),
+                        combined=combined,
+                        reason=reason)
+
+        self._run(agent_key, chat_key, combined, state.callback)
+
+    def _run(self, agent_key: str, chat_key: str, combined: str, callback: FireCallback):
+        task = asyncio.get_running_loop().create_task(callback(combined))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("연속 메시지 콜백 실패", error=str(task.exception()))
+
+    def cancel_agent(self, agent_key: str) -> int:
+        """에이전트의 대기 중인 조각 메시지 폐기"""
+        chats = self._pending.pop(agent_key, None) or {}
+        for state in chats.values():
+            if state.timer is not None:
+                state.timer.cancel()
+        self.cancelled += len(chats)
+        return len(chats)
+
+    def cancel_all(self):
+        for agent_key in list(self._pending):
+            self.cancel_agent(agent_key)
+
+    def iter_pending(self) -> Iterator[Tuple[str, str, List[str], float]]:
+        """대기 중인 조각 메시지 순회 - (agent_key, chat_key, 조각 목록, 첫 조각 시각)"""
+        for agent_key, chats in list(self._pending.items()):
+            for chat_key, state in list(chats.items()):
+                yield agent_key, chat_key, list(state.fragments), state.first_at
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_agents": len(self._pending),
+            "pending_chats": sum(len(chats) for chats in self._pending.values()),
+            "pending_fragments": sum(len(s.fragments) for chats in self._pending.values() for s in chats.values()),
+            "running_callbacks": len(self._tasks),
+            "quiet_period_sec": self.quiet_period,
+            "fired": dict(self.fired),
+            "cancelled": self.cancelled,
+        }
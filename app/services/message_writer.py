@@ -0,0 +1,159 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.config import settings
+from app.services import supabase_service
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class MessageWriter:
+    """messages 테이블 write-behind 저장기 - 모든 에이전트의 행을 모아 bulk insert"""
+
+    def __init__(
+        self,
+        max_buffer: int,
+        batch_size: int,
+        flush_interval: float,
+        max_retries: int,
+        retry_base_delay: float,
+    ):
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # 메트릭
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+        self.retries = 0
+        self.flush_count = 0
+        self.last_flush_latency_ms = 0.0
+        self.max_flush_latency_ms = 0.0
+        self._total_flush_latency_ms = 0.0
+
+    def enqueue(self, row: Dict[str, Any]) -> bool:
+        """행 추가 (절대 대기하지 않음, 버퍼가 가득 차면 가장 오래된 행을 버림)"""
+        dropped = False
+        if len(self._buffer) >= self.max_buffer:
+            self._buffer.popleft()
+            self.dropped += 1
+            dropped = True
+            logger.warning("메시지 저장 버퍼 초과 - 가장 오래된 행 삭제", max_buffer=self.max_buffer)
+
+        self._buffer.append(row)
+        self.enqueued += 1
+        if self._wakeup is not None and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return not dropped
+
+    async def start(self):
+        """백그라운드 flush 루프 시작"""
+        if self._task and not self._task.done():
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Message writer started",
+                    batch_size=self.batch_size,
+                    flush_interval=self.flush_interval,
+                    max_buffer=self.max_buffer)
+
+    async def stop(self):
+        """flush 루프 종료 후 남은 행 모두 저장 (진행 중인 배치는 취소하지 않음)"""
+        if self._task:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        logger.info("Message writer stopped", written=self.written, dropped=self.dropped)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("메시지 flush 루프 오류", error=str(e))
+
+    async def flush(self):
+        """버퍼의 행을 batch_size 단위로 저장"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                await self._write_batch(batch)
+
+    async def _write_batch(self, rows: List[Dict[str, Any]]):
+        """재시도(지수 백오프 + 지터) 포함 bulk insert"""
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                await supabase_service.insert_messages_async(rows)
+                self.written += len(rows)
+                self._record_flush(time.perf_counter() - started)
+                return
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self.failed_batches += 1
+                    self.dropped += len(rows)
+                    logger.error("메시지 bulk 저장 실패 - 배치 폐기",
+                                 rows=len(rows), attempts=attempt + 1, error=str(e))
+                    return
+                self.retries += 1
+                delay = self.retry_base_delay * (2 ** attempt) * (0.5 + random.random())
+                logger.warning("메시지 bulk 저장 재시도",
+                               rows=len(rows), attempt=attempt + 1, delay=round(delay, 2), error=str(e))
+                await asyncio.sleep(delay)
+
+    def _record_flush(self, elapsed: float):
+        latency_ms = elapsed * 1000
+        self.flush_count += 1
+        self.last_flush_latency_ms = latency_ms
+        self.max_flush_latency_ms = max(self.max_flush_latency_ms, latency_ms)
+        self._total_flush_latency_ms += latency_ms
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._buffer),
+            "max_buffer": self.max_buffer,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+            "retries": self.retries,
+            "flush_count": self.flush_count,
+            "last_flush_latency_ms": round(self.last_flush_latency_ms, 2),
+            "avg_flush_latency_ms": round(self._total_flush_latency_ms / self.flush_count, 2) if self.flush_count else 0.0,
+            "max_flush_latency_ms": round(self.max_flush_latency_ms, 2),
+        }
+
+
+# 전역 인스턴스
+message_writer = MessageWriter(
+    max_buffer=settings.message_writer_max_buffer,
+    batch_size=settings.message_writer_batch_size,
+    flush_interval=settings.message_writer_flush_interval_sec,
+    max_retries=settings.message_writer_max_retries,
+    retry_base_delay=settings.message_writer_retry_base_delay_sec,
+)
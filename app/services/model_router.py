@@ -0,0 +1,193 @@
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+from app.config import settings
+from app.services.message_classifier import MessageDecision, default_classifier
+from app.services.token_budget import token_counter
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 페르소나/테넌트 정책에서 자동 라우팅을 뜻하는 값
+AUTO = "auto"
+
+# "??" 처럼 연속된 물음표는 질문 하나로 셈
+_QUESTION_RE = re.compile(r"[?？]+")
+
+
+@dataclass(frozen=True)
+class Route:
+    """응답 생성에 사용할 모델과 응답 토큰 상한"""
+    name: str
+    model: str
+    max_tokens: int
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    route: Route
+    reason: str
+
+
+def parse_routes(value: str) -> Dict[str, Route]:
+    """"light:gpt-4o-mini:120,standard:gpt-4o-mini:300" 형식 파싱 (가벼운 route부터, 잘못된 항목은 무시)"""
+    routes = {}
+    for item in value.split(","):
+        parts = item.strip().split(":")
+        try:
+            name, model, max_tokens = parts
+            if name and model and int(max_tokens) > 0:
+                routes[name] = Route(name, model, int(max_tokens))
+        except ValueError:
+            logger.warning("잘못된 모델 route 무시", item=item)
+    return routes
+
+
+def parse_overrides(value: str) -> Dict[str, str]:
+    """"tenant_a:heavy,tenant_b:light" 형식의 테넌트별 route 고정 파싱"""
+    overrides = {}
+    for item in value.split(","):
+        tenant_id, _, route = item.strip().rpartition(":")
+        if tenant_id and route:
+            overrides[tenant_id] = route
+    return overrides
+
+
+class RouteStats:
+    """route별 호출 수, 생성 지연시간, 토큰 사용량"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._routes: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        entry = self._routes.get(name)
+        if entry is None:
+            entry = self._routes[name] = {
+                "calls": 0,
+                "failures": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "reasons": {},
+                "latency": deque(maxlen=self.window),
+            }
+        return entry
+
+    def chosen(self, decision: RouteDecision):
+        reasons = self._entry(decision.route.name)["reasons"]
+        reasons[decision.reason] = reasons.get(decision.reason, 0) + 1
+
+    def record(self, name: str, latency_sec: float, prompt_tokens: int, completion_tokens: int):
+        entry = self._entry(name)
+        entry["calls"] += 1
+        entry["prompt_tokens"] += prompt_tokens or 0
+        entry["completion_tokens"] += completion_tokens or 0
+        entry["latency"].append(latency_sec)
+
+    def failed(self, name: str):
+        self._entry(name)["failures"] += 1
+
+    @staticmethod
+    def _percentile(samples: Deque[float], pct: float) -> float:
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000, 1)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for name, entry in self._routes.items():
+            calls = entry["calls"]
+            latency = entry["latency"]
+            result[name] = {
+                "calls": calls,
+                "failures": entry["failures"],
+                "reasons": dict(entry["reasons"]),
+                "p50_ms": self._percentile(latency, 0.5) if latency else 0.0,
+                "p95_ms": self._percentile(latency, 0.95) if latency else 0.0,
+                "prompt_tokens": entry["prompt_tokens"],
+                "completion_tokens": entry["completion_tokens"],
+                "avg_prompt_tokens": round(entry["prompt_tokens"] / calls, 1) if calls else 0.0,
+                "avg_completion_tokens": round(entry["completion_tokens"] / calls, 1) if calls else 0.0,
+            }
+        return result
+
+
+class ModelRouter:
+    """요청별 모델/max_tokens 선택
+
+    우선순위: 테넌트 고정(LLM_ROUTE_TENANT_OVERRIDES) → 페르소나 정책(model_route) → 자동 판단
+    자동 판단은 이미 계산된 값만 사용 (메시지 토큰 수, 질문/직접 언급, 프롬프트 창 크기):
+    - 짧고 질문/언급이 아닌 메시지 → 가장 가벼운 route
+    - 긴 메시지, 여러 개의 질문, 긴 대화 흐름 속의 질문 → 가장 무거운 route
+    - 그 외 → default_route
+    """
+
+    def __init__(self, routes: Dict[str, Route], default_route: str, tenant_overrides: Dict[str, str],
+                 light_max_tokens: int, heavy_min_tokens: int, heavy_context_tokens: int):
+        if not routes:
+            routes = {"default": Route("default", settings.openai_default_model, settings.llm_completion_token_allowance)}
+        self.routes = routes
+        ordered: List[Route] = list(routes.values())
+        self.light = ordered[0]
+        self.heavy = ordered[-1]
+        self.default = routes.get(default_route) or ordered[len(ordered) // 2]
+        self.tenant_overrides = tenant_overrides
+        self.light_max_tokens = light_max_tokens
+        self.heavy_min_tokens = heavy_min_tokens
+        self.heavy_context_tokens = heavy_context_tokens
+        self.route_stats = RouteStats()
+
+    def _pinned(self, policy: Optional[str], source: str) -> Optional[Route]:
+        if not policy or policy == AUTO:
+            return None
+        route = self.routes.get(policy)
+        if route is None:
+            logger.warning("알 수 없는 모델 route - 자동 판단 사용", route=policy, source=source)
+        return route
+
+    def choose(self, message: str, window_info: Dict[str, Any], tenant_id: str = None,
+               persona_policy: str = None, message_decision: Optional[MessageDecision] = None) -> RouteDecision:
+        """message_decision이 있으면 메시지를 다시 분류하지 않고 그 질문/언급 판단을 사용"""
+        route = self._pinned(self.tenant_overrides.get(str(tenant_id)), "tenant")
+        if route is not None:
+            decision = RouteDecision(route, "tenant_override")
+        else:
+            route = self._pinned(persona_policy, "persona")
+            decision = (RouteDecision(route, "persona_policy") if route is not None
+                        else self._auto(message, window_info, message_decision))
+        self.route_stats.chosen(decision)
+        return decision
+
+    def _auto(self, message: str, window_info: Dict[str, Any],
+              message_decision: Optional[MessageDecision] = None) -> RouteDecision:
+        message_tokens = token_counter.count(message)
+        asks = (message_decision or default_classifier.classify(message)).asks
+
+        if message_tokens >= self.heavy_min_tokens:
+            return RouteDecision(self.heavy, "long_message")
+        if message_tokens > self.light_max_tokens and len(_QUESTION_RE.findall(message)) >= 2:
+            return RouteDecision(self.heavy, "multi_question")
+        if asks and window_info.get("prompt_tokens", 0) >= self.heavy_context_tokens:
+            return RouteDecision(self.heavy, "long_context")
+        if message_tokens <= self.light_max_tokens and not asks:
+            return RouteDecision(self.light, "short_message")
+        return RouteDecision(self.default, "default")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routes": {name: {"model": r.model, "max_tokens": r.max_tokens} for name, r in self.routes.items()},
+            "default": self.default.name,
+            "tenant_overrides": len(self.tenant_overrides),
+            "usage": self.route_stats.stats(),
+        }
+
+
+model_router = ModelRouter(
+    routes=parse_routes(settings.llm_routes),
+    default_route=settings.llm_route_default,
+    tenant_overrides=parse_overrides(settings.llm_route_tenant_overrides),
+    light_max_tokens=settings.llm_route_light_max_tokens,
+    heavy_min_tokens=settings.llm_route_heavy_min_tokens,
+    heavy_context_tokens=settings.llm_route_heavy_context_tokens,
+)
@@ -1,15 +1,22 @@
 import os, asyncio
 import openai
-import re
 import time
 import random
-from typing import List, Dict
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional
+from app.services import cache_service
+from app.config import settings
+from app.services.llm_scheduler import llm_scheduler
+from app.services.model_router import Route, model_router
+from app.services.token_budget import build_window, token_counter, window_stats
+from app.services.message_classifier import MessageClassifier, MessageDecision, SAMPLE_PROBABILITY, default_classifier
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
 # OpenAI 클라이언트 초기화 (1.0+ 버전)
-client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# 429/일시 오류 재시도는 llm_scheduler가 담당하므로 SDK 자체 재시도는 끔
+client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 
 ROLE_GUIDE = {
     "Chatter":   "You are a friendly content sharer. Respond naturally like a real person.",
@@ -17,251 +24,86 @@ ROLE_GUIDE = {
     "Admin":     "You are the system administrator bot.",
 }
 
-# 연속 메시지 추적을 위한 전역 변수
-message_buffer = {}  # {chat_id: {"messages": [], "last_time": timestamp}}
+SPLIT_MARKER = "---SPLIT---"
+
+
+class GenerationStats:
+    """응답 생성 시간 통계 - 첫 응답 조각까지의 시간과 전체 생성 시간을 따로 기록"""
+
+    def __init__(self, window: int = 1000):
+        self.calls = 0
+        self.streamed = 0
+        self._first_segment: Deque[float] = deque(maxlen=window)
+        self._total: Deque[float] = deque(maxlen=window)
+
+    def record(self, first_segment_sec: Optional[float], total_sec: float, streamed: bool):
+        self.calls += 1
+        if streamed:
+            self.streamed += 1
+        if first_segment_sec is not None:
+            self._first_segment.append(first_segment_sec)
+        self._total.append(total_sec)
+
+    @staticmethod
+    def _summary(samples: Deque[float]) -> Dict[str, float]:
+        if not samples:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "avg_ms": 0.0}
+        ordered = sorted(samples)
+        return {
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+            "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "streamed": self.streamed,
+            "time_to_first_segment": self._summary(self._first_segment),
+            "total_generation": self._summary(self._total),
+        }
+
+
+generation_stats = GenerationStats()
 
 def is_incomplete_sentence(text: str) -> bool:
     """문장이 완성되지 않았는지 판단"""
-    
-    # 1. 문장 부호로 끝나는지 확인
-    has_ending = text.strip().endswith(('.', '!', '?', '~', 'ㅋ', 'ㅎ'))
-    
-    # 2. 조사나 불완전한 단어로 끝나는지 확인
-    incomplete_endings = [
-        '그리고', '하지만', '그런데', '그래서', '그러면',
-        '은', '는', '도', '만', '부터', '까지', '에서', '에게',
-        '안녕', '오늘', '내일', '어제', '지금', '나중에',
-        '그리고', '하지만', '그런데', '그래서', '그러면'
-    ]
-    
-    ends_with_incomplete = any(text.endswith(word) for word in incomplete_endings)
-    
-    # 3. 숫자나 특수문자로 끝나는 경우
-    ends_with_number = text[-1].isdigit() if text else False
-    ends_with_symbol = text[-1] in '+-*/=()[]{}' if text else False
-    
-    # 4. 한 글자로 끝나는 경우
-    is_single_char = len(text.strip()) == 1
-    
-    result = not has_ending or ends_with_incomplete or ends_with_number or ends_with_symbol or is_single_char
-    
-    logger.debug("🔍 문장 완성도 판단", 
-                text=text, 
-                has_ending=has_ending,
-                ends_with_incomplete=ends_with_incomplete,
-                ends_with_number=ends_with_number,
-                ends_with_symbol=ends_with_symbol,
-                is_single_char=is_single_char,
-                is_incomplete=result)
-    
-    return result
+    reason = default_classifier.incomplete_reason(text)
+    logger.debug("🔍 문장 완성도 판단", text=text, is_incomplete=reason is not None, reason=reason)
+    return reason is not None
 
-def should_wait_for_more_messages(chat_id: str, current_message: str, context: list[dict] = None) -> bool:
-    """더 많은 메시지를 기다려야 하는지 판단"""
-    
-    global message_buffer
-    
-    # 1. 현재 시간
-    current_time = time.time()
-    
-    # 2. 채팅방별 메시지 버퍼 초기화
-    if chat_id not in message_buffer:
-        message_buffer[chat_id] = {
-            "messages": [],
-            "last_time": current_time
-        }
-    
-    buffer = message_buffer[chat_id]
-    
-    # 3. 시간이 너무 오래 지났으면 버퍼 초기화 (30초)
-    if current_time - buffer["last_time"] > 30:
-        buffer["messages"] = []
-        logger.debug("🔄 버퍼 초기화 (30초 경과)", chat_id=chat_id)
-    
-    # 4. 현재 메시지를 버퍼에 추가
-    buffer["messages"].append(current_message)
-    buffer["last_time"] = current_time
-    
-    logger.debug("📝 메시지 버퍼에 추가", 
-                chat_id=chat_id, 
-                message=current_message,
-                buffer_count=len(buffer["messages"]))
-    
-    # 5. 연속 메시지인지 판단
-    if len(buffer["messages"]) == 1:
-        # 첫 번째 메시지인 경우
-        is_incomplete = is_incomplete_sentence(current_message)
-        logger.debug("🔍 첫 번째 메시지 판단", 
-                    chat_id=chat_id, 
-                    message=current_message,
-                    is_incomplete=is_incomplete)
-        return is_incomplete
-    
-    # 6. 여러 메시지가 있는 경우
-    combined_message = " ".join(buffer["messages"])
-    
-    # 7. 완성된 문장인지 확인
-    if not is_incomplete_sentence(combined_message):
-        # 완성된 문장이면 버퍼 초기화
-        buffer["messages"] = []
-        logger.debug("✅ 완성된 문장 감지", 
-                    chat_id=chat_id, 
-                    combined_message=combined_message)
-        return False
-    
-    # 8. 아직 완성되지 않았으면 더 기다림
-    logger.debug("⏳ 아직 완성되지 않은 문장", 
-                chat_id=chat_id, 
-                combined_message=combined_message,
-                buffer_count=len(buffer["messages"]))
-    return True
-
-def get_combined_message(chat_id: str) -> str:
-    """버퍼의 모든 메시지를 합쳐서 반환"""
-    global message_buffer
-    
-    if chat_id in message_buffer:
-        combined = " ".join(message_buffer[chat_id]["messages"])
-        message_buffer[chat_id]["messages"] = []  # 버퍼 초기화
-        logger.debug("🔗 버퍼 메시지 결합", 
-                    chat_id=chat_id, 
-                    combined_message=combined)
-        return combined
-    
-    logger.debug("📭 버퍼가 비어있음", chat_id=chat_id)
-    return ""
+async def should_respond_to_message(message: str, context: list[dict] = None, chat_id: str = None,
+                                    classifier: MessageClassifier = None, decision: MessageDecision = None) -> bool:
+    """메시지에 답변해야 할지 판단 (연속 메시지 결합은 MessageCoalescer가 먼저 처리)
+
+    decision을 주면 다시 분류하지 않고 그 결과를 사용합니다.
+    """
+    if decision is None:
+        decision = (classifier or default_classifier).classify(message, context)
 
-async def should_respond_to_message(message: str, context: list[dict] = None, chat_id: str = None) -> bool:
-    """메시지에 답변해야 할지 판단"""
-    
-    logger.info("🔍 메시지 필터링 시작", 
-                message=message, 
-                chat_id=chat_id,
-                context_length=len(context) if context else 0)
-    
-    # 1. 연속 메시지 처리
-    if chat_id and should_wait_for_more_messages(chat_id, message, context):
-        logger.info("⏳ 연속 메시지 대기 중", 
-                    chat_id=chat_id, 
-                    message=message)
-        return False  # 더 기다림
-    
-    # 실제 처리할 메시지 (연속 메시지가 합쳐진 것)
-    actual_message = get_combined_message(chat_id) if chat_id else message
-    
-    if actual_message != message:
-        logger.info("🔗 연속 메시지 결합", 
-                    original=message, 
-                    combined=actual_message)
-    
-    # 2. 명백한 무의미한 메시지 필터링
-    meaningless_patterns = [
-        r'^[ㅋㅎ]+$',  # 웃음만
-        r'^[ㅇㅎ]+$',  # 추임새만
-        r'^[.]{2,}$',  # 점만
-        r'^[~]{2,}$',  # 물결만
-        r'^[!]{2,}$',  # 느낌표만
-        r'^[?]{2,}$',  # 물음표만
-        r'^[ㅁㅇㅎ]+$',  # 추임새 조합
-        r'^[ㅋㅎ!~.]+$',  # 감정 표현만
-    ]
-    
-    for pattern in meaningless_patterns:
-        if re.match(pattern, actual_message.strip()):
-            logger.info("❌ 무의미한 패턴 필터링", 
-                        pattern=pattern, 
-                        message=actual_message)
-            return False
-    
-    # 3. 짧은 추임새 필터링
-    short_responses = ['음', '어', '응', '그래', '맞아', '좋아', 'ㅇㅇ', 'ㅇ', 'ㅎ', 'ㅋ']
-    if actual_message.strip() in short_responses:
-        logger.info("❌ 짧은 추임새 필터링", 
-                    message=actual_message)
-        return False
-    
-    # 4. AI에게 질문하는지 판단
-    question_keywords = ['?', '뭐', '무엇', '어떻게', '왜', '언제', '어디', '누가', '몇']
-    has_question = any(keyword in actual_message for keyword in question_keywords)
-    
-    if has_question:
-        logger.info("✅ 질문 감지", 
-                    message=actual_message, 
-                    keywords=[k for k in question_keywords if k in actual_message])
-    
-    # 5. 맥락 기반 판단 (AI에게 직접 언급)
-    direct_mentions = ['너', '당신', 'AI', '봇', '기계', '로봇']
-    is_direct_mention = any(mention in actual_message for mention in direct_mentions)
-    
-    if is_direct_mention:
-        logger.info("✅ 직접 언급 감지", 
-                    message=actual_message, 
-                    mentions=[m for m in direct_mentions if m in actual_message])
-    
-    # 6. 대화 맥락 분석 (선택사항)
-    context_analysis = False
-    if context and len(context) > 0:
-        # 최근 대화에서 AI가 언급되었는지 확인
-        recent_context = context[-3:]  # 최근 3개 메시지
-        for msg in recent_context:
-            if msg.get('role') == 'assistant':
-                # AI가 최근에 언급되었다면 더 적극적으로 응답
-                context_analysis = True
-                logger.info("✅ 맥락 분석: AI 최근 언급 감지")
-                break
-    
-    # 7. 최종 판단
-    # 질문이 있거나 직접 언급이 있으면 응답
-    if has_question or is_direct_mention:
-        logger.info("✅ 응답 결정: 질문 또는 직접 언급", 
-                    has_question=has_question, 
-                    is_direct_mention=is_direct_mention)
-        return True
-    
-    # 긴 메시지(10자 이상)는 응답
-    if len(actual_message.strip()) >= 10:
-        logger.info("✅ 응답 결정: 긴 메시지", 
-                    length=len(actual_message.strip()), 
-                    message=actual_message)
-        return True
-    
     # 짧은 메시지는 30% 확률로만 응답 (자연스러움)
-    should_respond = random.random() < 0.3
-    
-    logger.info("🎲 짧은 메시지 확률 판단", 
-                message=actual_message, 
-                length=len(actual_message.strip()), 
-                probability=0.3, 
-                result=should_respond)
-    
-    if should_respond:
-        logger.info("✅ 응답 결정: 확률 기반")
-    else:
-        logger.info("❌ 응답 거부: 확률 기반")
-    
-    return should_respond
+    should_respond = decision.action == "respond"
+    if decision.should_sample:
+        should_respond = random.random() < SAMPLE_PROBABILITY
 
-async def generate_reply(persona_prompt: str, role: str, context: list[dict], user_msg: str):
-    """기본 응답 생성"""
-    messages = (
-        context
-        + [{"role": "system", "content": persona_prompt}]
-        + [{"role": "assistant", "content": ROLE_GUIDE[role]}]
-        + [{"role": "user", "content": user_msg}]
-    )
+    logger.info("✅ 응답 결정" if should_respond else "❌ 응답 거부",
+                message=message,
+                chat_id=chat_id,
+                context_length=len(context) if context else 0,
+                action=decision.action,
+                reasons=decision.reasons,
+                matched=decision.matched)
 
-    resp = await client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        temperature=0.7,
-    )
-    return resp.choices[0].message.content
+    return should_respond
 
-async def generate_multi_reply(persona_prompt: str, role: str, context: list[dict], user_msg: str, chat_participants: List[str] = None):
-    """여러 명에게 답장하는 응답 생성"""
-    
-    # 시스템 프롬프트에 멀티 리플라이 가이드 추가
-    multi_reply_guide = """
+def is_priority_message(message: str, classifier: MessageClassifier = None, decision: MessageDecision = None) -> bool:
+    """질문이나 직접 언급이면 LLM 스케줄러의 우선 lane 사용 (decision을 주면 재분류하지 않음)"""
+    if decision is None:
+        decision = (classifier or default_classifier).classify(message)
+    return decision.asks
+
+# 모드별 시스템 프롬프트 가이드 (persona_prompt 뒤에 붙음)
+MULTI_REPLY_GUIDE = """
     You are in a group chat. When responding to multiple people or complex situations:
     1. You can respond to multiple people in one message
     2. You can split your response into multiple messages if it's more natural
@@ -275,34 +117,8 @@ async def generate_multi_reply(persona_prompt: str, role: str, context: list[dic
     Example:
     "Hey @john, that's a great point! ---SPLIT--- @sarah, I think you're right about that too."
     """
-    
-    enhanced_prompt = persona_prompt + "\n\n" + multi_reply_guide
-    
-    messages = (
-        context
-        + [{"role": "system", "content": enhanced_prompt}]
-        + [{"role": "assistant", "content": ROLE_GUIDE[role]}]
-        + [{"role": "user", "content": user_msg}]
-    )
-
-    resp = await client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        temperature=0.7,
-    )
-    
-    response_text = resp.choices[0].message.content
-    
-    # 응답을 여러 개로 분할
-    if "---SPLIT---" in response_text:
-        return [msg.strip() for msg in response_text.split("---SPLIT---") if msg.strip()]
-    else:
-        return [response_text]
 
-async def generate_natural_reply(persona_prompt: str, role: str, context: list[dict], user_msg: str):
-    """자연스러운 응답 생성 (타이핑 효과, 지연 등)"""
-    
-    natural_guide = """
+NATURAL_GUIDE = """
     You are a real person in a group chat. Be natural and conversational:
     1. Use casual language and emojis when appropriate
     2. Show personality and emotion
@@ -310,20 +126,264 @@ async def generate_natural_reply(persona_prompt: str, role: str, context: list[d
     4. Be responsive to the conversation flow
     5. Don't be too formal or robotic
     """
-    
-    enhanced_prompt = persona_prompt + "\n\n" + natural_guide
-    
-    messages = (
-        context
-        + [{"role": "system", "content": enhanced_prompt}]
-        + [{"role": "assistant", "content": ROLE_GUIDE[role]}]
-        + [{"role": "user", "content": user_msg}]
+
+SUMMARY_GUIDE = """
+    You maintain a running summary of a group chat for an assistant that only sees recent messages.
+    Merge the new messages into the previous summary. Keep who said what, open questions,
+    commitments, preferences and facts people shared. Drop greetings and small talk.
+    Write in the language of the conversation, as compact plain sentences.
+    """
+
+# 대화 요약을 프롬프트에 넣을 때 붙이는 머리말
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+MODE_GUIDES = {
+    "basic": None,
+    "multi": MULTI_REPLY_GUIDE,
+    "natural": NATURAL_GUIDE,
+}
+
+def _compile_prefix(persona_prompt: str, role: str, mode: str) -> tuple:
+    """시스템 프롬프트 + 역할 가이드로 이루어진 고정 prefix 메시지 생성"""
+    guide = MODE_GUIDES[mode]
+    system_prompt = persona_prompt + "\n\n" + guide if guide else persona_prompt
+    return (
+        {"role": "system", "content": system_prompt},
+        {"role": "assistant", "content": ROLE_GUIDE[role]},
     )
 
-    resp = await client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        temperature=0.8,  # 더 창의적인 응답
+def get_prompt_prefix(persona_prompt: str, role: str, mode: str, persona_key: tuple = None) -> tuple:
+    """(페르소나, 역할, 모드)별로 한 번만 컴파일한 prefix 반환
+
+    매 호출마다 같은 문자열/메시지 객체가 맨 앞에 오므로 provider의 prompt prefix 캐시가 적중합니다.
+    페르소나가 수정되면 cache_service.invalidate_persona에서 함께 무효화되고,
+    다른 프로세스에서 수정된 경우에도 원본 프롬프트가 달라지면 다시 컴파일합니다.
+    """
+    if persona_key is None:
+        return _compile_prefix(persona_prompt, role, mode)
+
+    cache_key = cache_service.prompt_prefix_key(persona_key, role, mode)
+    hit, cached = cache_service.prompt_prefix_cache.lookup(cache_key)
+    if hit and cached[0] == persona_prompt:
+        return cached[1]
+
+    prefix = _compile_prefix(persona_prompt, role, mode)
+    cache_service.prompt_prefix_cache.set(cache_key, (persona_prompt, prefix))
+    return prefix
+
+def _build_messages(persona_prompt: str, role: str, mode: str, context: list[dict], user_msg: str,
+                    max_prompt_tokens: int = None, persona_key: tuple = None, summary: tuple = None):
+    """고정 prefix → (대화 요약) → 토큰 예산에 맞춘 최근 대화 → 사용자 메시지 순서로 메시지 목록 구성
+
+    summary는 (요약 문자열, 요약에 접힌 원문 토큰 수)
+    """
+    prefix = get_prompt_prefix(persona_prompt, role, mode, persona_key)
+    user = {"role": "user", "content": user_msg}
+    summary_text, summary_source_tokens = summary if summary else ("", 0)
+    summary_messages = [{"role": "system", "content": SUMMARY_PREFIX + summary_text}] if summary_text else []
+
+    window, window_info = build_window(context, [*prefix, *summary_messages, user], max_prompt_tokens)
+    window_info["summary_tokens"] = sum(token_counter.message_tokens(m) for m in summary_messages)
+    window_info["summary_source_tokens"] = summary_source_tokens if summary_text else 0
+    return [*prefix, *summary_messages, *window, user], window_info
+
+def _cached_tokens(usage) -> int:
+    """usage.prompt_tokens_details.cached_tokens (SDK 버전에 따라 dict 또는 객체)"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is None:
+        return 0
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", 0) or 0
+
+async def _scheduled_create(window_info: Dict, tenant_id: str, priority: bool, route: Route = None, hold: bool = False, **kwargs):
+    """테넌트별 공정 큐잉/속도 제한을 거쳐 chat completion 호출 - (응답, 예상 토큰) 반환
+
+    route가 있으면 그 모델과 max_tokens를 사용하고, 없으면 기본 모델로 호출합니다.
+    hold=True면 응답 자리에 (응답, release)가 옵니다 (llm_scheduler.submit 참고).
+    """
+    model = route.model if route else settings.openai_default_model
+    if route:
+        kwargs.setdefault("max_tokens", route.max_tokens)
+    estimated_tokens = window_info["prompt_tokens"] + (kwargs.get("max_tokens") or settings.llm_completion_token_allowance)
+    resp = await llm_scheduler.submit(
+        tenant_id or "default",
+        estimated_tokens,
+        lambda: client.chat.completions.create(model=model, **kwargs),
+        priority=priority,
+        hold=hold,
     )
+    return resp, estimated_tokens
+
+def _choose_route(user_msg: str, window_info: Dict, tenant_id: str, route_policy: str,
+                  message_decision: MessageDecision = None) -> Route:
+    """메시지/프롬프트 크기와 테넌트·페르소나 정책으로 모델 route 선택 (message_decision은 이미 계산된 분류 결과)"""
+    decision = model_router.choose(user_msg, window_info, tenant_id, route_policy, message_decision)
+    window_info["route"] = decision.route.name
+    logger.debug("모델 route 선택", tenant_id=tenant_id, route=decision.route.name,
+                 model=decision.route.model, reason=decision.reason)
+    return decision.route
+
+async def _create_completion(messages: list[dict], window_info: Dict, temperature: float,
+                             tenant_id: str = None, priority: bool = False, route: Route = None):
+    """chat completion 호출 + 호출별 프롬프트 토큰, route별 지연시간/토큰 기록"""
+    started = time.monotonic()
+    try:
+        resp, estimated_tokens = await _scheduled_create(
+            window_info, tenant_id, priority, route, messages=messages, temperature=temperature
+        )
+    except Exception:
+        if route:
+            model_router.route_stats.failed(route.name)
+        raise
+    usage = getattr(resp, "usage", None)
+    cached_tokens = _cached_tokens(usage)
+    window_stats.record(window_info, usage, cached_tokens)
+    llm_scheduler.record_usage(estimated_tokens, getattr(usage, "total_tokens", None))
+    if route:
+        model_router.route_stats.record(route.name, time.monotonic() - started,
+                                        getattr(usage, "prompt_tokens", None) or window_info["prompt_tokens"],
+                                        getattr(usage, "completion_tokens", None))
+    logger.info("OpenAI 호출 토큰",
+                route=window_info.get("route"),
+                estimated_prompt_tokens=window_info["prompt_tokens"],
+                prompt_tokens=getattr(usage, "prompt_tokens", None),
+                cached_tokens=cached_tokens,
+                completion_tokens=getattr(usage, "completion_tokens", None),
+                budget=window_info["budget"],
+                context_messages=window_info["context_messages"],
+                dropped=window_info["dropped"],
+                truncated=window_info["truncated"])
+    return resp.choices[0].message.content
+
+async def generate_reply(persona_prompt: str, role: str, context: list[dict], user_msg: str,
+                         max_prompt_tokens: int = None, persona_key: tuple = None,
+                         tenant_id: str = None, priority: bool = False, summary: tuple = None,
+                         route_policy: str = None, decision: MessageDecision = None):
+    """기본 응답 생성"""
+    messages, window_info = _build_messages(persona_prompt, role, "basic", context, user_msg, max_prompt_tokens, persona_key, summary)
+    route = _choose_route(user_msg, window_info, tenant_id, route_policy, decision)
+    return await _create_completion(messages, window_info, 0.7, tenant_id, priority, route)
+
+async def generate_multi_reply(persona_prompt: str, role: str, context: list[dict], user_msg: str, chat_participants: List[str] = None,
+                               max_prompt_tokens: int = None, persona_key: tuple = None,
+                               tenant_id: str = None, priority: bool = False, summary: tuple = None,
+                               route_policy: str = None, decision: MessageDecision = None):
+    """여러 명에게 답장하는 응답 생성 (시스템 프롬프트에 멀티 리플라이 가이드 추가)"""
+    started = time.monotonic()
+    messages, window_info = _build_messages(persona_prompt, role, "multi", context, user_msg, max_prompt_tokens, persona_key, summary)
+    route = _choose_route(user_msg, window_info, tenant_id, route_policy, decision)
+    response_text = await _create_completion(messages, window_info, 0.7, tenant_id, priority, route)
+    elapsed = time.monotonic() - started
+    generation_stats.record(elapsed, elapsed, streamed=False)
     
-    return resp.choices[0].message.content 
\ No newline at end of file
+    # 응답을 여러 개로 분할
+    if SPLIT_MARKER in response_text:
+        return [msg.strip() for msg in response_text.split(SPLIT_MARKER) if msg.strip()]
+    else:
+        return [response_text]
+
+async def stream_multi_reply(persona_prompt: str, role: str, context: list[dict], user_msg: str, chat_participants: List[str] = None,
+                             max_prompt_tokens: int = None, persona_key: tuple = None,
+                             tenant_id: str = None, priority: bool = False, summary: tuple = None,
+                             route_policy: str = None, decision: MessageDecision = None) -> AsyncIterator[str]:
+    """generate_multi_reply의 스트리밍 버전 - ---SPLIT--- 경계가 도착할 때마다 완성된 응답 조각을 바로 yield"""
+    started = time.monotonic()
+    first_segment_at = None
+    segments = 0
+    messages, window_info = _build_messages(persona_prompt, role, "multi", context, user_msg, max_prompt_tokens, persona_key, summary)
+    route = _choose_route(user_msg, window_info, tenant_id, route_policy, decision)
+
+    # 스트림을 여는 호출(429 재시도 포함)은 스케줄러가 하고, 본문은 여기서 소비 - 다 읽거나 닫을 때까지 동시 실행 슬롯 유지
+    try:
+        (stream, release), estimated_tokens = await _scheduled_create(
+            window_info, tenant_id, priority, route, hold=True, messages=messages, temperature=0.7, stream=True
+        )
+    except Exception:
+        model_router.route_stats.failed(route.name)
+        raise
+
+    buffer = ""
+    completion_chars = []
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            buffer += delta
+            completion_chars.append(delta)
+            if SPLIT_MARKER not in buffer:
+                continue
+            # 마지막 경계 뒤의 미완성 부분만 버퍼에 남김
+            *completed, buffer = buffer.split(SPLIT_MARKER)
+            for part in completed:
+                part = part.strip()
+                if part:
+                    if first_segment_at is None:
+                        first_segment_at = time.monotonic()
+                    segments += 1
+                    yield part
+    finally:
+        # 생성이 취소되면(새 메시지로 대체 등) 남은 스트림을 바로 닫아 연결을 반환
+        response = getattr(stream, "response", None)
+        try:
+            if response is not None:
+                await response.aclose()
+        finally:
+            release()
+        # openai 1.3.0에는 stream_options.include_usage가 없어 스트림에 usage가 오지 않으므로
+        # 프롬프트 추정치 + 실제로 받은 응답의 토큰 수로 TPM 버킷 보정 (중간에 취소돼도 받은 만큼만)
+        llm_scheduler.record_usage(estimated_tokens,
+                                   window_info["prompt_tokens"] + token_counter.count("".join(completion_chars)))
+
+    tail = buffer.strip()
+    if tail:
+        if first_segment_at is None:
+            first_segment_at = time.monotonic()
+        segments += 1
+        yield tail
+
+    # 스트리밍 응답에는 usage가 없으므로 추정치만 기록 (cached 토큰 비율 계산에서 제외)
+    total = time.monotonic() - started
+    first_segment = first_segment_at - started if first_segment_at is not None else None
+    window_stats.record(window_info)
+    generation_stats.record(first_segment, total, streamed=True)
+    model_router.route_stats.record(route.name, total, window_info["prompt_tokens"],
+                                    token_counter.count("".join(completion_chars)))
+    logger.info("OpenAI 스트리밍 응답 완료",
+                route=route.name,
+                estimated_prompt_tokens=window_info["prompt_tokens"],
+                segments=segments,
+                first_segment_ms=round(first_segment * 1000, 1) if first_segment is not None else None,
+                total_ms=round(total * 1000, 1))
+
+async def generate_natural_reply(persona_prompt: str, role: str, context: list[dict], user_msg: str,
+                                 max_prompt_tokens: int = None, persona_key: tuple = None,
+                                 tenant_id: str = None, priority: bool = False, summary: tuple = None,
+                                 route_policy: str = None, decision: MessageDecision = None):
+    """자연스러운 응답 생성 (타이핑 효과, 지연 등)"""
+    messages, window_info = _build_messages(persona_prompt, role, "natural", context, user_msg, max_prompt_tokens, persona_key, summary)
+    route = _choose_route(user_msg, window_info, tenant_id, route_policy, decision)
+    return await _create_completion(messages, window_info, 0.8, tenant_id, priority, route)  # 더 창의적인 응답
+
+async def summarize_conversation(previous_summary: str, messages: list[dict], tenant_id: str = None,
+                                 max_tokens: int = 300):
+    """기존 요약에 새로 밀려난 대화를 합친 새 요약 생성 - (요약, 사용 토큰 수) 반환
+
+    응답 경로와 별개로 실행되며 LLM 스케줄러의 일반 lane을 사용합니다.
+    """
+    transcript = "\n".join(f"{m.get('role', 'user')}: {m.get('content') or ''}" for m in messages)
+    request = [
+        {"role": "system", "content": SUMMARY_GUIDE},
+        {"role": "user", "content": f"Previous summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"},
+    ]
+    window_info = {"prompt_tokens": sum(token_counter.message_tokens(m) for m in request)}
+    resp, estimated_tokens = await _scheduled_create(
+        window_info, tenant_id, False, messages=request, temperature=0.2, max_tokens=max_tokens
+    )
+    usage = getattr(resp, "usage", None)
+    total_tokens = getattr(usage, "total_tokens", None)
+    llm_scheduler.record_usage(estimated_tokens, total_tokens)
+    return (resp.choices[0].message.content or "").strip(), total_tokens or estimated_tokens
@@ -0,0 +1,187 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import settings
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 만료/교체된 클라이언트 연결 해제 대기 상한 (초)
+DISCONNECT_TIMEOUT = 10
+
+
+class PendingAuthFullError(Exception):
+    """대기 중인 인증 세션 수가 상한에 도달함"""
+
+
+class PendingAuth:
+    """인증코드 발송 후 코드 입력을 기다리는 연결된 TelegramClient"""
+
+    __slots__ = ("auth_id", "client", "api_id", "api_hash", "phone_number", "created_at", "expires_at")
+
+    def __init__(self, auth_id: str, client: Any, api_id: int, api_hash: str, phone_number: str, ttl: float):
+        self.auth_id = auth_id
+        self.client = client
+        self.api_id = api_id
+        self.api_hash = api_hash
+        self.phone_number = phone_number
+        self.created_at = time.monotonic()
+        self.expires_at = self.created_at + ttl
+
+
+class PendingAuthStore:
+    """/auth 흐름의 대기 세션 저장소
+
+    - TTL이 지나면 sweep 태스크(또는 다음 요청)가 클라이언트 연결을 끊고 제거
+    - 전역 상한: 코드 발송 전에 reserve()로 자리를 확보하고, 가득 차면 PendingAuthFullError
+    - 전화번호별 상한: 같은 번호로 다시 요청하면 가장 오래된 대기 세션을 끊고 교체
+    TTL이 고정이므로 삽입 순서가 곧 만료 순서입니다.
+    """
+
+    def __init__(self, ttl: float, max_pending: int, max_per_phone: int, sweep_interval: float):
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.max_per_phone = max_per_phone
+        self.sweep_interval = sweep_interval
+
+        self._entries: "OrderedDict[str, PendingAuth]" = OrderedDict()
+        self._by_phone: Dict[str, Set[str]] = {}
+        self._reserved = 0
+        self._sweeper: Optional[asyncio.Task] = None
+
+        self.added = 0
+        self.completed = 0
+        self.reaped = 0
+        self.superseded = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _ensure_started(self):
+        if self.sweep_interval > 0 and (self._sweeper is None or self._sweeper.done()):
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def reserve(self):
+        """코드 발송 전에 자리 확보 (성공하면 add 또는 release를 반드시 호출)"""
+        await self.reap_expired()
+        if len(self._entries) + self._reserved >= self.max_pending:
+            self.rejected += 1
+            raise PendingAuthFullError(f"pending auth limit reached ({self.max_pending})")
+        self._reserved += 1
+
+    def release(self):
+        """코드 발송 실패 시 확보한 자리 반환"""
+        self._reserved = max(0, self._reserved - 1)
+
+    async def add(self, auth_id: str, client: Any, api_id: int, api_hash: str, phone_number: str):
+        """확보한 자리에 대기 세션 등록 - 같은 번호의 대기 세션이 상한을 넘으면 오래된 것부터 교체"""
+        self.release()
+        self._ensure_started()
+        entry = PendingAuth(auth_id, client, api_id, api_hash, phone_number, self.ttl)
+        self._entries[auth_id] = entry
+        phone_ids = self._by_phone.setdefault(phone_number, set())
+        phone_ids.add(auth_id)
+        self.added += 1
+
+        superseded: List[PendingAuth] = []
+        if len(phone_ids) > self.max_per_phone:
+            # OrderedDict 순서(오래된 순)로 교체 대상 선택
+            oldest = [a for a in self._entries if a in phone_ids and a != auth_id]
+            for old_id in oldest[:len(phone_ids) - self.max_per_phone]:
+                superseded.append(self._remove(old_id))
+        if superseded:
+            self.superseded += len(superseded)
+            await self._disconnect_all(superseded, "superseded")
+
+    async def pop(self, auth_id: str) -> Optional[PendingAuth]:
+        """코드 입력 시 대기 세션 꺼내기 (만료됐으면 연결을 끊고 None)"""
+        if auth_id not in self._entries:
+            return None
+        entry = self._remove(auth_id)
+        if entry.expires_at <= time.monotonic():
+            self.reaped += 1
+            await self._disconnect_all([entry], "expired")
+            return None
+        self.completed += 1
+        return entry
+
+    def _remove(self, auth_id: str) -> PendingAuth:
+        entry = self._entries.pop(auth_id)
+        phone_ids = self._by_phone.get(entry.phone_number)
+        if phone_ids is not None:
+            phone_ids.discard(auth_id)
+            if not phone_ids:
+                del self._by_phone[entry.phone_number]
+        return entry
+
+    async def reap_expired(self) -> int:
+        """TTL이 지난 대기 세션의 연결을 끊고 제거"""
+        now = time.monotonic()
+        expired: List[PendingAuth] = []
+        while self._entries:
+            auth_id, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now:
+                break
+            expired.append(self._remove(auth_id))
+        if expired:
+            self.reaped += len(expired)
+            await self._disconnect_all(expired, "expired")
+        return len(expired)
+
+    async def _disconnect_all(self, entries: List[PendingAuth], reason: str):
+        await asyncio.gather(*(self._disconnect(entry, reason) for entry in entries))
+
+    @staticmethod
+    async def _disconnect(entry: PendingAuth, reason: str):
+        try:
+            await asyncio.wait_for(entry.client.disconnect(), timeout=DISCONNECT_TIMEOUT)
+        except Exception as e:
+            logger.warning("대기 인증 클라이언트 연결 해제 실패", auth_id=entry.auth_id, reason=reason, error=str(e))
+            return
+        logger.info("대기 인증 세션 정리", auth_id=entry.auth_id, phone=entry.phone_number, reason=reason)
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.reap_expired()
+            except Exception as e:
+                logger.error("대기 인증 세션 정리 오류", error=str(e))
+
+    async def stop(self):
+        """sweep 중지 후 남은 대기 세션 모두 연결 해제"""
+        if self._sweeper:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        entries = [self._remove(auth_id) for auth_id in list(self._entries)]
+        await self._disconnect_all(entries, "shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        oldest = next(iter(self._entries.values()), None)
+        return {
+            "open_clients": len(self._entries),
+            "reserved": self._reserved,
+            "max_pending": self.max_pending,
+            "max_per_phone": self.max_per_phone,
+            "phones": len(self._by_phone),
+            "ttl_sec": self.ttl,
+            "oldest_age_sec": round(now - oldest.created_at, 1) if oldest else 0.0,
+            "added": self.added,
+            "completed": self.completed,
+            "reaped": self.reaped,
+            "superseded": self.superseded,
+            "rejected": self.rejected,
+        }
+
+
+pending_auths = PendingAuthStore(
+    ttl=settings.auth_pending_ttl_sec,
+    max_pending=settings.auth_max_pending,
+    max_per_phone=settings.auth_max_pending_per_phone,
+    sweep_interval=settings.auth_sweep_interval_sec,
+)
@@ -0,0 +1,34 @@
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """분당 한도를 초당 비율로 채우는 토큰 버킷 (capacity를 주지 않으면 1분치까지 몰아서 사용 가능)"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount를 꺼낼 수 있을 때까지 남은 시간 (0이면 바로 가능)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """실제 사용량과 추정치 차이 반영 (음수가 될 수 있음 → 그만큼 다음 요청이 대기)"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
@@ -0,0 +1,113 @@
+import hashlib
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services import cache_service
+
+# 정규화 시 제거할 문장부호/웃음/울음 표현
+_NOISE_RE = re.compile(r"[\s.,!?~…·'\"`^*()\[\]{}<>ㅋㅎㅠㅜ]+")
+
+
+def normalize_message(message: str) -> str:
+    """캐시 키용 메시지 정규화 - "언제 시작해요??" 와 "언제 시작해요 ?" 를 같은 키로"""
+    # NFKC가 호환 자모(ㅋ)를 조합형 자모로 바꾸므로 정규화 전후 모두 제거 (전각 ？ 등은 정규화 후 제거됨)
+    text = unicodedata.normalize("NFKC", _NOISE_RE.sub(" ", message)).lower()
+    return " ".join(_NOISE_RE.sub(" ", text).split())
+
+
+def context_fingerprint(context: List[Dict[str, Any]], size: int) -> str:
+    """최근 size개 컨텍스트 메시지의 짧은 해시 (같은 질문이라도 대화 흐름이 다르면 다른 키)"""
+    if size <= 0 or not context:
+        return ""
+    digest = hashlib.blake2b(digest_size=8)
+    for message in context[-size:]:
+        digest.update(message.get("role", "").encode())
+        digest.update(b"\x00")
+        digest.update(normalize_message(message.get("content") or "").encode())
+        digest.update(b"\x01")
+    return digest.hexdigest()
+
+
+def is_enabled(persona: Dict[str, Any]) -> bool:
+    """페르소나별 설정이 있으면 그 값, 없으면 전역 기본값"""
+    flag = persona.get("response_cache_enabled")
+    return settings.response_cache_enabled if flag is None else bool(flag)
+
+
+def make_key(tenant_id: str, persona_id: str, role: str, message: str, context: List[Dict[str, Any]]) -> Optional[Tuple]:
+    """정규화 후 빈 메시지면 None (캐시하지 않음)"""
+    normalized = normalize_message(message)
+    if not normalized:
+        return None
+    return (
+        str(tenant_id),
+        str(persona_id),
+        role,
+        normalized,
+        context_fingerprint(context, settings.response_cache_context_messages),
+    )
+
+
+class TenantStats:
+    """테넌트별 응답 캐시 hit/miss와 절약된 생성 시간"""
+
+    def __init__(self):
+        self._tenants: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, tenant_id: str) -> Dict[str, float]:
+        entry = self._tenants.get(tenant_id)
+        if entry is None:
+            entry = self._tenants[tenant_id] = {"hits": 0, "misses": 0, "saved_sec": 0.0}
+        return entry
+
+    def hit(self, tenant_id: str, saved_sec: float):
+        entry = self._entry(tenant_id)
+        entry["hits"] += 1
+        entry["saved_sec"] += saved_sec
+
+    def miss(self, tenant_id: str):
+        self._entry(tenant_id)["misses"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for tenant_id, entry in self._tenants.items():
+            lookups = entry["hits"] + entry["misses"]
+            result[tenant_id] = {
+                "hits": entry["hits"],
+                "misses": entry["misses"],
+                "hit_rate": round(entry["hits"] / lookups, 4) if lookups else 0.0,
+                "latency_saved_ms": round(entry["saved_sec"] * 1000, 1),
+            }
+        return result
+
+
+tenant_stats = TenantStats()
+
+
+def lookup(key: Optional[Tuple]) -> Optional[List[str]]:
+    """캐시된 응답 목록 반환 (없으면 None)"""
+    if key is None:
+        return None
+    hit, value = cache_service.response_cache.lookup(key)
+    if hit and value is not None:
+        replies, generation_sec = value
+        tenant_stats.hit(key[0], generation_sec)
+        return list(replies)
+    tenant_stats.miss(key[0])
+    return None
+
+
+def store(key: Optional[Tuple], replies: List[str], generation_sec: float):
+    if key is None or not replies:
+        return
+    cache_service.response_cache.set(key, (tuple(replies), generation_sec))
+
+
+def get_stats() -> Dict[str, Any]:
+    return {
+        "enabled_by_default": settings.response_cache_enabled,
+        "cache": cache_service.response_cache.stats(),
+        "tenants": tenant_stats.stats(),
+    }
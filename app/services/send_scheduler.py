@@ -0,0 +1,359 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from telethon.errors import FloodWaitError, SlowModeWaitError
+
+from app.services.rate_limit import TokenBucket
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+ChatKey = Tuple[str, str]
+
+# 텔레그램이 기다려야 할 시간(seconds)을 알려주는 전송 오류
+# FloodWait은 계정 전체, SlowModeWait은 해당 채팅방에만 적용
+FLOOD_ERRORS = (FloodWaitError, SlowModeWaitError)
+
+# 에이전트별로 유지하는 채팅방 버킷 수 상한 (오래 안 쓴 채팅방부터 정리)
+MAX_CHAT_BUCKETS = 1000
+
+
+class SendJob:
+    """지연 전송 대기 중인 응답 하나"""
+
+    __slots__ = ("agent_key", "chat_id", "peer", "text", "due", "seq", "tag", "attempts")
+
+    def __init__(self, agent_key: str, chat_id, peer: Any, text: str, due: float, seq: int, tag: Any = None):
+        self.agent_key = agent_key
+        self.chat_id = chat_id
+        self.peer = peer
+        self.text = text
+        self.due = due
+        self.seq = seq
+        self.tag = tag  # 예약한 쪽이 붙이는 식별자 (예: 응답 생성 id)
+        self.attempts = 0  # FloodWait으로 다시 시도한 횟수
+
+
+SendFunc = Callable[[SendJob], Awaitable[Any]]
+
+
+class _AgentSendState:
+    """에이전트(텔레그램 계정) 하나의 전송 한도와 FloodWait 상태"""
+
+    __slots__ = ("bucket", "chat_buckets", "parked_until", "chat_parked_until",
+                 "flood_waits", "flood_wait_sec", "throttled", "sent")
+
+    def __init__(self, bucket: Optional[TokenBucket]):
+        self.bucket = bucket
+        self.chat_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.parked_until = 0.0
+        self.chat_parked_until: Dict[str, float] = {}
+        self.flood_waits = 0
+        self.flood_wait_sec = 0.0
+        self.throttled = 0
+        self.sent = 0
+
+
+class SendScheduler:
+    """(에이전트, 채팅방, 텍스트, 전송 시각) 작업을 힙으로 관리하고 소수의 송신 태스크로 전송
+
+    채팅방별로 큐의 맨 앞 작업만 힙에 올라가고, 채팅방당 동시에 하나만 전송하므로
+    같은 채팅방 안에서는 항상 예약 순서대로 전송됩니다.
+
+    전송 시각이 된 작업도 에이전트(계정) 전체와 채팅방별 토큰 버킷을 통과해야 전송되고,
+    FloodWait/SlowModeWait을 받으면 그 시간만큼 에이전트(또는 채팅방)를 멈춘 뒤 같은 작업을 다시 시도합니다.
+    rate_per_min이 0이면 해당 한도는 적용하지 않습니다.
+    """
+
+    def __init__(self, send_func: SendFunc, workers: int, max_pending: int,
+                 agent_rate_per_min: float = 0, agent_burst: float = 1,
+                 chat_rate_per_min: float = 0, chat_burst: float = 1,
+                 max_flood_retries: int = 3, max_flood_wait: float = 600):
+        self._send_func = send_func
+        self.workers = workers
+        self.max_pending = max_pending
+        self.agent_rate_per_min = agent_rate_per_min
+        self.agent_burst = agent_burst
+        self.chat_rate_per_min = chat_rate_per_min
+        self.chat_burst = chat_burst
+        self.max_flood_retries = max_flood_retries
+        self.max_flood_wait = max_flood_wait
+        self._agents: Dict[str, _AgentSendState] = {}
+
+        self._heap: List[Tuple[float, int, ChatKey]] = []
+        self._queues: Dict[ChatKey, Deque[SendJob]] = {}
+        self._in_flight: Set[ChatKey] = set()
+        self._seq = itertools.count()
+        self._pending = 0
+
+        self._ready: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+        # 메트릭
+        self.scheduled = 0
+        self.sent = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.flood_retries = 0
+        self.max_lateness = 0.0
+        self._total_lateness = 0.0
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._timer_loop())]
+        self._tasks += [asyncio.create_task(self._sender_loop(i)) for i in range(self.workers)]
+        logger.info("Send scheduler started", workers=self.workers, max_pending=self.max_pending)
+
+    async def stop(self):
+        """스케줄러 중지 - 아직 전송되지 않은 작업은 폐기"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        dropped = self._pending
+        self.cancelled += dropped
+        self._heap.clear()
+        self._queues.clear()
+        self._in_flight.clear()
+        self._agents.clear()
+        self._pending = 0
+        logger.info("Send scheduler stopped", dropped=dropped, sent=self.sent)
+
+    def schedule(self, agent_key: str, chat_id, text: str, due: float, peer: Any = None, tag: Any = None) -> bool:
+        """전송 예약 (due는 time.monotonic() 기준 절대 시각)"""
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning("전송 대기열 초과 - 응답 폐기", agent_key=agent_key, chat_id=chat_id)
+            return False
+
+        chat_key = (agent_key, str(chat_id))
+        job = SendJob(agent_key, chat_id, peer if peer is not None else chat_id, text, due, next(self._seq), tag)
+        queue = self._queues.setdefault(chat_key, deque())
+        queue.append(job)
+        self._pending += 1
+        self.scheduled += 1
+
+        if len(queue) == 1 and chat_key not in self._in_flight:
+            self._push_head(chat_key)
+        return True
+
+    @staticmethod
+    def reply_due(base: float, index: int, delay: float, split_delay: float) -> float:
+        """기존 지연 규칙: i번째 응답은 base로부터 delay*(i+1) + split_delay*i 후"""
+        return base + delay * (index + 1) + split_delay * index
+
+    def cancel_chat(self, agent_key: str, chat_id, tag: Any = None) -> int:
+        """채팅방의 대기 중인 작업 취소 (전송 중인 작업은 제외, tag를 주면 그 tag의 작업만)"""
+        chat_key = (agent_key, str(chat_id))
+        if tag is None:
+            queue = self._queues.pop(chat_key, None)
+            count = len(queue) if queue else 0
+        else:
+            queue = self._queues.get(chat_key)
+            if not queue:
+                return 0
+            head = queue[0]
+            kept = deque(job for job in queue if job.tag != tag)
+            count = len(queue) - len(kept)
+            if kept:
+                self._queues[chat_key] = kept
+                # 맨 앞 작업이 바뀌었으면 새 맨 앞 작업을 힙에 올림 (이전 항목은 seq 불일치로 무시됨)
+                if kept[0] is not head and chat_key not in self._in_flight:
+                    self._push_head(chat_key)
+            else:
+                del self._queues[chat_key]
+        self._pending -= count
+        self.cancelled += count
+        return count
+
+    def cancel_agent(self, agent_key: str) -> int:
+        """에이전트의 모든 대기 작업 취소"""
+        count = 0
+        for chat_key in [k for k in self._queues if k[0] == agent_key]:
+            count += self.cancel_chat(*chat_key)
+        self._agents.pop(agent_key, None)
+        return count
+
+    def _agent(self, agent_key: str) -> _AgentSendState:
+        state = self._agents.get(agent_key)
+        if state is None:
+            bucket = TokenBucket(self.agent_rate_per_min, self.agent_burst) if self.agent_rate_per_min > 0 else None
+            state = self._agents[agent_key] = _AgentSendState(bucket)
+        return state
+
+    def _chat_bucket(self, state: _AgentSendState, chat_id: str) -> Optional[TokenBucket]:
+        if self.chat_rate_per_min <= 0:
+            return None
+        bucket = state.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = state.chat_buckets[chat_id] = TokenBucket(self.chat_rate_per_min, self.chat_burst)
+            if len(state.chat_buckets) > MAX_CHAT_BUCKETS:
+                state.chat_buckets.popitem(last=False)
+        else:
+            state.chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def _admit(self, chat_key: ChatKey, now: float) -> float:
+        """전송 가능하면 토큰을 쓰고 0, 아니면 기다려야 할 시간"""
+        agent_key, chat_id = chat_key
+        state = self._agent(agent_key)
+        parked_until = max(state.parked_until, state.chat_parked_until.get(chat_id, 0.0))
+        if parked_until > now:
+            return parked_until - now
+        state.chat_parked_until.pop(chat_id, None)
+
+        chat_bucket = self._chat_bucket(state, chat_id)
+        wait = max(state.bucket.wait_time(1) if state.bucket else 0.0,
+                   chat_bucket.wait_time(1) if chat_bucket else 0.0)
+        if wait > 0:
+            state.throttled += 1
+            return wait
+        if state.bucket:
+            state.bucket.consume(1)
+        if chat_bucket:
+            chat_bucket.consume(1)
+        return 0.0
+
+    def will_retry(self, job: SendJob, error: Exception) -> bool:
+        """FloodWait 계열 오류로 실패한 작업을 다시 시도할지 (send_func에서도 같은 판단에 사용)"""
+        return (isinstance(error, FLOOD_ERRORS)
+                and job.attempts < self.max_flood_retries
+                and error.seconds <= self.max_flood_wait)
+
+    def _park(self, job: SendJob, error: Exception):
+        """FloodWait이면 에이전트 전체, SlowModeWait이면 해당 채팅방 전송을 seconds 동안 멈춤"""
+        state = self._agent(job.agent_key)
+        until = time.monotonic() + error.seconds
+        if isinstance(error, SlowModeWaitError):
+            chat_id = str(job.chat_id)
+            state.chat_parked_until[chat_id] = max(state.chat_parked_until.get(chat_id, 0.0), until)
+        else:
+            state.parked_until = max(state.parked_until, until)
+        state.flood_waits += 1
+        state.flood_wait_sec += error.seconds
+        logger.warning("텔레그램 전송 대기 요청 - 전송 일시 중지",
+                       agent_key=job.agent_key,
+                       chat_id=job.chat_id,
+                       error=type(error).__name__,
+                       seconds=error.seconds,
+                       attempt=job.attempts + 1)
+
+    def _push_head(self, chat_key: ChatKey):
+        head = self._queues[chat_key][0]
+        heapq.heappush(self._heap, (head.due, head.seq, chat_key))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _timer_loop(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                _, seq, chat_key = heapq.heappop(self._heap)
+                queue = self._queues.get(chat_key)
+                # 취소되었거나 이미 처리된 항목은 건너뜀
+                if not queue or queue[0].seq != seq or chat_key in self._in_flight:
+                    continue
+                # 계정/채팅방 한도나 FloodWait에 걸리면 그만큼 뒤로 미룸
+                wait = self._admit(chat_key, now)
+                if wait > 0:
+                    heapq.heappush(self._heap, (now + wait, seq, chat_key))
+                    continue
+                self._in_flight.add(chat_key)
+                self._ready.put_nowait(chat_key)
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _sender_loop(self, index: int):
+        while True:
+            chat_key = await self._ready.get()
+            queue = self._queues.get(chat_key)
+            if not queue:
+                self._in_flight.discard(chat_key)
+                continue
+
+            job = queue.popleft()
+            self._pending -= 1
+            lateness = max(0.0, time.monotonic() - job.due)
+            try:
+                await self._send_func(job)
+                self.sent += 1
+                self._agent(job.agent_key).sent += 1
+                self.max_lateness = max(self.max_lateness, lateness)
+                self._total_lateness += lateness
+            except asyncio.CancelledError:
+                raise
+            except FLOOD_ERRORS as e:
+                self._park(job, e)
+                if self.will_retry(job, e):
+                    # 같은 작업을 채팅방 큐 맨 앞에 다시 넣어 순서 유지
+                    job.attempts += 1
+                    self._queues.setdefault(chat_key, deque()).appendleft(job)
+                    self._pending += 1
+                    self.flood_retries += 1
+                else:
+                    self.failed += 1
+                    logger.error("응답 전송 실패 - FloodWait 재시도 한도 초과",
+                                 agent_key=job.agent_key, chat_id=job.chat_id, seconds=e.seconds, attempts=job.attempts)
+            except Exception as e:
+                self.failed += 1
+                logger.error("응답 전송 실패", agent_key=job.agent_key, chat_id=job.chat_id, error=str(e))
+            finally:
+                self._in_flight.discard(chat_key)
+
+            # 같은 채팅방의 다음 작업을 힙에 올림
+            queue = self._queues.get(chat_key)
+            if queue:
+                self._push_head(chat_key)
+            elif queue is not None:
+                del self._queues[chat_key]
+
+    def agent_stats(self) -> Dict[str, Dict[str, Any]]:
+        """에이전트별 전송 대기열 깊이와 FloodWait 상태"""
+        now = time.monotonic()
+        depth: Dict[str, int] = {}
+        for (agent_key, _), queue in self._queues.items():
+            depth[agent_key] = depth.get(agent_key, 0) + len(queue)
+        result = {}
+        for agent_key in set(depth) | set(self._agents):
+            state = self._agents.get(agent_key)
+            result[agent_key] = {
+                "queued": depth.get(agent_key, 0),
+                "sent": state.sent if state else 0,
+                "throttled": state.throttled if state else 0,
+                "flood_waits": state.flood_waits if state else 0,
+                "flood_wait_sec": round(state.flood_wait_sec, 1) if state else 0.0,
+                "parked_sec": round(max(0.0, state.parked_until - now), 1) if state else 0.0,
+                "parked_chats": sum(1 for until in state.chat_parked_until.values() if until > now) if state else 0,
+            }
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._pending,
+            "pending_chats": len(self._queues),
+            "in_flight": len(self._in_flight),
+            "workers": self.workers,
+            "scheduled": self.scheduled,
+            "sent": self.sent,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "flood_retries": self.flood_retries,
+            "parked_agents": sum(1 for state in self._agents.values() if state.parked_until > time.monotonic()),
+            "avg_lateness_ms": round(self._total_lateness / self.sent * 1000, 2) if self.sent else 0.0,
+            "max_lateness_ms": round(self.max_lateness * 1000, 2),
+        }
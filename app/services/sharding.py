@@ -0,0 +1,22 @@
+import hashlib
+from typing import Iterable, Optional
+
+
+def _score(shard_id: int, agent_id: str) -> int:
+    digest = hashlib.blake2b(f"{shard_id}:{agent_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def owner_shard(agent_id: str, live_shards: Iterable[int]) -> Optional[int]:
+    """에이전트를 담당할 샤드 선택 (rendezvous hashing)
+
+    프로세스 재시작과 무관하게 같은 결과가 나오고, 샤드 하나가 빠지면
+    그 샤드에 있던 에이전트만 남은 샤드로 옮겨갑니다.
+    """
+    best_shard = None
+    best_score = -1
+    for shard_id in live_shards:
+        score = _score(shard_id, str(agent_id))
+        if score > best_score:
+            best_shard, best_score = shard_id, score
+    return best_shard
@@ -1,20 +1,55 @@
 from supabase import create_client, Client
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import threading
 from app.config import settings
+from app.services import cache_service
 import uuid
 
 # Supabase 클라이언트 초기화 (지연 초기화)
 supabase: Optional[Client] = None
+_client_lock = threading.Lock()
+
+# 동기 supabase-py 호출 전용 스레드풀 (이벤트 루프 블로킹 방지)
+_db_executor: Optional[ThreadPoolExecutor] = None
 
 def _get_supabase_client() -> Client:
     """Supabase 클라이언트를 지연 초기화"""
     global supabase
     if supabase is None:
-        if not settings.supabase_url or not settings.supabase_key:
-            raise Exception("Supabase 환경변수가 설정되지 않았습니다. SUPABASE_URL과 SUPABASE_ANON_KEY를 설정해주세요.")
-        supabase = create_client(settings.supabase_url, settings.supabase_key)
+        with _client_lock:
+            if supabase is None:
+                if not settings.supabase_url or not settings.supabase_key:
+                    raise Exception("Supabase 환경변수가 설정되지 않았습니다. SUPABASE_URL과 SUPABASE_ANON_KEY를 설정해주세요.")
+                supabase = create_client(settings.supabase_url, settings.supabase_key)
     return supabase
 
+def _get_db_executor() -> ThreadPoolExecutor:
+    """DB 스레드풀을 지연 초기화 (max_workers로 동시 쿼리 수 제한)"""
+    global _db_executor
+    if _db_executor is None:
+        with _client_lock:
+            if _db_executor is None:
+                _db_executor = ThreadPoolExecutor(
+                    max_workers=settings.supabase_max_workers,
+                    thread_name_prefix="supabase"
+                )
+    return _db_executor
+
+async def run_sync(func: Callable, *args, **kwargs) -> Any:
+    """동기 함수를 DB 스레드풀에서 실행하고 결과를 await"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_db_executor(), partial(func, *args, **kwargs))
+
+def shutdown_executor(wait: bool = True):
+    """DB 스레드풀 종료"""
+    global _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=wait)
+        _db_executor = None
+
 # ===== ACCOUNTS =====
 def add_agent(tenant_id: str, name: str, api_id: int, api_hash: str, phone_number: str) -> str:
     """새 에이전트 추가"""
@@ -101,12 +136,14 @@ def update_persona(tenant_id: str, persona_id: str, **kwargs) -> bool:
     """페르소나 업데이트 (테넌트별)"""
     client = _get_supabase_client()
     result = client.table("personas").update(kwargs).eq("tenant_id", tenant_id).eq("id", persona_id).execute()
+    cache_service.invalidate_persona(tenant_id, persona_id)
     return len(result.data) > 0
 
 def delete_persona(tenant_id: str, persona_id: str) -> bool:
     """페르소나 삭제 (테넌트별)"""
     client = _get_supabase_client()
     result = client.table("personas").delete().eq("tenant_id", tenant_id).eq("id", persona_id).execute()
+    cache_service.invalidate_persona(tenant_id, persona_id)
     return len(result.data) > 0
 
 # ===== MAPPINGS =====
@@ -123,6 +160,7 @@ def save_mapping(tenant_id: str, agent_id: str, chat_id: int, role: str, persona
         "split_delay_sec": split_delay
     }
     result = client.table("mappings").upsert(data, on_conflict="tenant_id,agent_id,chat_id").execute()
+    cache_service.invalidate_mapping(tenant_id, agent_id, chat_id)
     return result.data[0]["id"]
 
 def get_mapping(tenant_id: str, agent_id: str, chat_id: int) -> Optional[Dict]:
@@ -172,18 +210,21 @@ def update_mapping(tenant_id: str, agent_id: str, chat_id: int, **kwargs) -> boo
     """매핑 업데이트 (테넌트별)"""
     client = _get_supabase_client()
     result = client.table("mappings").update(kwargs).eq("tenant_id", tenant_id).eq("agent_id", agent_id).eq("chat_id", chat_id).execute()
+    cache_service.invalidate_mapping(tenant_id, agent_id, chat_id)
     return len(result.data) > 0
 
 def delete_mapping(tenant_id: str, agent_id: str, chat_id: int) -> bool:
     """특정 매핑 삭제 (테넌트별)"""
     client = _get_supabase_client()
     result = client.table("mappings").delete().eq("tenant_id", tenant_id).eq("agent_id", agent_id).eq("chat_id", chat_id).execute()
+    cache_service.invalidate_mapping(tenant_id, agent_id, chat_id)
     return len(result.data) > 0
 
 def delete_agent_mappings(tenant_id: str, agent_id: str) -> int:
     """에이전트의 모든 매핑 삭제 (테넌트별)"""
     client = _get_supabase_client()
     result = client.table("mappings").delete().eq("tenant_id", tenant_id).eq("agent_id", agent_id).execute()
+    cache_service.invalidate_agent_mappings(tenant_id, agent_id)
     return len(result.data)
 
 # ===== AGENT SESSIONS =====
@@ -290,4 +331,136 @@ def deactivate_session(agent_id: str) -> bool:
     """세션 비활성화"""
     client = _get_supabase_client()
     result = client.table("agent_sessions").update({"is_active": False}).eq("agent_id", agent_id).execute()
-    return len(result.data) > 0 
\ No newline at end of file
+    return len(result.data) > 0 
+
+# ===== WORKER (메시지 경로) =====
+def list_active_agent_sessions() -> List[Dict]:
+    """세션이 있는 모든 활성 에이전트 조회 (모든 테넌트)"""
+    client = _get_supabase_client()
+    result = client.table("agents").select(
+        "id, tenant_id, name, api_id, api_hash, phone_number, session_string"
+    ).eq("is_active", True).not_.is_("session_string", "null").execute()
+    
+    sessions = []
+    for agent in result.data:
+        if agent.get("session_string"):  # 세션이 있는 에이전트만
+            sessions.append({
+                "tenant_id": agent["tenant_id"],
+                "agent_id": agent["id"],
+                "phone_number": agent["phone_number"],
+                "name": agent["name"],
+                "api_id": agent["api_id"],
+                "api_hash": agent["api_hash"],
+                "session_string": agent["session_string"]
+            })
+    return sessions
+
+def list_active_agent_versions() -> List[Dict]:
+    """활성 에이전트의 id/tenant_id/updated_at만 조회 (reconciler의 주기적 diff용)"""
+    client = _get_supabase_client()
+    result = client.table("agents").select(
+        "id, tenant_id, updated_at"
+    ).eq("is_active", True).not_.is_("session_string", "null").execute()
+    return result.data
+
+def get_agent_sessions_by_ids(agent_ids: List[str]) -> List[Dict]:
+    """지정한 에이전트들의 세션 정보 조회 (변경/추가된 에이전트만)"""
+    if not agent_ids:
+        return []
+    client = _get_supabase_client()
+    result = client.table("agents").select(
+        "id, tenant_id, name, api_id, api_hash, phone_number, session_string"
+    ).in_("id", agent_ids).eq("is_active", True).execute()
+    return [
+        {
+            "tenant_id": agent["tenant_id"],
+            "agent_id": agent["id"],
+            "phone_number": agent["phone_number"],
+            "name": agent["name"],
+            "api_id": agent["api_id"],
+            "api_hash": agent["api_hash"],
+            "session_string": agent["session_string"]
+        }
+        for agent in result.data
+        if agent.get("session_string")
+    ]
+
+def get_chat_config(tenant_id: str, agent_id: str, chat_id: int) -> Optional[Dict]:
+    """워커용 채팅 설정 조회 (필요한 컬럼만)"""
+    client = _get_supabase_client()
+    result = client.table("mappings").select(
+        "persona_id, role, delay_sec, split_delay_sec"
+    ).eq("tenant_id", tenant_id).eq("agent_id", agent_id).eq("chat_id", str(chat_id)).execute()
+    if result.data:
+        config = result.data[0]
+        return {
+            "persona_id": config["persona_id"],
+            "role": config["role"],
+            "delay": config["delay_sec"],
+            "split_delay": config.get("split_delay_sec", 2)
+        }
+    return None
+
+def list_mapped_chat_ids(agent_ids: List[str], page_size: int = 1000) -> List[Dict]:
+    """워커용 에이전트들의 매핑된 채팅방 (tenant_id, agent_id, chat_id만, 이벤트 필터용)"""
+    if not agent_ids:
+        return []
+    client = _get_supabase_client()
+    rows: List[Dict] = []
+    # 한 번에 반환되는 행 수 상한이 있으므로 페이지 단위로 모두 조회
+    while True:
+        result = client.table("mappings").select("tenant_id, agent_id, chat_id").in_(
+            "agent_id", agent_ids
+        ).order("id").range(len(rows), len(rows) + page_size - 1).execute()
+        rows.extend(result.data)
+        if len(result.data) < page_size:
+            return rows
+
+def get_persona_prompt(tenant_id: str, persona_id: str) -> Optional[Dict]:
+    """워커용 페르소나 조회 (필요한 컬럼만)"""
+    client = _get_supabase_client()
+    # max_prompt_tokens, response_cache_enabled, model_route 컬럼은 선택 사항이라 컬럼 목록을 고정하지 않음 (결과는 워커 캐시에 보관)
+    result = client.table("personas").select("*").eq("id", persona_id).eq("tenant_id", tenant_id).execute()
+    if result.data:
+        persona = result.data[0]
+        return {
+            "id": persona["id"],
+            "name": persona["name"],
+            "system_prompt": persona["system_prompt"],
+            "max_prompt_tokens": persona.get("max_prompt_tokens"),
+            "response_cache_enabled": persona.get("response_cache_enabled"),
+            "model_route": persona.get("model_route"),
+        }
+    return None
+
+def insert_messages(rows: List[Dict]):
+    """messages 테이블 bulk insert (write-behind 배치용)"""
+    if not rows:
+        return
+    client = _get_supabase_client()
+    client.table("messages").insert(rows).execute()
+
+# ===== ASYNC FACADE (스레드풀 경유, 이벤트 루프에서 호출) =====
+async def list_active_agent_sessions_async() -> List[Dict]:
+    return await run_sync(list_active_agent_sessions)
+
+async def list_active_agent_versions_async() -> List[Dict]:
+    return await run_sync(list_active_agent_versions)
+
+async def get_agent_sessions_by_ids_async(agent_ids: List[str]) -> List[Dict]:
+    return await run_sync(get_agent_sessions_by_ids, agent_ids)
+
+async def get_chat_config_async(tenant_id: str, agent_id: str, chat_id: int) -> Optional[Dict]:
+    return await run_sync(get_chat_config, tenant_id, agent_id, chat_id)
+
+async def list_mapped_chat_ids_async(agent_ids: List[str]) -> List[Dict]:
+    return await run_sync(list_mapped_chat_ids, agent_ids)
+
+async def get_persona_prompt_async(tenant_id: str, persona_id: str) -> Optional[Dict]:
+    return await run_sync(get_persona_prompt, tenant_id, persona_id)
+
+async def get_agent_async(tenant_id: str, agent_id: str) -> Optional[Dict]:
+    return await run_sync(get_agent, tenant_id, agent_id)
+
+async def insert_messages_async(rows: List[Dict]):
+    return await run_sync(insert_messages, rows)
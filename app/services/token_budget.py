@@ -0,0 +1,182 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+# 메시지 하나당 role/구분자 오버헤드, 응답 시작 토큰 (OpenAI chat 포맷 기준 근사치)
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+# 남은 예산이 이보다 작으면 오래된 메시지를 잘라 넣지 않고 버림
+MIN_TRUNCATE_TOKENS = 16
+
+
+def estimate_tokens(text: str) -> int:
+    """로컬 토큰 수 추정 (ASCII는 4자당 1토큰, 한글 등 비ASCII 문자는 1자당 1토큰)
+
+    실제 토크나이저보다 약간 크게 잡아서 예산을 넘기지 않도록 합니다.
+    """
+    if not text:
+        return 0
+    if text.isascii():
+        return (len(text) + 3) // 4
+    non_ascii = sum(1 for char in text if char > '\x7f')
+    return (len(text) - non_ascii + 3) // 4 + non_ascii
+
+
+class TokenCounter:
+    """메시지 내용별 토큰 수 LRU 캐시 - 같은 컨텍스트 메시지를 매 호출마다 다시 세지 않음"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str) -> int:
+        tokens = self._counts.get(text)
+        if tokens is not None:
+            self._counts.move_to_end(text)
+            self.hits += 1
+            return tokens
+
+        self.misses += 1
+        tokens = estimate_tokens(text)
+        self._counts[text] = tokens
+        if len(self._counts) > self.maxsize:
+            self._counts.popitem(last=False)
+        return tokens
+
+    def message_tokens(self, message: Dict[str, Any]) -> int:
+        return self.count(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._counts),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """앞부분을 잘라 max_tokens 안에 들어가는 가장 긴 꼬리 부분 반환 (최근 내용 유지)"""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    keep = int(len(text) * max_tokens / tokens)
+    while keep > 0 and estimate_tokens(text[-keep:]) + 1 > max_tokens:
+        keep = int(keep * 0.9)
+    return "…" + text[-keep:] if keep > 0 else ""
+
+
+class WindowStats:
+    """OpenAI 호출별 프롬프트 토큰 통계"""
+
+    def __init__(self):
+        self.calls = 0
+        self.usage_calls = 0  # 응답에 usage가 있었던 호출 (스트리밍 호출은 usage 없음)
+        self.estimated_prompt_tokens = 0
+        self.actual_prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.dropped_messages = 0
+        self.truncated_messages = 0
+        self.max_prompt_tokens_seen = 0
+        # 대화 요약이 들어간 호출: 실제 프롬프트 토큰 vs 요약 대신 원문을 넣었을 때의 토큰
+        self.summary_calls = 0
+        self.prompt_tokens_with_summary = 0
+        self.prompt_tokens_without_summary = 0
+
+    def record(self, window: Dict[str, int], usage: Any = None, cached_tokens: int = 0):
+        self.calls += 1
+        self.estimated_prompt_tokens += window["prompt_tokens"]
+        self.dropped_messages += window["dropped"]
+        self.truncated_messages += window["truncated"]
+        self.max_prompt_tokens_seen = max(self.max_prompt_tokens_seen, window["prompt_tokens"])
+        if window.get("summary_tokens"):
+            self.summary_calls += 1
+            self.prompt_tokens_with_summary += window["prompt_tokens"]
+            self.prompt_tokens_without_summary += (
+                window["prompt_tokens"] - window["summary_tokens"] + window.get("summary_source_tokens", 0)
+            )
+        if usage is not None:
+            self.usage_calls += 1
+            self.actual_prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            self.cached_prompt_tokens += cached_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "avg_estimated_prompt_tokens": round(self.estimated_prompt_tokens / self.calls, 1) if self.calls else 0.0,
+            "usage_calls": self.usage_calls,
+            "calls_without_usage": self.calls - self.usage_calls,
+            "avg_actual_prompt_tokens": round(self.actual_prompt_tokens / self.usage_calls, 1) if self.usage_calls else None,
+            "max_estimated_prompt_tokens": self.max_prompt_tokens_seen,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            # provider prefix 캐시 적중률 (usage가 있는 호출의 실제 prompt 토큰 중 캐시된 비율, 스트리밍 호출은 알 수 없어 제외 - 없으면 None)
+            "cached_token_ratio": round(self.cached_prompt_tokens / self.actual_prompt_tokens, 4) if self.actual_prompt_tokens else None,
+            # openai 1.3.0은 stream_options.include_usage를 지원하지 않아 스트리밍(기본값) 응답 생성 호출은 비율에 포함되지 않음
+            "cached_token_ratio_note": (
+                "OPENAI_STREAMING=true: 응답 생성 호출은 usage가 없어 제외됨 (비스트리밍 호출만 반영)"
+                if settings.openai_streaming else None
+            ),
+            "completion_tokens": self.completion_tokens,
+            "dropped_messages": self.dropped_messages,
+            "truncated_messages": self.truncated_messages,
+            "summary": {
+                "calls": self.summary_calls,
+                "avg_prompt_tokens_with_summary": round(self.prompt_tokens_with_summary / self.summary_calls, 1) if self.summary_calls else 0.0,
+                "avg_prompt_tokens_without_summary": round(self.prompt_tokens_without_summary / self.summary_calls, 1) if self.summary_calls else 0.0,
+            },
+            "token_counter": token_counter.stats(),
+        }
+
+
+token_counter = TokenCounter(settings.token_count_cache_size)
+window_stats = WindowStats()
+
+
+def build_window(
+    context: List[Dict[str, Any]],
+    fixed_messages: List[Dict[str, Any]],
+    max_prompt_tokens: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """토큰 예산 안에 들어가는 최근 컨텍스트 선택
+
+    fixed_messages(시스템 프롬프트, 역할 가이드, 사용자 메시지)는 항상 포함하고,
+    남은 예산을 최신 메시지부터 채웁니다. 예산을 넘는 가장 오래된 메시지는 뒷부분만
+    남기고 자르거나 버립니다. (선택된 컨텍스트, 통계) 반환
+    """
+    budget = max_prompt_tokens or settings.openai_max_prompt_tokens
+    fixed_tokens = REPLY_PRIMING_TOKENS + sum(token_counter.message_tokens(m) for m in fixed_messages)
+    remaining = budget - fixed_tokens
+
+    selected: List[Dict[str, Any]] = []
+    truncated = 0
+    for message in reversed(context):
+        tokens = token_counter.message_tokens(message)
+        if tokens <= remaining:
+            selected.append(message)
+            remaining -= tokens
+            continue
+        available = remaining - MESSAGE_OVERHEAD_TOKENS
+        if available >= MIN_TRUNCATE_TOKENS:
+            content = _truncate_to_tokens(message.get("content") or "", available)
+            if content:
+                selected.append({**message, "content": content})
+                remaining -= estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+                truncated = 1
+        break
+
+    selected.reverse()
+    window = {
+        "budget": budget,
+        "prompt_tokens": budget - remaining,
+        "context_messages": len(selected),
+        "dropped": len(context) - len(selected),
+        "truncated": truncated,
+    }
+    return selected, window
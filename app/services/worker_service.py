@@ -1,6 +1,7 @@
 import asyncio
 import os
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, List, Optional, Any, Callable
 from telethon import TelegramClient, events
 from telethon.sessions import StringSession
 from telethon.errors import SessionPasswordNeededError, PhoneCodeInvalidError
@@ -10,44 +11,198 @@ from dotenv import load_dotenv
 # .env 파일 로드
 load_dotenv()
 
-from app.services import supabase_service, openai_service
+from app.services import supabase_service, openai_service, cache_service
 from app.services.api_manager import api_manager
+from app.services.message_writer import message_writer
+from app.services.context_store import ContextStore
+from app.services.context_snapshot import ContextSnapshot
+from app.services.chat_metadata import ChatMetadataCache, speaker_name
+from app.services.chat_filter import chat_filter
+from app.services.message_coalescer import MessageCoalescer
+from app.services.message_classifier import default_classifier
+from app.services.send_scheduler import SendScheduler, SendJob, FLOOD_ERRORS
+from app.services.client_supervisor import ClientSupervisor, QUARANTINED
+from app.services.llm_scheduler import llm_scheduler
+from app.services.generation_registry import GenerationRegistry, Generation
+from app.services import response_cache
+from app.services.conversation_summarizer import ConversationSummarizer
+from app.services.sharding import owner_shard
+from app.services.agent_reconciler import AgentReconciler
+from app.config import settings
 from utils.logging import log
 
 # 로거 설정
 logger = structlog.get_logger()
 
+class AgentAuthError(Exception):
+    """세션이 인증되지 않았거나 만료된 에이전트"""
+
+class _RestoredEvent:
+    """스냅샷에서 복원한 조각 메시지용 최소 이벤트 (_process_message가 사용하는 속성만)"""
+
+    def __init__(self, client, chat_id: int, input_chat):
+        self.client = client
+        self.chat_id = chat_id
+        self._input_chat = input_chat
+
+    async def get_input_chat(self):
+        return self._input_chat
+
+    async def get_chat(self):
+        return await self.client.get_entity(self._input_chat)
+
 class TelegramWorker:
     def __init__(self):
         self.clients: Dict[str, TelegramClient] = {}
-        self.context_cache: Dict[str, List[Dict]] = {}  # (tenant_id:agent_id:chat_id) -> messages
+        self.sessions: Dict[str, Dict] = {}  # client_key -> 연결에 사용한 session_info
+        # (tenant_id:agent_id:chat_id) -> 최근 메시지 (채팅별 고정 크기, 전역 LRU 상한)
+        self.context_store = ContextStore(
+            max_messages_per_chat=settings.context_max_messages,
+            max_chats=settings.context_max_chats,
+            max_bytes=settings.context_max_bytes,
+            idle_ttl=settings.context_idle_ttl_sec,
+            summary_tail_messages=settings.conversation_summary_tail_messages if settings.conversation_summary_enabled else None
+        )
+        # 컨텍스트에서 밀려난 오래된 대화는 채팅방별 누적 요약으로 접음 (응답 경로 밖에서)
+        self.summarizer = ConversationSummarizer(
+            self.context_store,
+            enabled=settings.conversation_summary_enabled,
+            fold_messages=settings.conversation_summary_fold_messages,
+            max_summary_tokens=settings.conversation_summary_max_tokens,
+            concurrency=settings.conversation_summary_concurrency,
+            max_pending_chats=settings.context_max_chats,
+        )
+        self.context_store.on_evict = self.summarizer.on_evict
+        # (agent, chat)별 연속 메시지 debounce
+        self.message_coalescer = MessageCoalescer(
+            quiet_period=settings.coalesce_quiet_period_sec,
+            max_wait=settings.coalesce_max_wait_sec,
+            max_fragments=settings.coalesce_max_fragments,
+            max_chars=settings.coalesce_max_chars,
+            max_chats_per_agent=settings.coalesce_max_chats_per_agent
+        )
+        # 재시작 시 컨텍스트/조각 메시지 유지 - 채팅방이 처음 사용될 때 스냅샷에서 복원
+        self.snapshot = ContextSnapshot(
+            path=settings.context_snapshot_path,
+            enabled=settings.context_snapshot_enabled,
+            interval=settings.context_snapshot_interval_sec,
+            idle_ttl=settings.context_idle_ttl_sec,
+            pending_ttl=settings.context_snapshot_pending_ttl_sec
+        )
+        self.context_store.loader = self.snapshot.load_context
+        # 에이전트별 매핑된 채팅방 (매핑 없는 채팅방 이벤트는 핸들러 호출 전에 버림)
+        chat_filter.loader = supabase_service.list_mapped_chat_ids_async
+        # 채팅방 메타데이터(get_chat) TTL 캐시와 최근 발화자 (참여자 샘플)
+        self.chat_metadata = ChatMetadataCache(
+            ttl=settings.chat_metadata_ttl_sec,
+            max_chats_per_agent=settings.chat_metadata_max_chats_per_agent,
+            max_speakers=settings.chat_active_speakers
+        )
+        # 지연 응답 전송 스케줄러 (핸들러는 생성 후 바로 반환)
+        self.send_scheduler = SendScheduler(
+            self._send_job,
+            workers=settings.send_scheduler_workers,
+            max_pending=settings.send_scheduler_max_pending,
+            agent_rate_per_min=settings.send_agent_rate_per_min,
+            agent_burst=settings.send_agent_burst,
+            chat_rate_per_min=settings.send_chat_rate_per_min,
+            chat_burst=settings.send_chat_burst,
+            max_flood_retries=settings.send_flood_max_retries,
+            max_flood_wait=settings.send_flood_max_wait_sec
+        )
+        # (에이전트, 채팅방)별 진행 중인 응답 생성 (새 메시지가 오면 전송 전 생성 취소/병합)
+        self.generations = GenerationRegistry()
         self.is_running = False
+        self._stop_event: Optional[asyncio.Event] = None
+        
+        # 동시 연결 제한, 에이전트별 연결 감독(재연결/격리) 및 시작 통계
+        self._startup_semaphore = asyncio.Semaphore(settings.agent_startup_concurrency)
+        self.supervisor = ClientSupervisor(
+            self._connect_agent,
+            self._on_client_lost,
+            base_backoff=settings.agent_reconnect_base_backoff_sec,
+            max_backoff=settings.agent_reconnect_max_backoff_sec,
+            max_retries=settings.agent_reconnect_max_retries,
+            quarantine_base_backoff=settings.quarantine_base_backoff_sec,
+            quarantine_max_backoff=settings.quarantine_max_backoff_sec,
+            fatal_errors=(AgentAuthError,)
+        )
+        self.connect_times: Dict[str, float] = {}  # client_key -> 연결 소요 시간(초)
+        self.startup_stats: Dict[str, Any] = {}
+        
+        # agents 테이블과 주기적으로 동기화
+        self.reconciler = AgentReconciler(self, settings.agent_reconcile_interval_sec)
+        
+        # 샤딩 모드 (worker_sharded.py에서 설정, 단일 프로세스 모드에서는 None)
+        self.shard_id: Optional[int] = None
+        self._live_shards: Optional[Callable[[], List[int]]] = None
+        
+    def configure_shard(self, shard_id: int, live_shards: Callable[[], List[int]]):
+        """샤딩 모드 설정 - live_shards()는 현재 배정에 참여 중인 샤드 목록을 반환"""
+        self.shard_id = shard_id
+        self._live_shards = live_shards
+        self.snapshot.path = f"{settings.context_snapshot_path}.shard{shard_id}"
+        
+    def owns_agent(self, agent_id: str) -> bool:
+        """이 프로세스(샤드)가 담당하는 에이전트인지 확인"""
+        if self.shard_id is None:
+            return True
+        return owner_shard(agent_id, self._live_shards()) == self.shard_id
+        
+    async def rebalance_shard(self) -> int:
+        """샤드 구성 변경 후 새로 배정된 에이전트 연결 (기존 클라이언트는 유지)"""
+        result = await self.reconciler.run_once()
+        logger.info("Shard rebalanced", shard_id=self.shard_id, agent_count=len(self.clients), **result)
+        return result["added"]
         
     async def start_worker(self):
-        """워커 시작 - 모든 활성 에이전트에 대한 클라이언트 생성"""
+        """워커 시작 - 모든 활성 에이전트에 대한 클라이언트를 동시에(상한 내) 연결"""
         if self.is_running:
             logger.warning("Worker is already running")
             return
             
         self.is_running = True
+        self._stop_event = asyncio.Event()
         logger.info("Starting Telegram Worker")
         
         try:
+            # 메시지 write-behind 저장 루프 및 응답 전송 스케줄러 시작
+            await message_writer.start()
+            await self.send_scheduler.start()
+            
+            # 이전 실행의 스냅샷 인덱스만 로드 (컨텍스트는 채팅방별로 처음 사용될 때 복원)
+            self.snapshot.open()
+            self.snapshot.start(self.context_store, self.message_coalescer)
+            
             # 모든 테넌트의 활성 세션 조회
             active_sessions = await self._get_all_active_sessions()
             
             if not active_sessions:
                 logger.warning("No active sessions found")
-                return
+                # reconciler가 켜져 있으면 이후 추가되는 에이전트를 기다림
+                if not self.reconciler.enabled:
+                    return
                 
-            # 각 에이전트에 대한 클라이언트 생성
-            for session_info in active_sessions:
-                await self._create_client(session_info)
+            # 각 에이전트 클라이언트를 동시에 연결 (연결된 에이전트는 즉시 메시지 처리 시작)
+            started = time.monotonic()
+            results = await asyncio.gather(*[self._start_agent(session_info) for session_info in active_sessions])
+            self.startup_stats = {
+                "duration_sec": round(time.monotonic() - started, 3),
+                "total": len(active_sessions),
+                "connected": sum(1 for ok in results if ok),
+                "retrying": sum(1 for ok in results if not ok),
+                "concurrency": settings.agent_startup_concurrency
+            }
+            logger.info("Worker startup finished", **self.startup_stats)
+            
+            # agents 테이블 reconciler (연결 실패한 에이전트는 각자의 감독 태스크가 재시도) 및 채팅방 필터 주기 갱신
+            self.reconciler.start()
+            chat_filter.start()
                 
-            if self.clients:
+            if len(self.supervisor) or self.reconciler.enabled:
                 logger.info(f"Started {len(self.clients)} agents", agent_count=len(self.clients))
-                # 모든 클라이언트를 병렬로 실행
-                await asyncio.gather(*[client.run_until_disconnected() for client in self.clients.values()])
+                # stop_worker가 호출될 때까지 실행
+                await self._stop_event.wait()
             else:
                 logger.warning("No valid clients created")
                 
@@ -55,42 +210,52 @@ class TelegramWorker:
             logger.error("Worker failed", error=str(e))
             raise
         finally:
+            await self.reconciler.stop()
             self.is_running = False
             
     async def stop_worker(self):
         """워커 중지"""
         logger.info("Stopping Telegram Worker")
         self.is_running = False
+        if self._stop_event:
+            self._stop_event.set()
+        await self.reconciler.stop()
         
-        # 모든 클라이언트 연결 해제
+        # 생성 대기 중인 LLM 요청과 전송 대기 중인 응답 폐기 (연결 해제 전에 정리)
+        await self.summarizer.stop()
+        await llm_scheduler.stop()
+        await self.send_scheduler.stop()
+        
+        # 컨텍스트/조각 메시지 스냅샷 저장 (메모리 정리 전에)
+        await self.snapshot.stop(self.context_store, self.message_coalescer)
+        
+        # 감독 태스크를 먼저 멈춰서 연결 해제가 재연결로 이어지지 않게 한 뒤 모든 클라이언트 연결 해제
+        await self.supervisor.stop_all()
+        await chat_filter.stop()
         for client in self.clients.values():
             if client.is_connected():
                 await client.disconnect()
         self.clients.clear()
-        self.context_cache.clear()
+        self.sessions.clear()
+        self.connect_times.clear()
+        self.message_coalescer.cancel_all()
+        self.generations.clear()
+        self.chat_metadata.clear()
+        self.context_store.clear()
+        cache_service.clear_all()
+        
+        # 대기 중인 메시지 저장 flush
+        await message_writer.stop()
         
     async def _get_all_active_sessions(self) -> List[Dict]:
         """모든 테넌트의 활성 에이전트 조회 (session_string이 agents 테이블에 직접 저장됨)"""
-        client = supabase_service._get_supabase_client()
-        
         try:
-            # agents 테이블에서 활성 에이전트와 세션 정보 조회
-            result = client.table("agents").select(
-                "id, tenant_id, name, api_id, api_hash, phone_number, session_string"
-            ).eq("is_active", True).not_.is_("session_string", "null").execute()
-            
-            sessions = []
-            for agent in result.data:
-                if agent.get("session_string"):  # 세션이 있는 에이전트만
-                    sessions.append({
-                        "tenant_id": agent["tenant_id"],
-                        "agent_id": agent["id"],
-                        "phone_number": agent["phone_number"],
-                        "name": agent["name"],
-                        "api_id": agent["api_id"],
-                        "api_hash": agent["api_hash"],
-                        "session_string": agent["session_string"]
-                    })
+            # agents 테이블에서 활성 에이전트와 세션 정보 조회 (스레드풀 경유)
+            sessions = await supabase_service.list_active_agent_sessions_async()
+            
+            # 샤딩 모드에서는 이 샤드에 배정된 에이전트만 사용
+            if self.shard_id is not None:
+                sessions = [s for s in sessions if self.owns_agent(s["agent_id"])]
             
             logger.info(f"활성 에이전트 {len(sessions)}개 발견")
             return sessions
@@ -99,73 +264,162 @@ class TelegramWorker:
             logger.error(f"활성 에이전트 조회 실패: {e}")
             return []
         
+    async def _start_agent(self, session_info: Dict) -> bool:
+        """에이전트 감독 태스크 시작 - 첫 연결 성공 여부 반환 (실패하면 backoff 후 자동 재시도)"""
+        return await self.supervisor.start(session_info)
+        
+    async def _connect_agent(self, session_info: Dict):
+        """에이전트 연결 (동시 연결 수 제한 + 타임아웃) - 감독 태스크가 호출"""
+        client_key = f"{session_info['tenant_id']}:{session_info['agent_id']}"
+        async with self._startup_semaphore:
+            started = time.monotonic()
+            try:
+                client = await asyncio.wait_for(
+                    self._create_client(session_info),
+                    timeout=settings.agent_connect_timeout_sec
+                )
+            except asyncio.TimeoutError:
+                raise asyncio.TimeoutError(f"connect timed out after {settings.agent_connect_timeout_sec}s")
+        self.connect_times[client_key] = round(time.monotonic() - started, 3)
+        try:
+            await self._restore_pending(session_info, client)
+        except Exception as e:
+            logger.error("Failed to restore pending fragments", client_key=client_key, error=str(e))
+        return client
+        
+    async def _restore_pending(self, session_info: Dict, client):
+        """재시작 전에 모이던 조각 메시지를 debounce에 다시 걸어 스스로 처리되게 함 (채팅방을 찾지 못하면 폐기)"""
+        tenant_id = session_info["tenant_id"]
+        agent_id = session_info["agent_id"]
+        agent_key = f"{tenant_id}:{agent_id}"
+        for chat_key, fragments in self.snapshot.take_pending(agent_key):
+            try:
+                chat_id = int(chat_key)
+                mapping = await self._get_chat_config(tenant_id, agent_id, chat_id)
+                persona = await self._get_persona(tenant_id, mapping["persona_id"]) if mapping else None
+                if not persona:
+                    raise LookupError("mapping or persona not found")
+                # 재시작 직후에는 세션에 엔티티가 없을 수 있음 (찾지 못하면 ValueError)
+                event = _RestoredEvent(client, chat_id, await client.get_input_entity(chat_id))
+            except Exception as e:
+                logger.warning("Restored fragments discarded",
+                              agent_key=agent_key,
+                              chat_id=chat_key,
+                              fragment_count=len(fragments),
+                              error=str(e))
+                continue
+            
+            async def process(message: str, event=event, mapping=mapping, persona=persona):
+                await self._process_message(session_info, event, mapping, persona, message)
+            
+            self.message_coalescer.restore(agent_key, chat_id, fragments, process)
+            logger.info("Pending fragments restored", agent_key=agent_key, chat_id=chat_key, fragment_count=len(fragments))
+        
+    async def _on_client_lost(self, client_key: str):
+        """연결이 끊긴 클라이언트 제거 (컨텍스트/전송 예약은 재연결을 위해 유지)"""
+        client = self.clients.pop(client_key, None)
+        self.connect_times.pop(client_key, None)
+        if client is not None:
+            await client.disconnect()
+        
+    def known_session(self, client_key: str) -> Optional[Dict]:
+        """연결 중이거나 재시도/격리 중인 에이전트의 마지막 session_info"""
+        entry = self.supervisor.get(client_key)
+        return entry.session_info if entry else self.sessions.get(client_key)
+        
+    async def reconnect_agent(self, session_info: Dict) -> bool:
+        """세션/자격증명이 바뀐 에이전트만 재연결 (컨텍스트와 다른 클라이언트는 유지)"""
+        client_key = f"{session_info['tenant_id']}:{session_info['agent_id']}"
+        await self.supervisor.stop(client_key)
+        client = self.clients.pop(client_key, None)
+        self.sessions.pop(client_key, None)
+        if client and client.is_connected():
+            await client.disconnect()
+        logger.info("Reconnecting agent with updated credentials",
+                   tenant_id=session_info["tenant_id"],
+                   agent_id=session_info["agent_id"])
+        return await self._start_agent(session_info)
+        
+    def quarantine_status(self) -> List[Dict]:
+        """격리된 에이전트 목록 (상태 조회용)"""
+        return [entry for entry in self.supervisor.status() if entry["state"] == QUARANTINED]
+        
     async def _create_client(self, session_info: Dict):
-        """텔레그램 클라이언트 생성 및 이벤트 핸들러 설정"""
+        """텔레그램 클라이언트 생성 및 이벤트 핸들러 설정 후 반환 (실패 시 예외 발생)"""
+        # 에이전트별 API 정보 사용 (Supabase에서 가져온 정보)
+        api_id = session_info["api_id"]
+        api_hash = session_info["api_hash"]
+        
+        # api_id가 문자열인 경우 정수로 변환
+        if isinstance(api_id, str):
+            try:
+                # UUID 형태인 경우 기본값 사용
+                if len(api_id) > 20:  # UUID 길이 체크
+                    logger.warning(f"Invalid api_id format (UUID detected): {api_id}, using default")
+                    api_id = 25060740
+                    api_hash = "f93d24a5fba99007d0a81a28ab5ca7bc"
+                else:
+                    api_id = int(api_id)
+            except ValueError:
+                raise ValueError(f"Invalid api_id format: {api_id}")
+        
+        client = TelegramClient(
+            StringSession(session_info["session_string"]),
+            api_id,
+            api_hash
+        )
+        
+        # 매핑된 채팅방 목록 로드 (실패하면 필터 없이 핸들러의 매핑 조회로 판단, 주기 갱신 때 다시 시도)
+        client_key = f"{session_info['tenant_id']}:{session_info['agent_id']}"
         try:
-            # 에이전트별 API 정보 사용 (Supabase에서 가져온 정보)
-            api_id = session_info["api_id"]
-            api_hash = session_info["api_hash"]
-            
-            # api_id가 문자열인 경우 정수로 변환
-            if isinstance(api_id, str):
-                try:
-                    # UUID 형태인 경우 기본값 사용
-                    if len(api_id) > 20:  # UUID 길이 체크
-                        logger.warning(f"Invalid api_id format (UUID detected): {api_id}, using default")
-                        api_id = 25060740
-                        api_hash = "f93d24a5fba99007d0a81a28ab5ca7bc"
-                    else:
-                        api_id = int(api_id)
-                except ValueError:
-                    logger.error(f"Invalid api_id format: {api_id}")
-                    return
-            
-            client = TelegramClient(
-                StringSession(session_info["session_string"]),
-                api_id,
-                api_hash
+            await chat_filter.load([client_key])
+        except Exception as e:
+            logger.warning("Chat filter load failed - passing all chats",
+                          tenant_id=session_info["tenant_id"],
+                          agent_id=session_info["agent_id"],
+                          error=str(e))
+        
+        # 메시지 핸들러 등록 (매핑 없는 채팅방은 func 필터에서 버려져 핸들러가 호출되지 않음)
+        @client.on(events.NewMessage(incoming=True, func=chat_filter.event_filter(client_key)))
+        async def message_handler(event):
+            # 메시지 이벤트 감지 로그 추가
+            log.info(
+                "[이벤트 감지] NewMessage",
+                chat_id=getattr(event, 'chat_id', None),
+                sender_id=getattr(event, 'sender_id', None),
+                text_preview=event.text[:50] if hasattr(event, 'text') and event.text else None
             )
+            await self._handle_message(session_info, event)
             
-            # 메시지 핸들러 등록
-            @client.on(events.NewMessage(incoming=True))
-            async def message_handler(event):
-                # 메시지 이벤트 감지 로그 추가
-                log.info(
-                    "[이벤트 감지] NewMessage",
-                    chat_id=getattr(event, 'chat_id', None),
-                    sender_id=getattr(event, 'sender_id', None),
-                    text_preview=event.text[:50] if hasattr(event, 'text') and event.text else None
-                )
-                await self._handle_message(session_info, event)
-                
-            # 클라이언트 시작
-            await client.start()
-            
-            # 클라이언트 저장
-            client_key = f"{session_info['tenant_id']}:{session_info['agent_id']}"
-            self.clients[client_key] = client
-            
-            logger.info("Client created successfully", 
-                       tenant_id=session_info["tenant_id"],
-                       agent_id=session_info["agent_id"],
-                       agent_name=session_info["name"])
-                       
-        except Exception as e:
-            logger.error("Failed to create client", 
-                        tenant_id=session_info["tenant_id"],
-                        agent_id=session_info["agent_id"],
-                        error=str(e))
+        # 클라이언트 연결 (client.start()는 미인증 세션에서 input()으로 멈추므로 사용하지 않음)
+        try:
+            await client.connect()
+            if not await client.is_user_authorized():
+                raise AgentAuthError("session is not authorized")
+        except BaseException:
+            await client.disconnect()
+            raise
+        
+        # 클라이언트 저장
+        self.clients[client_key] = client
+        self.sessions[client_key] = session_info
+        
+        logger.info("Client created successfully", 
+                   tenant_id=session_info["tenant_id"],
+                   agent_id=session_info["agent_id"],
+                   agent_name=session_info["name"])
+        return client
             
     async def _handle_message(self, session_info: Dict, event):
-        """텔레그램 메시지 처리"""
-        import time
-        start_time = time.time()
-        
+        """텔레그램 메시지 수신 - 매핑 확인 후 연속 메시지 debounce 스케줄러에 전달"""
         try:
             tenant_id = session_info["tenant_id"]
             agent_id = session_info["agent_id"]
             chat_id = event.chat_id
             
+            if not event.text:
+                return
+            
             # agent_chat_configs에서 매핑 정보 조회
             mapping = await self._get_chat_config(tenant_id, agent_id, chat_id)
             if not mapping:
@@ -183,34 +437,55 @@ class TelegramWorker:
                              persona_id=mapping["persona_id"])
                 return
                 
-            # 컨텍스트 캐시 키
-            context_key = f"{tenant_id}:{agent_id}:{chat_id}"
-            context = self.context_cache.setdefault(context_key, [])
-            
-            # 최근 20개 메시지만 유지
-            if len(context) > 20:
-                context = context[-20:]
-                self.context_cache[context_key] = context
-                
-            # 채팅 참여자 정보 수집 (선택사항)
-            chat_participants = await self._get_chat_participants(event)
+            # 최근 발화자 기록 (참여자 샘플용)
+            self.chat_metadata.note_speaker(f"{tenant_id}:{agent_id}", chat_id, speaker_name(event))
+            
+            # 조각 메시지는 모았다가 문장이 완성되거나 조용해지면 한 번에 처리
+            async def process(message: str):
+                await self._process_message(session_info, event, mapping, persona, message)
+            
+            self.message_coalescer.submit(f"{tenant_id}:{agent_id}", chat_id, event.text, process)
+            
+        except Exception as e:
+            logger.error("Failed to handle message",
+                        tenant_id=session_info.get("tenant_id"),
+                        agent_id=session_info.get("agent_id"),
+                        chat_id=getattr(event, 'chat_id', None),
+                        error=str(e))
+    
+    async def _process_message(self, session_info: Dict, event, mapping: Dict, persona: Dict, message: str):
+        """결합된 메시지에 대해 필터링, 응답 생성, 전송 처리"""
+        start_time = time.time()
+        
+        try:
+            tenant_id = session_info["tenant_id"]
+            agent_id = session_info["agent_id"]
+            chat_id = event.chat_id
             
+            # 최근 대화 컨텍스트 (저장소에서 최대 context_max_messages개 유지) + 그 이전 대화 요약
+            # 밀려났지만 아직 요약에 접히지 않은 메시지는 컨텍스트 앞에 원문으로 붙임
+            context = self.context_store.get_messages(tenant_id, agent_id, chat_id)
+            context = self.summarizer.unfolded(tenant_id, agent_id, chat_id) + context
+            summary = self.context_store.get_summary(tenant_id, agent_id, chat_id)
+                
             # 메시지 필터링 - 답변해야 할지 판단
             logger.info("🔍 메시지 필터링 시작",
                        tenant_id=tenant_id,
                        agent_id=agent_id,
                        chat_id=chat_id,
-                       message=event.text,
+                       message=message,
                        context_length=len(context))
             
-            should_respond = await openai_service.should_respond_to_message(event.text, context, str(chat_id))
+            # 메시지 분류는 한 번만 - 같은 결과를 응답 여부, 우선 lane, 모델 route 판단에 함께 사용
+            decision = default_classifier.classify(message, context)
+            should_respond = await openai_service.should_respond_to_message(message, context, str(chat_id), decision=decision)
             
             if not should_respond:
                 logger.info("❌ 메시지 필터링됨 - 답변하지 않음",
                            tenant_id=tenant_id,
                            agent_id=agent_id,
                            chat_id=chat_id,
-                           message=event.text,
+                           message=message,
                            reason="필터링 로직에 의해 거부됨")
                 return
             
@@ -218,49 +493,72 @@ class TelegramWorker:
                        tenant_id=tenant_id,
                        agent_id=agent_id,
                        chat_id=chat_id,
-                       message=event.text)
-            
-            # OpenAI 응답 생성 (개선된 버전)
-            replies = await openai_service.generate_multi_reply(
-                persona["system_prompt"],
-                mapping["role"],
-                context,
-                event.text,
-                chat_participants
-            )
+                       message=message)
+            
+            agent_key = f"{tenant_id}:{agent_id}"
+            
+            # 채팅 참여자 정보 수집 (응답할 메시지에 대해서만, 메타데이터는 캐시에서)
+            chat_participants = await self._get_chat_participants(agent_key, event)
+            
+            # 같은 채팅방에서 아직 전송 전인 이전 생성은 취소하고 그 메시지를 합쳐서 한 번만 응답
+            generation, superseded = self.generations.begin(agent_key, chat_id, message)
+            if superseded is not None:
+                self.send_scheduler.cancel_chat(agent_key, chat_id, tag=superseded.id)
+            if generation.message != message:
+                # 이전 메시지가 합쳐진 경우에만 합쳐진 메시지로 다시 분류
+                message = generation.message
+                decision = default_classifier.classify(message, context)
+            
+            delay = mapping.get("delay", 3)  # 기본값 3초
+            split_delay = mapping.get("split_delay", 2)
+            generate_args = (persona["system_prompt"], mapping["role"], context, message, chat_participants)
+            generate_kwargs = {
+                "max_prompt_tokens": persona.get("max_prompt_tokens"),
+                "persona_key": cache_service.persona_key(tenant_id, persona["id"]),
+                "tenant_id": tenant_id,
+                # 질문/직접 언급은 LLM 스케줄러 우선 lane
+                "priority": openai_service.is_priority_message(message, decision=decision),
+                "summary": summary,
+                # 페르소나별 모델 route 정책 (없으면 자동 판단)
+                "route_policy": persona.get("model_route"),
+                "decision": decision,
+            }
             
-            # 여러 응답을 순차적으로 전송
-            for i, reply in enumerate(replies):
-                # 첫 번째 응답이 아닌 경우 추가 지연
-                if i > 0:
-                    await asyncio.sleep(mapping.get("split_delay", 2))
-                
-                # 응답 지연 (더 자연스럽게)
-                delay_time = mapping.get("delay", 3)  # 기본값 3초
-                await asyncio.sleep(delay_time)
-                
-                # 메시지 전송
-                await event.respond(reply)
-                
-                # 메시지 저장
-                try:
-                    client = supabase_service._get_supabase_client()
-                    client.table("messages").insert({
-                        "tenant_id": tenant_id,
-                        "chat_id": chat_id,
-                        "agent_id": agent_id,
-                        "content": reply,
-                        "user_id": None  # AI 응답이므로 user_id는 None
-                    }).execute()
-                except Exception as e:
-                    logger.error(f"메시지 저장 실패: {e}")
-            
-            # 컨텍스트 업데이트 (모든 응답을 하나로 합쳐서 저장)
-            all_replies = " ".join(replies)
-            context.extend([
-                {"role": "user", "content": event.text},
-                {"role": "assistant", "content": all_replies}
-            ])
+            # 페르소나가 응답 캐시를 쓰면 같은 (정규화) 질문 + 같은 최근 흐름에 대한 응답 재사용
+            cache_key = None
+            if response_cache.is_enabled(persona):
+                cache_key = response_cache.make_key(tenant_id, persona["id"], mapping["role"], message, context)
+            cached_replies = response_cache.lookup(cache_key)
+            generation_started = time.monotonic()
+            
+            try:
+                peer = await event.get_input_chat()
+                if cached_replies is not None:
+                    self._schedule_replies(generation, agent_key, chat_id, cached_replies, delay, split_delay, peer)
+                elif settings.openai_streaming:
+                    # 스트리밍: ---SPLIT--- 단위로 응답이 완성되는 즉시 전송 예약
+                    # (첫 응답의 지연 타이머는 나머지 응답이 생성되는 동안 이미 흐름)
+                    base = None
+                    async for reply in openai_service.stream_multi_reply(*generate_args, **generate_kwargs):
+                        now = time.monotonic()
+                        if base is None:
+                            base = now
+                        due = max(now, self.send_scheduler.reply_due(base, len(generation.replies), delay, split_delay))
+                        accepted = self.send_scheduler.schedule(agent_key, chat_id, reply, due, peer, tag=generation.id)
+                        self.generations.scheduled(generation, reply, accepted)
+                else:
+                    # OpenAI 응답 생성 후 여러 응답을 지연 시간에 맞춰 전송 예약 (채팅방 내 순서 보장)
+                    replies = await openai_service.generate_multi_reply(*generate_args, **generate_kwargs)
+                    self._schedule_replies(generation, agent_key, chat_id, replies, delay, split_delay, peer)
+            finally:
+                ready = self.generations.finish(generation)
+            
+            if cached_replies is None:
+                response_cache.store(cache_key, generation.replies, time.monotonic() - generation_started)
+            
+            # 컨텍스트는 살아남은 생성의 응답이 실제로 전송된 뒤에 한 번에 반영
+            if ready:
+                self._commit_generation(generation)
             
             # 처리 시간 계산
             processing_time = time.time() - start_time
@@ -269,9 +567,11 @@ class TelegramWorker:
                        tenant_id=tenant_id,
                        agent_id=agent_id,
                        chat_id=chat_id,
-                       message_length=len(event.text),
-                       reply_count=len(replies),
-                       total_reply_length=len(all_replies),
+                       message_length=len(message),
+                       reply_count=len(generation.replies),
+                       scheduled_count=generation.pending_sends,
+                       merged=superseded is not None,
+                       cached=cached_replies is not None,
                        processing_time_seconds=round(processing_time, 2))
                        
         except Exception as e:
@@ -281,35 +581,84 @@ class TelegramWorker:
                         chat_id=getattr(event, 'chat_id', None),
                         error=str(e))
     
-    async def _get_chat_participants(self, event) -> List[str]:
-        """채팅 참여자 정보 수집"""
+    def _schedule_replies(self, generation: Generation, agent_key: str, chat_id, replies: List[str],
+                          delay: float, split_delay: float, peer):
+        """완성된 응답 목록을 기존 지연 규칙대로 예약"""
+        base = time.monotonic()
+        for i, reply in enumerate(replies):
+            due = self.send_scheduler.reply_due(base, i, delay, split_delay)
+            accepted = self.send_scheduler.schedule(agent_key, chat_id, reply, due, peer, tag=generation.id)
+            self.generations.scheduled(generation, reply, accepted)
+    
+    async def _send_job(self, job: SendJob):
+        """예약된 응답 하나를 전송하고 저장 큐에 적재"""
+        # 첫 await 전에 표시해서, 전송 중에 들어온 새 메시지가 이 생성을 대체(병합)하지 않게 함
+        self.generations.send_started(job.tag)
+        delivered = False
+        retrying = False
         try:
-            # 채팅 정보 가져오기
-            chat = await event.get_chat()
-            if hasattr(chat, 'participants_count'):
-                # 그룹 채팅인 경우 참여자 수만 반환
-                return [f"participant_{i}" for i in range(chat.participants_count)]
-            return []
-        except Exception as e:
-            logger.debug(f"Failed to get chat participants: {e}")
+            client = self.clients.get(job.agent_key)
+            if client is None or not client.is_connected():
+                raise RuntimeError(f"client not connected: {job.agent_key}")
+            
+            await client.send_message(job.peer, job.text)
+            delivered = True
+        except FLOOD_ERRORS as e:
+            # 스케줄러가 대기 후 같은 작업을 다시 보내므로 아직 전송 완료로 처리하지 않음
+            retrying = self.send_scheduler.will_retry(job, e)
+            raise
+        finally:
+            if not retrying:
+                ready = self.generations.send_done(job.tag, delivered)
+                if ready is not None:
+                    self._commit_generation(ready)
+        
+        # 메시지 저장 (write-behind 큐에 적재, AI 응답이므로 user_id는 None)
+        tenant_id, agent_id = job.agent_key.split(":", 1)
+        message_writer.enqueue({
+            "tenant_id": tenant_id,
+            "chat_id": job.chat_id,
+            "agent_id": agent_id,
+            "content": job.text,
+            "user_id": None
+        })
+    
+    def _commit_generation(self, generation: Generation):
+        """사용자 메시지와 응답 전체를 컨텍스트에 한 번에 반영 (모든 응답을 하나로 합쳐서 저장)"""
+        agent_key, chat_id = generation.key
+        tenant_id, agent_id = agent_key.split(":", 1)
+        self.context_store.append(
+            tenant_id, agent_id, chat_id,
+            {"role": "user", "content": generation.message},
+            {"role": "assistant", "content": " ".join(generation.replies)}
+        )
+        self.generations.mark_committed(generation)
+    
+    async def _get_chat_participants(self, agent_key: str, event) -> List[str]:
+        """채팅 참여자 정보 수집 - 그룹이면 최근 발화자 일부 (전체 멤버 목록은 만들지 않음)"""
+        meta = await self.chat_metadata.get(agent_key, event.chat_id, event.get_chat)
+        if not meta.is_group:
             return []
+        return self.chat_metadata.participants(agent_key, event.chat_id, settings.chat_participants_sample)
             
     async def add_agent(self, tenant_id: str, agent_id: str):
         """새로운 에이전트 추가"""
+        if not self.owns_agent(agent_id):
+            logger.info("Agent belongs to another shard",
+                       tenant_id=tenant_id,
+                       agent_id=agent_id,
+                       shard_id=self.shard_id)
+            return False
+            
         try:
             # agents 테이블에서 에이전트 정보 조회
-            client = supabase_service._get_supabase_client()
-            result = client.table("agents").select(
-                "id, tenant_id, name, api_id, api_hash, phone_number, session_string, is_active"
-            ).eq("id", agent_id).eq("tenant_id", tenant_id).execute()
+            agent_info = await supabase_service.get_agent_async(tenant_id, agent_id)
             
-            if not result.data:
+            if not agent_info:
                 logger.warning("Agent not found",
                              tenant_id=tenant_id,
                              agent_id=agent_id)
                 return False
-                
-            agent_info = result.data[0]
             
             if not agent_info["is_active"] or not agent_info["session_string"]:
                 logger.warning("Agent is not active or has no session",
@@ -330,8 +679,9 @@ class TelegramWorker:
                 "session_string": agent_info["session_string"]
             }
             
-            # 클라이언트 생성
-            await self._create_client(session_info)
+            # 클라이언트 생성 (실패 시 감독 태스크가 backoff 후 재시도)
+            if not await self._start_agent(session_info):
+                return False
             
             logger.info("Agent added to worker",
                        tenant_id=tenant_id,
@@ -349,16 +699,24 @@ class TelegramWorker:
     async def remove_agent(self, tenant_id: str, agent_id: str):
         """에이전트 제거"""
         client_key = f"{tenant_id}:{agent_id}"
-        if client_key in self.clients:
-            client = self.clients[client_key]
-            if client.is_connected():
+        self.connect_times.pop(client_key, None)
+        self.sessions.pop(client_key, None)
+        supervised = await self.supervisor.stop(client_key)
+        if supervised or client_key in self.clients:
+            client = self.clients.pop(client_key, None)
+            if client and client.is_connected():
                 await client.disconnect()
-            del self.clients[client_key]
             
-            # 관련 컨텍스트 캐시 정리
-            keys_to_remove = [k for k in self.context_cache.keys() if k.startswith(f"{tenant_id}:{agent_id}:")]
-            for key in keys_to_remove:
-                del self.context_cache[key]
+            # 관련 컨텍스트, 대기 중인 조각 메시지 및 전송 예약 정리 (재시도 중이던 에이전트 포함)
+            self.context_store.remove_agent(tenant_id, agent_id)
+            self.message_coalescer.cancel_agent(client_key)
+            self.send_scheduler.cancel_agent(client_key)
+            self.generations.cancel_agent(client_key)
+            self.summarizer.cancel_agent(tenant_id, agent_id)
+            self.chat_metadata.remove_agent(client_key)
+            chat_filter.remove_agent(client_key)
+            self.snapshot.discard_agent(tenant_id, agent_id)
+            cache_service.invalidate_agent_mappings(tenant_id, agent_id)
                 
             logger.info("Agent removed from worker",
                        tenant_id=tenant_id,
@@ -367,46 +725,33 @@ class TelegramWorker:
         return False
         
     async def _get_chat_config(self, tenant_id: str, agent_id: str, chat_id: int) -> Optional[Dict]:
-        """mappings 테이블에서 채팅 설정 조회"""
+        """mappings 테이블에서 채팅 설정 조회 (TTL 캐시, 매핑 없음도 음성 캐시)"""
+        cache_key = cache_service.mapping_key(tenant_id, agent_id, chat_id)
+        hit, cached = cache_service.mapping_cache.lookup(cache_key)
+        if hit:
+            return cached
+            
         try:
-            client = supabase_service._get_supabase_client()
-            
-            # mappings 테이블에서 조회
-            result = client.table("mappings").select(
-                "persona_id, role, delay_sec, split_delay_sec"
-            ).eq("tenant_id", tenant_id).eq("agent_id", agent_id).eq("chat_id", str(chat_id)).execute()
-            
-            if result.data:
-                config = result.data[0]
-                return {
-                    "persona_id": config["persona_id"],
-                    "role": config["role"],
-                    "delay": config["delay_sec"],
-                    "split_delay": config.get("split_delay_sec", 2)
-                }
-            return None
+            # mappings 테이블에서 조회 (스레드풀 경유)
+            config = await supabase_service.get_chat_config_async(tenant_id, agent_id, chat_id)
+            cache_service.mapping_cache.set(cache_key, config)
+            return config
             
         except Exception as e:
             logger.error(f"Chat config 조회 실패: {e}")
             return None
             
     async def _get_persona(self, tenant_id: str, persona_id: str) -> Optional[Dict]:
-        """personas 테이블에서 페르소나 조회"""
+        """personas 테이블에서 페르소나 조회 (TTL 캐시)"""
+        cache_key = cache_service.persona_key(tenant_id, persona_id)
+        hit, cached = cache_service.persona_cache.lookup(cache_key)
+        if hit:
+            return cached
+            
         try:
-            client = supabase_service._get_supabase_client()
-            
-            result = client.table("personas").select(
-                "id, name, system_prompt"
-            ).eq("id", persona_id).eq("tenant_id", tenant_id).execute()
-            
-            if result.data:
-                persona = result.data[0]
-                return {
-                    "id": persona["id"],
-                    "name": persona["name"],
-                    "system_prompt": persona["system_prompt"]
-                }
-            return None
+            persona = await supabase_service.get_persona_prompt_async(tenant_id, persona_id)
+            cache_service.persona_cache.set(cache_key, persona)
+            return persona
             
         except Exception as e:
             logger.error(f"Persona 조회 실패: {e}")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+채팅 참여자 수집 경로 할당량 벤치마크
+기존 _get_chat_participants(메시지마다 get_chat + participants_count만큼 문자열 생성, before)와
+에이전트별 메타데이터 TTL 캐시 + 최근 발화자 샘플(after)의 메시지당 할당량/시간/get_chat 호출 수를 비교합니다.
+
+get_chat은 지정한 지연만큼 sleep 하는 가짜 엔티티 조회를 사용합니다.
+
+사용법:
+    python bench_chat_metadata.py --participants 50000 --messages 2000 --chats 20
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+from app.services.chat_metadata import ChatMetadataCache
+
+
+class FakeChat:
+    def __init__(self, chat_id: int, participants_count: int):
+        self.id = chat_id
+        self.title = f"group-{chat_id}"
+        self.participants_count = participants_count
+
+
+class FakeEvent:
+    def __init__(self, chat: FakeChat, sender_id: int, latency: float, counter: dict):
+        self.chat_id = chat.id
+        self.sender_id = sender_id
+        self.sender = None
+        self._chat = chat
+        self._latency = latency
+        self._counter = counter
+
+    async def get_chat(self):
+        self._counter["get_chat"] += 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        return self._chat
+
+
+async def legacy_participants(event) -> list:
+    try:
+        chat = await event.get_chat()
+        if hasattr(chat, 'participants_count'):
+            return [f"participant_{i}" for i in range(chat.participants_count)]
+        return []
+    except Exception:
+        return []
+
+
+def _make_events(args, counter: dict) -> list:
+    rng = random.Random(1)
+    chats = [FakeChat(1000 + i, args.participants) for i in range(args.chats)]
+    return [FakeEvent(rng.choice(chats), rng.randrange(args.speakers), args.latency_ms / 1000, counter)
+            for _ in range(args.messages)]
+
+
+async def _run(name: str, handler, args) -> None:
+    counter = {"get_chat": 0}
+    events = _make_events(args, counter)
+    peaks = []
+    sizes = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    for event in events:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        participants = await handler(event)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        sizes += len(participants)
+        del participants
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+
+    peaks.sort()
+    print(f"{name:<8} get_chat={counter['get_chat']:<6} avg_participants={sizes / len(events):9.1f} "
+          f"peak/msg p50={peaks[len(peaks) // 2] / 1024:10.1f}KB max={peaks[-1] / 1024:10.1f}KB "
+          f"time/msg={elapsed / len(events) * 1e6:9.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--participants", type=int, default=50000, help="그룹 멤버 수")
+    parser.add_argument("--messages", type=int, default=2000, help="처리할 메시지 수")
+    parser.add_argument("--chats", type=int, default=20, help="채팅방 수")
+    parser.add_argument("--speakers", type=int, default=200, help="채팅방별 실제 발화자 수")
+    parser.add_argument("--sample", type=int, default=10, help="응답 생성에 넘기는 참여자 수")
+    parser.add_argument("--latency-ms", type=float, default=0, help="get_chat 지연")
+    args = parser.parse_args()
+
+    cache = ChatMetadataCache(ttl=900, max_chats_per_agent=5000, max_speakers=20)
+
+    async def cached_participants(event) -> list:
+        cache.note_speaker("bench", event.chat_id, f"user_{event.sender_id}")
+        meta = await cache.get("bench", event.chat_id, event.get_chat)
+        if not meta.is_group:
+            return []
+        return cache.participants("bench", event.chat_id, args.sample)
+
+    print(f"participants={args.participants} messages={args.messages} chats={args.chats} speakers={args.speakers}")
+    asyncio.run(_run("before", legacy_participants, args))
+    asyncio.run(_run("after", cached_participants, args))
+    print(f"cache    {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+메시지 분류 엔진 벤치마크
+기존 should_respond_to_message / is_incomplete_sentence 판단 로직(before)과
+미리 컴파일한 MessageClassifier(after)의 처리량을 비교하고, 모든 메시지에서 결정이 같은지 확인합니다.
+
+기존 로직은 로깅과 확률 판단을 뺀 판단 부분만 그대로 옮겨 두었습니다.
+확률 판단 대상은 "sample"로 표시해서 비교합니다.
+
+사용법:
+    python bench_message_classifier.py --messages 50000 --rounds 5
+"""
+
+import argparse
+import random
+import re
+import time
+
+from app.services.message_classifier import MessageClassifier
+
+
+def legacy_is_incomplete(text: str) -> bool:
+    has_ending = text.strip().endswith(('.', '!', '?', '~', 'ㅋ', 'ㅎ'))
+    incomplete_endings = [
+        '그리고', '하지만', '그런데', '그래서', '그러면',
+        '은', '는', '도', '만', '부터', '까지', '에서', '에게',
+        '안녕', '오늘', '내일', '어제', '지금', '나중에',
+        '그리고', '하지만', '그런데', '그래서', '그러면'
+    ]
+    ends_with_incomplete = any(text.endswith(word) for word in incomplete_endings)
+    ends_with_number = text[-1].isdigit() if text else False
+    ends_with_symbol = text[-1] in '+-*/=()[]{}' if text else False
+    is_single_char = len(text.strip()) == 1
+    return not has_ending or ends_with_incomplete or ends_with_number or ends_with_symbol or is_single_char
+
+
+def legacy_classify(message: str, context=None) -> str:
+    meaningless_patterns = [
+        r'^[ㅋㅎ]+$', r'^[ㅇㅎ]+$', r'^[.]{2,}$', r'^[~]{2,}$',
+        r'^[!]{2,}$', r'^[?]{2,}$', r'^[ㅁㅇㅎ]+$', r'^[ㅋㅎ!~.]+$',
+    ]
+    for pattern in meaningless_patterns:
+        if re.match(pattern, message.strip()):
+            return "reject"
+
+    short_responses = ['음', '어', '응', '그래', '맞아', '좋아', 'ㅇㅇ', 'ㅇ', 'ㅎ', 'ㅋ']
+    if message.strip() in short_responses:
+        return "reject"
+
+    question_keywords = ['?', '뭐', '무엇', '어떻게', '왜', '언제', '어디', '누가', '몇']
+    has_question = any(keyword in message for keyword in question_keywords)
+    direct_mentions = ['너', '당신', 'AI', '봇', '기계', '로봇']
+    is_direct_mention = any(mention in message for mention in direct_mentions)
+
+    if context:
+        for msg in context[-3:]:
+            if msg.get('role') == 'assistant':
+                break
+
+    if has_question or is_direct_mention:
+        return "respond"
+    if len(message.strip()) >= 10:
+        return "respond"
+    return "sample"
+
+
+SUBJECTS = ['나', '우리', '친구', '엄마', '팀장님', '너', 'AI', '이 봇', '고양이', '동생']
+TOPICS = ['오늘 점심', '내일 회의', '주말 계획', '새 영화', '코인 시세', '날씨', '숙제', '게임 업데이트', '여행']
+ENDINGS = ['어때?', '뭐야', '좋더라.', '별로야!', '했어ㅋㅋ', '그런데', '하지만', '까지', '는', '3', '(', '~', '?', '요']
+FILLERS = ['ㅋㅋㅋ', 'ㅎㅎ', 'ㅇㅇ', '음', '...', '!!', '??', '~~', 'ㅁㅇㅎ', '응', '그래', '좋아', 'ㅋ', '.']
+
+
+def build_corpus(size: int, seed: int = 42):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        kind = rng.random()
+        if kind < 0.25:
+            text = rng.choice(FILLERS)
+        elif kind < 0.5:
+            text = f"{rng.choice(TOPICS)} {rng.choice(ENDINGS)}"
+        else:
+            text = f"{rng.choice(SUBJECTS)} {rng.choice(TOPICS)} {rng.choice(ENDINGS)}"
+        if rng.random() < 0.1:
+            text = " " + text + " "
+        corpus.append(text)
+    return corpus
+
+
+def run(label, classify, incomplete, corpus, context, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for text in corpus:
+            classify(text, context)
+            incomplete(text)
+        best = min(best, time.perf_counter() - started)
+    rate = len(corpus) / best
+    print(f"{label:<10} {best * 1000:9.1f} ms  {rate:12,.0f} msg/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages)
+    context = [{"role": "user", "content": "안녕"}, {"role": "assistant", "content": "안녕하세요!"}]
+    classifier = MessageClassifier()
+
+    mismatches = 0
+    for text in corpus:
+        if legacy_classify(text, context) != classifier.classify(text, context).action:
+            mismatches += 1
+        if legacy_is_incomplete(text) != classifier.is_incomplete(text):
+            mismatches += 1
+    print(f"corpus: {len(corpus)} messages ({len(set(corpus))} unique), mismatched decisions: {mismatches}")
+
+    before = run("legacy", legacy_classify, legacy_is_incomplete, corpus, context, args.rounds)
+    after = run("compiled", classifier.classify, classifier.is_incomplete, corpus, context, args.rounds)
+    print(f"speedup: {after / before:.2f}x")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Supabase 호출 방식별 메시지 핸들러 지연시간 벤치마크
+동기 supabase-py 직접 호출(before)과 스레드풀 async facade(after)의 p50/p99를 비교합니다.
+
+실제 DB 대신 지정한 지연시간만큼 sleep 하는 가짜 PostgREST 클라이언트를 사용하며,
+핸들러 경로(매핑 조회 → 페르소나 조회 → 메시지 저장)는 supabase_service 함수를 그대로 탑니다.
+메시지 저장은 message_writer가 쓰는 배치 insert(insert_messages)에 한 행씩 넘깁니다.
+
+사용법:
+    python bench_supabase_executor.py --chats 50 --messages 5 --latency-ms 40 --slow-ms 400
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import threading
+import time
+
+from app.config import settings
+from app.services import supabase_service
+
+
+class _FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class _FakeQuery:
+    """supabase-py 빌더 체인을 흉내내고 execute()에서 동기 sleep"""
+
+    def __init__(self, table: str, fake: "FakeSupabase"):
+        self.table = table
+        self.fake = fake
+
+    def __getattr__(self, name):
+        # select/eq/insert/not_/is_ 등 체인 메서드는 모두 self 반환
+        return lambda *args, **kwargs: self
+
+    @property
+    def not_(self):
+        return self
+
+    def execute(self):
+        self.fake.sleep()
+        if self.table == "mappings":
+            return _FakeResult([{"persona_id": "p1", "role": "Chatter", "delay_sec": 0, "split_delay_sec": 0}])
+        if self.table == "personas":
+            return _FakeResult([{"id": "p1", "name": "bench", "system_prompt": "hi"}])
+        return _FakeResult([{"id": "m1"}])
+
+
+class FakeSupabase:
+    def __init__(self, latency_ms: float, slow_ms: float, slow_ratio: float):
+        self.latency = latency_ms / 1000
+        self.slow = slow_ms / 1000
+        self.slow_ratio = slow_ratio
+        self._rng = random.Random(42)
+        self._lock = threading.Lock()
+
+    def sleep(self):
+        with self._lock:
+            slow = self._rng.random() < self.slow_ratio
+        time.sleep(self.slow if slow else self.latency)
+
+    def table(self, name: str):
+        return _FakeQuery(name, self)
+
+
+def _message_row(chat_id: int) -> dict:
+    return {"tenant_id": "t1", "chat_id": chat_id, "agent_id": "a1", "content": "reply", "user_id": None}
+
+
+async def _handler_blocking(chat_id: int):
+    """변경 전: async 핸들러에서 동기 클라이언트 직접 호출"""
+    mapping = supabase_service.get_chat_config("t1", "a1", chat_id)
+    supabase_service.get_persona_prompt("t1", mapping["persona_id"])
+    supabase_service.insert_messages([_message_row(chat_id)])
+
+
+async def _handler_async(chat_id: int):
+    """변경 후: 스레드풀 async facade 사용"""
+    mapping = await supabase_service.get_chat_config_async("t1", "a1", chat_id)
+    await supabase_service.get_persona_prompt_async("t1", mapping["persona_id"])
+    await supabase_service.insert_messages_async([_message_row(chat_id)])
+
+
+async def _run(handler, chats: int, messages: int, interval_ms: float) -> list:
+    latencies = []
+    started = time.perf_counter()
+
+    async def chat_loop(chat_id: int):
+        for seq in range(messages):
+            # 예정된 도착 시각부터 완료까지 측정 (루프가 막혀 늦게 시작한 시간도 포함)
+            arrival = started + seq * interval_ms / 1000 + chat_id * 0.001
+            await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+            await handler(chat_id)
+            latencies.append(time.perf_counter() - arrival)
+
+    await asyncio.gather(*[chat_loop(i) for i in range(chats)])
+    return latencies
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _report(name: str, latencies: list, elapsed: float):
+    ms = [v * 1000 for v in latencies]
+    print(f"{name:<10} n={len(ms):<5} p50={_percentile(ms, 50):8.1f}ms "
+          f"p99={_percentile(ms, 99):8.1f}ms mean={statistics.mean(ms):8.1f}ms total={elapsed:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=50, help="동시 채팅방 수")
+    parser.add_argument("--messages", type=int, default=5, help="채팅방당 메시지 수")
+    parser.add_argument("--latency-ms", type=float, default=40, help="일반 쿼리 지연")
+    parser.add_argument("--slow-ms", type=float, default=400, help="느린 쿼리 지연")
+    parser.add_argument("--slow-ratio", type=float, default=0.02, help="느린 쿼리 비율")
+    parser.add_argument("--interval-ms", type=float, default=100, help="채팅방별 메시지 간격")
+    args = parser.parse_args()
+
+    supabase_service.supabase = FakeSupabase(args.latency_ms, args.slow_ms, args.slow_ratio)
+    print(f"chats={args.chats} messages={args.messages} latency={args.latency_ms}ms "
+          f"slow={args.slow_ms}ms@{args.slow_ratio:.0%} executor_workers={settings.supabase_max_workers}")
+
+    for name, handler in (("blocking", _handler_blocking), ("executor", _handler_async)):
+        started = time.perf_counter()
+        latencies = asyncio.run(_run(handler, args.chats, args.messages, args.interval_ms))
+        _report(name, latencies, time.perf_counter() - started)
+
+    supabase_service.shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
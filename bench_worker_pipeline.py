@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+워커 파이프라인 end-to-end 부하 벤치마크
+실제 텔레그램/OpenAI/Supabase 없이 loadtest 패키지의 대역을 붙여
+메시지 수신(_handle_message) → debounce → 필터 → LLM 스케줄러 → 응답 생성 → 전송 스케줄러 → 전송
+전체 경로의 처리량과 지연시간을 측정합니다.
+
+- OpenAI: 로컬 가짜 chat completions 서버 (지연/jitter, 스트리밍, 429 주입)
+- 텔레그램: 에이전트 x 채팅방에 포아송 간격으로 합성 NewMessage 이벤트 주입, 전송은 기록만 (FloodWait 주입 가능)
+- Supabase: 매핑/페르소나 조회와 메시지 저장에 지연만 주입
+
+지연시간은 채팅방의 메시지 수신 시각부터 그 채팅방에 첫 응답이 전송될 때까지입니다
+(debounce/생성 병합으로 한 응답에 묶인 메시지는 모두 같은 전송 시각으로 계산).
+
+사용법:
+    python bench_worker_pipeline.py --agents 20 --chats 10 --rate 50 --duration 20
+    python bench_worker_pipeline.py --agents 50 --chats 20 --rate 200 --stream --rate-limit-ratio 0.05
+    python bench_worker_pipeline.py --send-agent-rate 30 --send-chat-rate 20 --flood-ratio 0.05
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import time
+
+import openai
+import structlog
+
+from app.config import settings
+from app.services import openai_service
+from app.services.llm_scheduler import TokenBucket, llm_scheduler
+from app.services.message_writer import message_writer
+from app.services.model_router import model_router
+from app.services.worker_service import TelegramWorker
+from loadtest import fake_supabase
+from loadtest.fake_openai import FakeOpenAIServer
+from loadtest.fake_telegram import EventSource, FakeTelegramClient, LatencyRecorder
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _set_log_level(name: str):
+    """벤치 중 요청별 info 로그가 이벤트 루프를 잡아먹지 않도록 로그 레벨 조정"""
+    level = getattr(logging, name.upper())
+    logging.getLogger().setLevel(level)
+    logging.getLogger("httpx").setLevel(max(level, logging.WARNING))
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(level))
+
+
+def _rss_mb() -> float:
+    """현재 RSS (리눅스는 /proc, 그 외에는 최대 RSS로 대체)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class LoopLagProbe:
+    """주기적으로 sleep 하고 예정보다 늦게 깨어난 시간을 이벤트 루프 지연으로 기록"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def _run(args) -> dict:
+    server = FakeOpenAIServer(
+        latency_ms=args.openai_latency_ms,
+        jitter_ms=args.openai_jitter_ms,
+        chunk_ms=args.chunk_ms,
+        rate_limit_ratio=args.rate_limit_ratio,
+        retry_after_sec=args.retry_after_sec,
+        splits=args.splits,
+    )
+    await server.start()
+    openai_service.client = openai.AsyncOpenAI(api_key="bench", base_url=server.base_url, max_retries=0)
+    settings.openai_streaming = args.stream
+    llm_scheduler.request_bucket = TokenBucket(args.rpm)
+    llm_scheduler.token_bucket = TokenBucket(args.tpm)
+    llm_scheduler.max_concurrency = args.llm_concurrency
+
+    settings.send_agent_rate_per_min = args.send_agent_rate
+    settings.send_chat_rate_per_min = args.send_chat_rate
+    worker = TelegramWorker()
+    worker.snapshot.enabled = False
+    worker.message_coalescer.quiet_period = args.quiet_period
+    recorder = LatencyRecorder()
+    sessions = []
+    for i in range(args.agents):
+        session = {"tenant_id": f"tenant-{i % args.tenants}", "agent_id": f"agent-{i}", "name": f"bench-{i}"}
+        agent_key = f"{session['tenant_id']}:{session['agent_id']}"
+        worker.clients[agent_key] = FakeTelegramClient(agent_key, recorder, args.send_latency_ms,
+                                                       args.flood_ratio, args.flood_wait_sec)
+        worker.sessions[agent_key] = session
+        sessions.append(session)
+
+    await message_writer.start()
+    await worker.send_scheduler.start()
+    probe = LoopLagProbe()
+    probe.start()
+    rss_before = _rss_mb()
+
+    source = EventSource(worker, sessions, args.chats, args.rate, recorder)
+    started = time.monotonic()
+    await source.run(args.duration)
+    injected_sec = time.monotonic() - started
+
+    # 남은 메시지가 응답될 때까지 대기 (drain 시간 상한)
+    drain_deadline = time.monotonic() + args.drain
+    while recorder.unanswered and time.monotonic() < drain_deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.monotonic() - started
+    rss_after = _rss_mb()
+
+    await probe.stop()
+    await worker.stop_worker()
+    await message_writer.stop()
+    await server.stop()
+
+    return {
+        "injected": source.injected,
+        "injected_sec": injected_sec,
+        "elapsed": elapsed,
+        "recorder": recorder,
+        "loop_lag": probe.samples,
+        "rss_before": rss_before,
+        "rss_after": rss_after,
+        "server": server.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "send_scheduler": worker.send_scheduler.stats(),
+        "generation": openai_service.generation_stats.stats(),
+        "routes": model_router.route_stats.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=20, help="에이전트 수")
+    parser.add_argument("--tenants", type=int, default=4, help="테넌트 수 (에이전트를 나눠 배정)")
+    parser.add_argument("--chats", type=int, default=10, help="에이전트당 채팅방 수")
+    parser.add_argument("--rate", type=float, default=50, help="전체 수신 메시지 수/초")
+    parser.add_argument("--duration", type=float, default=20, help="이벤트 주입 시간(초)")
+    parser.add_argument("--drain", type=float, default=30, help="주입 종료 후 응답 대기 상한(초)")
+    parser.add_argument("--quiet-period", type=float, default=0.2, help="debounce 조용한 구간(초)")
+    parser.add_argument("--stream", action="store_true", help="스트리밍 응답 경로 사용")
+    parser.add_argument("--splits", type=int, default=2, help="응답당 ---SPLIT--- 조각 수")
+    parser.add_argument("--openai-latency-ms", type=float, default=300, help="가짜 OpenAI 응답 지연")
+    parser.add_argument("--openai-jitter-ms", type=float, default=100, help="응답 지연 jitter")
+    parser.add_argument("--chunk-ms", type=float, default=20, help="스트리밍 chunk 간격")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="429 응답 비율")
+    parser.add_argument("--retry-after-sec", type=float, default=1.0, help="429 Retry-After")
+    parser.add_argument("--rpm", type=int, default=100000, help="LLM 스케줄러 분당 요청 수")
+    parser.add_argument("--tpm", type=int, default=100000000, help="LLM 스케줄러 분당 토큰 수")
+    parser.add_argument("--llm-concurrency", type=int, default=settings.llm_max_concurrency, help="동시 LLM 호출 수")
+    parser.add_argument("--db-latency-ms", type=float, default=20, help="가짜 Supabase 쿼리 지연")
+    parser.add_argument("--send-latency-ms", type=float, default=30, help="가짜 텔레그램 전송 지연")
+    parser.add_argument("--send-agent-rate", type=float, default=0, help="에이전트별 분당 전송 한도 (0이면 제한 없음)")
+    parser.add_argument("--send-chat-rate", type=float, default=0, help="채팅방별 분당 전송 한도 (0이면 제한 없음)")
+    parser.add_argument("--flood-ratio", type=float, default=0.0, help="전송 중 FloodWaitError 비율")
+    parser.add_argument("--flood-wait-sec", type=int, default=1, help="FloodWaitError 대기 시간(초)")
+    parser.add_argument("--log-level", default="warning", help="벤치 중 로그 레벨")
+    args = parser.parse_args()
+
+    _set_log_level(args.log_level)
+    fake_supabase.install(args.db_latency_ms)
+    print(f"agents={args.agents} tenants={args.tenants} chats/agent={args.chats} rate={args.rate}/s "
+          f"duration={args.duration}s stream={args.stream} openai={args.openai_latency_ms}ms "
+          f"429={args.rate_limit_ratio:.0%} pid={os.getpid()}")
+
+    result = asyncio.run(_run(args))
+    recorder = result["recorder"]
+    ms = [v * 1000 for v in recorder.latencies]
+    lag = [v * 1000 for v in result["loop_lag"]]
+
+    print(f"throughput  received={recorder.received} answered={len(ms)} unanswered={recorder.unanswered} "
+          f"sends={recorder.replies}")
+    print(f"            in={result['injected'] / result['injected_sec']:.1f} msg/s "
+          f"answered={len(ms) / result['elapsed']:.1f} msg/s elapsed={result['elapsed']:.1f}s")
+    print(f"latency     p50={_percentile(ms, 50):8.1f}ms p95={_percentile(ms, 95):8.1f}ms "
+          f"p99={_percentile(ms, 99):8.1f}ms max={max(ms, default=0.0):8.1f}ms")
+    print(f"loop lag    p50={_percentile(lag, 50):8.1f}ms p99={_percentile(lag, 99):8.1f}ms "
+          f"max={max(lag, default=0.0):8.1f}ms")
+    print(f"rss         before={result['rss_before']:.1f}MB after={result['rss_after']:.1f}MB")
+    print(f"openai      {result['server']}")
+    scheduler = result["llm_scheduler"]
+    print(f"scheduler   completed={scheduler.get('completed')} retries={scheduler.get('retries')} "
+          f"rate_limited={scheduler.get('rate_limited')} failed={scheduler.get('failed')}")
+    send = result["send_scheduler"]
+    print(f"send        sent={send['sent']} failed={send['failed']} flood_retries={send['flood_retries']} "
+          f"avg_lateness={send['avg_lateness_ms']}ms max_lateness={send['max_lateness_ms']}ms")
+    print(f"generation  {result['generation']['total_generation']}")
+    for name, route in result["routes"].items():
+        print(f"route       {name:<10} calls={route['calls']} p50={route['p50_ms']}ms p95={route['p95_ms']}ms "
+              f"prompt={route['avg_prompt_tokens']} completion={route['avg_completion_tokens']} reasons={route['reasons']}")
+
+
+if __name__ == "__main__":
+    main()
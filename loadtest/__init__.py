@@ -0,0 +1,9 @@
+"""
+워커 파이프라인 부하 테스트용 로컬 대역(stand-in)
+
+- fake_openai: 지연/스트리밍/429를 흉내내는 OpenAI chat completions 서버
+- fake_telegram: 합성 NewMessage 이벤트와 전송만 기록하는 가짜 Telethon 클라이언트
+- fake_supabase: 지연만 주입하는 매핑/페르소나/메시지 저장 함수
+
+실행은 루트의 bench_worker_pipeline.py 참고
+"""
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import random
+import time
+from typing import Optional
+
+from aiohttp import web
+
+from app.services.openai_service import SPLIT_MARKER
+from app.services.token_budget import estimate_tokens
+
+
+class FakeOpenAIServer:
+    """OpenAI /v1/chat/completions 대역 서버
+
+    - latency_ms(+-jitter_ms) 후 응답, 스트리밍이면 첫 토큰까지 같은 지연 후 chunk_ms 간격으로 전송
+    - rate_limit_ratio 확률로 429 + Retry-After 반환
+    - 응답은 splits개의 조각을 ---SPLIT---로 이어 붙인 텍스트
+    """
+
+    def __init__(self, latency_ms: float = 300, jitter_ms: float = 100, chunk_ms: float = 20,
+                 rate_limit_ratio: float = 0.0, retry_after_sec: float = 1.0, splits: int = 2,
+                 seed: int = 42):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.chunk_delay = chunk_ms / 1000
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after_sec
+        self.splits = splits
+        self._rng = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+        self.requests = 0
+        self.streamed = 0
+        self.rate_limited = 0
+        self.aborted_streams = 0
+        self.prompt_tokens = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def start(self, port: int = 0):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _reply_text(self, user_msg: str) -> str:
+        parts = [f"네, '{user_msg[:20]}'에 대한 답변 {i + 1}입니다." for i in range(max(1, self.splits))]
+        return f" {SPLIT_MARKER} ".join(parts)
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests += 1
+        messages = body.get("messages", [])
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") + 4 for m in messages)
+        self.prompt_tokens += prompt_tokens
+
+        if self._rng.random() < self.rate_limit_ratio:
+            self.rate_limited += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status=429,
+                headers={"retry-after": str(self.retry_after)},
+            )
+
+        user_msg = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        text = self._reply_text(user_msg)
+        await asyncio.sleep(self._delay())
+
+        if body.get("stream"):
+            self.streamed += 1
+            return await self._stream(request, body, text)
+
+        completion_tokens = estimate_tokens(text)
+        return web.json_response({
+            "id": f"chatcmpl-fake-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        })
+
+    async def _stream(self, request: web.Request, body: dict, text: str) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            for i in range(0, len(text), 4):
+                chunk = {
+                    "id": f"chatcmpl-fake-{self.requests}",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", "gpt-4o-mini"),
+                    "choices": [{"index": 0, "delta": {"content": text[i:i + 4]}, "finish_reason": None}],
+                }
+                await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+                if self.chunk_delay:
+                    await asyncio.sleep(self.chunk_delay)
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            # 취소된 생성(새 메시지로 대체)이 스트림을 먼저 닫은 경우
+            self.aborted_streams += 1
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "streamed": self.streamed,
+            "rate_limited": self.rate_limited,
+            "aborted_streams": self.aborted_streams,
+            "prompt_tokens": self.prompt_tokens,
+        }
@@ -0,0 +1,36 @@
+import time
+from typing import Dict, List, Optional
+
+from app.services import supabase_service
+
+
+def install(latency_ms: float = 20, delay_sec: float = 0, split_delay_sec: float = 0):
+    """supabase_service의 워커 조회/저장 함수를 지연만 주입하는 대역으로 교체
+
+    모든 채팅방이 같은 페르소나로 매핑된 것처럼 응답합니다. 동기 함수를 바꾸므로
+    *_async facade와 스레드풀 경로는 그대로 사용됩니다.
+    """
+    latency = latency_ms / 1000
+
+    def get_chat_config(tenant_id: str, agent_id: str, chat_id: int) -> Optional[Dict]:
+        time.sleep(latency)
+        return {"persona_id": "bench-persona", "role": "Chatter", "delay": delay_sec, "split_delay": split_delay_sec}
+
+    def get_persona_prompt(tenant_id: str, persona_id: str) -> Optional[Dict]:
+        time.sleep(latency)
+        return {
+            "id": persona_id,
+            "name": "bench",
+            "system_prompt": "너는 커뮤니티 매니저야. 짧고 친절하게 답해.",
+            "max_prompt_tokens": None,
+            "response_cache_enabled": None,
+            "model_route": None,
+        }
+
+    def insert_messages(rows: List[Dict]):
+        time.sleep(latency)
+        return rows
+
+    supabase_service.get_chat_config = get_chat_config
+    supabase_service.get_persona_prompt = get_persona_prompt
+    supabase_service.insert_messages = insert_messages
@@ -0,0 +1,131 @@
+import asyncio
+import random
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Tuple
+
+from telethon.errors import FloodWaitError
+
+# 항상 응답 대상이 되도록 질문 형태로 끝나는 합성 메시지
+MESSAGES = [
+    "언제 시작해요?",
+    "어디서 사요?",
+    "이거 가격이 얼마예요?",
+    "오늘 공지 뭐였어?",
+    "다음 이벤트는 언제야?",
+    "봇아 이거 어떻게 해?",
+    "참여 조건이 뭐예요?",
+    "지갑 연결은 어떻게 하나요?",
+]
+
+
+class LatencyRecorder:
+    """채팅방별로 아직 응답받지 못한 메시지 수신 시각을 쌓아두고, 응답이 전송되면 지연시간 기록
+
+    debounce/병합으로 여러 메시지가 한 응답으로 처리될 수 있으므로 전송 시점에 대기 중인
+    메시지를 모두 응답된 것으로 봅니다.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[str, str], Deque[float]] = defaultdict(deque)
+        self.latencies: List[float] = []
+        self.received = 0
+        self.replies = 0
+
+    def received_at(self, agent_key: str, chat_id, at: float):
+        self._pending[(agent_key, str(chat_id))].append(at)
+        self.received += 1
+
+    def replied(self, agent_key: str, chat_id):
+        now = time.monotonic()
+        self.replies += 1
+        pending = self._pending.pop((agent_key, str(chat_id)), None)
+        if pending:
+            self.latencies.extend(now - at for at in pending)
+
+    @property
+    def unanswered(self) -> int:
+        return sum(len(pending) for pending in self._pending.values())
+
+
+class FakeChat:
+    def __init__(self, participants_count: int):
+        self.participants_count = participants_count
+
+
+class FakeEvent:
+    """TelegramWorker가 사용하는 NewMessage 이벤트 속성만 흉내"""
+
+    def __init__(self, chat_id: int, text: str, participants: int = 5, sender_id: int = None):
+        self.chat_id = chat_id
+        self.text = text
+        self.sender_id = sender_id
+        self.sender = None
+        self._chat = FakeChat(participants)
+
+    async def get_input_chat(self):
+        return self.chat_id
+
+    async def get_chat(self):
+        return self._chat
+
+
+class FakeTelegramClient:
+    """전송만 기록하는 TelegramClient 대역 (flood_ratio 비율로 FloodWaitError 발생)"""
+
+    def __init__(self, agent_key: str, recorder: LatencyRecorder, send_latency_ms: float = 0,
+                 flood_ratio: float = 0.0, flood_wait_sec: int = 1, seed: int = 11):
+        self.agent_key = agent_key
+        self.recorder = recorder
+        self.send_latency = send_latency_ms / 1000
+        self.flood_ratio = flood_ratio
+        self.flood_wait_sec = flood_wait_sec
+        self._rng = random.Random(f"{seed}:{agent_key}")
+        self.sent = 0
+        self.flood_waits = 0
+
+    def is_connected(self) -> bool:
+        return True
+
+    async def disconnect(self):
+        pass
+
+    async def send_message(self, peer, text: str):
+        if self.send_latency:
+            await asyncio.sleep(self.send_latency)
+        if self.flood_ratio and self._rng.random() < self.flood_ratio:
+            self.flood_waits += 1
+            raise FloodWaitError(request=None, capture=self.flood_wait_sec)
+        self.sent += 1
+        self.recorder.replied(self.agent_key, peer)
+
+
+class EventSource:
+    """여러 에이전트/채팅방에 포아송 도착 간격으로 합성 이벤트를 TelegramWorker._handle_message에 주입"""
+
+    def __init__(self, worker, sessions: List[Dict], chats_per_agent: int, rate: float,
+                 recorder: LatencyRecorder, seed: int = 7):
+        self.worker = worker
+        self.sessions = sessions
+        self.chats_per_agent = chats_per_agent
+        self.rate = rate
+        self.recorder = recorder
+        self._rng = random.Random(seed)
+        self.injected = 0
+
+    async def run(self, duration: float):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+        next_at = loop.time()
+        while next_at < deadline:
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            session = self._rng.choice(self.sessions)
+            chat_id = 1000 + self._rng.randrange(self.chats_per_agent)
+            agent_key = f"{session['tenant_id']}:{session['agent_id']}"
+            self.recorder.received_at(agent_key, chat_id, time.monotonic())
+            event = FakeEvent(chat_id, self._rng.choice(MESSAGES), sender_id=self._rng.randrange(50))
+            await self.worker._handle_message(session, event)
+            self.injected += 1
+            next_at += self._rng.expovariate(self.rate)
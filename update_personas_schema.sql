@@ -0,0 +1,15 @@
+-- =================================================================
+-- Personas 테이블 프롬프트 토큰 예산 컬럼 추가
+-- =================================================================
+
+-- max_prompt_tokens: 페르소나별 OpenAI 프롬프트 토큰 상한
+-- NULL이면 워커의 OPENAI_MAX_PROMPT_TOKENS 기본값을 사용
+ALTER TABLE personas ADD COLUMN IF NOT EXISTS max_prompt_tokens INTEGER;
+
+-- response_cache_enabled: 페르소나별 응답 캐시 사용 여부
+-- NULL이면 워커의 RESPONSE_CACHE_ENABLED 기본값을 사용
+ALTER TABLE personas ADD COLUMN IF NOT EXISTS response_cache_enabled BOOLEAN;
+
+-- model_route: 페르소나별 응답 모델 route (LLM_ROUTES의 route 이름, 예: light/standard/heavy)
+-- NULL 또는 'auto'면 메시지 길이/질문 여부/대화 크기로 자동 선택
+ALTER TABLE personas ADD COLUMN IF NOT EXISTS model_route TEXT;
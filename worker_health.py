@@ -2,6 +2,7 @@ import asyncio
 import aiohttp
 from aiohttp import web
 import logging
+from typing import Callable, Dict, Optional
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -9,25 +10,36 @@ logger = logging.getLogger(__name__)
 
 async def health_handler(request):
     """헬스체크 엔드포인트"""
-    return web.json_response({
+    body = {
         "status": "healthy",
         "service": "telegram-worker",
         "timestamp": asyncio.get_event_loop().time()
-    })
+    }
 
-async def start_health_server():
+    # 샤딩 모드: 샤드별 상태 포함 (하나라도 죽어 있으면 degraded)
+    status_provider = request.app.get("status_provider")
+    if status_provider:
+        shards = status_provider()
+        body["shards"] = shards
+        if not all(shard["alive"] for shard in shards.values()):
+            body["status"] = "degraded"
+
+    return web.json_response(body)
+
+async def start_health_server(status_provider: Optional[Callable[[], Dict]] = None, port: int = 8080):
     """헬스체크 서버 시작"""
     app = web.Application()
+    app["status_provider"] = status_provider
     app.router.add_get('/health', health_handler)
-    
+
     runner = web.AppRunner(app)
     await runner.setup()
-    
-    site = web.TCPSite(runner, '0.0.0.0', 8080)
+
+    site = web.TCPSite(runner, '0.0.0.0', port)
     await site.start()
-    
-    logger.info("Health check server started on port 8080")
+
+    logger.info(f"Health check server started on port {port}")
     return runner
 
 if __name__ == "__main__":
-    asyncio.run(start_health_server()) 
\ No newline at end of file
+    asyncio.run(start_health_server())
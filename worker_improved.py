@@ -8,6 +8,7 @@ import asyncio
 import signal
 import sys
 from app.services.worker_service import worker
+from app.services import supabase_service
 from utils.logging import log
 
 async def main():
@@ -25,6 +26,7 @@ async def main():
     finally:
         # 워커 정리
         await worker.stop_worker()
+        supabase_service.shutdown_executor()
         log.info("Worker shutdown complete")
 
 def signal_handler(signum, frame):
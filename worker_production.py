@@ -4,6 +4,7 @@ import signal
 import sys
 from dotenv import load_dotenv
 from app.services.worker_service import worker
+from app.services import supabase_service
 from worker_health import start_health_server
 
 # 환경 변수 로드
@@ -29,6 +30,7 @@ async def main():
     finally:
         # 정리 작업
         await worker.stop_worker()
+        supabase_service.shutdown_executor()
         await health_runner.cleanup()
         print("✅ 워커 종료 완료")
 
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+샤딩 모드 텔레그램 워커
+supervisor가 N개의 워커 프로세스를 띄우고 agent_id의 안정 해시로 에이전트를 나눠 맡깁니다.
+
+- 각 샤드 프로세스는 자신에게 배정된 에이전트만 TelegramWorker로 실행합니다.
+- 죽거나 멈춘(하트비트 끊긴) 샤드는 재시작하고, 재시작 한도를 넘으면 배정에서 제외해
+  남은 샤드들이 그 샤드의 에이전트만 나눠 인수합니다.
+- 헬스체크(/health)에 샤드별 생존 여부, 하트비트, 에이전트 수를 표시합니다.
+
+사용법:
+    WORKER_SHARDS=4 python worker_sharded.py
+"""
+
+import asyncio
+import multiprocessing as mp
+import signal
+import sys
+import time
+from collections import deque
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+# 환경 변수 로드
+load_dotenv()
+
+from app.config import settings
+from worker_health import start_health_server
+from utils.logging import log
+
+HEARTBEAT_INTERVAL = 5      # 샤드 → supervisor 하트비트 주기 (초)
+HEARTBEAT_TIMEOUT = 60      # 이 시간 동안 하트비트가 없으면 멈춘 것으로 판단
+REBALANCE_POLL = 5          # 샤드가 배정 변경을 확인하는 주기
+MAX_RESTARTS = 5            # RESTART_WINDOW 안에서 허용하는 재시작 횟수
+RESTART_WINDOW = 600
+
+
+def _shard_main(shard_id: int, shard_count: int, heartbeats, live_flags, agent_counts):
+    """샤드 프로세스 진입점"""
+    asyncio.run(_run_shard(shard_id, shard_count, heartbeats, live_flags, agent_counts))
+
+
+async def _run_shard(shard_id: int, shard_count: int, heartbeats, live_flags, agent_counts):
+    from app.services.worker_service import worker
+    from app.services import supabase_service
+
+    def live_shards() -> List[int]:
+        return [i for i in range(shard_count) if live_flags[i]]
+
+    worker.configure_shard(shard_id, live_shards)
+
+    # SIGTERM 수신 시 정상 종료 (대기 중인 메시지 flush)
+    main_task = asyncio.current_task()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, main_task.cancel)
+
+    async def heartbeat():
+        while True:
+            heartbeats[shard_id] = time.time()
+            agent_counts[shard_id] = len(worker.clients)
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def watch_assignment():
+        current = live_shards()
+        while True:
+            await asyncio.sleep(REBALANCE_POLL)
+            latest = live_shards()
+            if latest != current:
+                log.info("Shard assignment changed", shard_id=shard_id, live_shards=latest)
+                current = latest
+                await worker.rebalance_shard()
+
+    tasks = [asyncio.create_task(heartbeat()), asyncio.create_task(watch_assignment())]
+    log.info("Shard started", shard_id=shard_id, shard_count=shard_count)
+    try:
+        await worker.start_worker()
+        # 클라이언트가 모두 끊겨도 재배정을 받을 수 있도록 계속 대기
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        await worker.stop_worker()
+        supabase_service.shutdown_executor()
+        log.info("Shard stopped", shard_id=shard_id)
+
+
+class ShardSupervisor:
+    """샤드 프로세스 실행, 감시, 재시작 및 재배정"""
+
+    def __init__(self, shard_count: int):
+        self.shard_count = shard_count
+        self.ctx = mp.get_context("spawn")
+        self.heartbeats = self.ctx.Array("d", shard_count)
+        self.live_flags = self.ctx.Array("b", [1] * shard_count)
+        self.agent_counts = self.ctx.Array("i", shard_count)
+        self.processes: List = [None] * shard_count
+        self.restarts: List[deque] = [deque() for _ in range(shard_count)]
+        self.restart_total = [0] * shard_count
+
+    def start(self):
+        for shard_id in range(self.shard_count):
+            self._spawn(shard_id)
+
+    def _spawn(self, shard_id: int):
+        self.heartbeats[shard_id] = time.time()
+        process = self.ctx.Process(
+            target=_shard_main,
+            args=(shard_id, self.shard_count, self.heartbeats, self.live_flags, self.agent_counts),
+            name=f"telegram-worker-shard-{shard_id}",
+        )
+        process.start()
+        self.processes[shard_id] = process
+        log.info("Shard process spawned", shard_id=shard_id, pid=process.pid)
+
+    def check(self):
+        """죽었거나 멈춘 샤드 재시작, 한도 초과 시 배정에서 제외"""
+        now = time.time()
+        for shard_id in range(self.shard_count):
+            if not self.live_flags[shard_id]:
+                continue
+            process = self.processes[shard_id]
+            alive = process.is_alive()
+            stale = now - self.heartbeats[shard_id] > HEARTBEAT_TIMEOUT
+            if alive and not stale:
+                continue
+
+            if alive:
+                log.warning("Shard heartbeat timeout, terminating", shard_id=shard_id, pid=process.pid)
+                process.terminate()
+                process.join(10)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+            else:
+                log.warning("Shard process died", shard_id=shard_id, exitcode=process.exitcode)
+
+            history = self.restarts[shard_id]
+            history.append(now)
+            while history and now - history[0] > RESTART_WINDOW:
+                history.popleft()
+
+            if len(history) > MAX_RESTARTS and sum(self.live_flags) > 1:
+                # 재시작 한도 초과: 배정에서 제외 → 남은 샤드들이 이 샤드의 에이전트를 인수
+                self.live_flags[shard_id] = 0
+                self.agent_counts[shard_id] = 0
+                log.error("Shard removed from assignment, rebalancing",
+                          shard_id=shard_id,
+                          restarts=len(history),
+                          live_shards=[i for i in range(self.shard_count) if self.live_flags[i]])
+                continue
+
+            self.restart_total[shard_id] += 1
+            self._spawn(shard_id)
+
+    def status(self) -> Dict[str, Dict]:
+        """샤드별 상태 (헬스체크용)"""
+        now = time.time()
+        shards = {}
+        for shard_id in range(self.shard_count):
+            process = self.processes[shard_id]
+            assigned = bool(self.live_flags[shard_id])
+            heartbeat_age = now - self.heartbeats[shard_id]
+            shards[str(shard_id)] = {
+                "pid": process.pid if process else None,
+                "alive": assigned and process is not None and process.is_alive() and heartbeat_age <= HEARTBEAT_TIMEOUT,
+                "assigned": assigned,
+                "heartbeat_age_sec": round(heartbeat_age, 1),
+                "agents": self.agent_counts[shard_id],
+                "restarts": self.restart_total[shard_id],
+            }
+        return shards
+
+    def stop(self):
+        for process in self.processes:
+            if process and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process:
+                process.join(30)
+
+
+async def main():
+    """supervisor 메인 함수"""
+    supervisor = ShardSupervisor(settings.worker_shards)
+    supervisor.start()
+    health_runner = await start_health_server(supervisor.status)
+
+    try:
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            supervisor.check()
+    finally:
+        supervisor.stop()
+        await health_runner.cleanup()
+        log.info("Sharded worker shutdown complete")
+
+
+def signal_handler(signum, frame):
+    """시그널 핸들러"""
+    log.info(f"Received signal {signum}, shutting down shards...")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    # 시그널 핸들러 등록
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    log.info("Starting sharded Telegram worker", shards=settings.worker_shards)
+    asyncio.run(main())